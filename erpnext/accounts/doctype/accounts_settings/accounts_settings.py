@@ -19,6 +19,9 @@ class AccountsSettings(Document):
 
 		self.validate_stale_days()
 		self.enable_payment_schedule_in_print()
+		self.rebuild_gl_daily_balances()
+		self.rebuild_gl_closing_balances()
+		self.rebuild_party_open_items()
 
 	def validate_stale_days(self):
 		if not self.allow_stale and cint(self.stale_days) <= 0:
@@ -31,3 +34,33 @@ class AccountsSettings(Document):
 		for doctype in ("Sales Order", "Sales Invoice", "Purchase Order", "Purchase Invoice"):
 			make_property_setter(doctype, "due_date", "print_hide", show_in_print, "Check")
 			make_property_setter(doctype, "payment_schedule", "print_hide",  0 if show_in_print else 1, "Check")
+
+	def rebuild_gl_daily_balances(self):
+		if not self.has_value_changed("maintain_gl_daily_balances"):
+			return
+
+		if cint(self.maintain_gl_daily_balances):
+			frappe.enqueue("erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance.rebuild_gl_daily_balances",
+				queue="long", timeout=3600, enqueue_after_commit=True)
+		else:
+			frappe.db.set_default("gl_daily_balances_built", 0)
+
+	def rebuild_gl_closing_balances(self):
+		if not self.has_value_changed("maintain_gl_closing_balances"):
+			return
+
+		if cint(self.maintain_gl_closing_balances):
+			frappe.enqueue("erpnext.accounts.doctype.gl_closing_balance.gl_closing_balance.rebuild_gl_closing_balances",
+				queue="long", timeout=3600, enqueue_after_commit=True)
+		else:
+			frappe.db.set_default("gl_closing_balances_built", 0)
+
+	def rebuild_party_open_items(self):
+		if not self.has_value_changed("maintain_party_open_items"):
+			return
+
+		if cint(self.maintain_party_open_items):
+			frappe.enqueue("erpnext.accounts.doctype.party_open_item.party_open_item.rebuild_party_open_items",
+				queue="long", timeout=3600, enqueue_after_commit=True)
+		else:
+			frappe.db.set_default("party_open_items_built", 0)
@@ -4,7 +4,7 @@
 
 import frappe
 from frappe import _
-from frappe.utils import flt, getdate, add_months, get_last_day, fmt_money, nowdate
+from frappe.utils import flt, cint, cstr, getdate, add_months, get_last_day, fmt_money, nowdate
 from frappe.model.naming import make_autoname
 from erpnext.accounts.utils import get_fiscal_year
 from frappe.model.document import Document
@@ -84,7 +84,7 @@ class Budget(Document):
 			or self.applicable_on_purchase_order or self.applicable_on_booking_actual_expenses):
 			self.applicable_on_booking_actual_expenses = 1
 
-def validate_expense_against_budget(args):
+def validate_expense_against_budget(args, budget_context=None):
 	args = frappe._dict(args)
 
 	if args.get('company') and not args.fiscal_year:
@@ -101,55 +101,245 @@ def validate_expense_against_budget(args):
 	if not args.account:
 		return
 
-	accounting_dimensions = get_accounting_dimensions(as_list=False)
-	accounting_dimensions = accounting_dimensions + [
+	if not frappe.db.get_value("Account", {"name": args.account, "root_type": "Expense"}):
+		return
+
+	if not budget_context:
+		budget_context = BudgetContext(args.company, args.fiscal_year)
+
+	for dimension in get_budget_against_dimensions():
+		budget_against = dimension.fieldname
+		if args.get(budget_against):
+			args.is_tree = cint(frappe.get_cached_value('DocType', dimension.document_type, 'is_tree'))
+			args.budget_against_field = budget_against
+			args.budget_against_doctype = dimension.document_type
+
+			budget_records = budget_context.get_budget_records(args)
+			if budget_records:
+				validate_budget_records(args, budget_records, budget_context)
+
+def validate_expense_against_budget_for_entries(gl_map, include_voucher_entries=True):
+	"""
+		Validate budget for the GL Entries of a voucher.
+		Budgets and booked amounts are loaded once per company and fiscal year; the voucher's own
+		entries are taken from gl_map, so this gives the same result before or after they are saved.
+		Entries with the same account, month and budget against values give the same result, so they are checked once.
+	"""
+	dimensions = [d.fieldname for d in get_budget_against_dimensions()]
+
+	budget_contexts = {}
+	validated = set()
+	for args in gl_map:
+		key = (args.get("company"), args.get("account") or args.get("expense_account"),
+			cstr(get_last_day(args.get("posting_date")))) + tuple(cstr(args.get(d)) for d in dimensions)
+
+		if key in validated:
+			continue
+
+		fiscal_year = args.get("fiscal_year") or get_fiscal_year(args.get("posting_date"),
+			company=args.get("company"))[0]
+		context_key = (args.get("company"), fiscal_year)
+		if context_key not in budget_contexts:
+			budget_contexts[context_key] = BudgetContext(args.get("company"), fiscal_year,
+				voucher_type=args.get("voucher_type"), voucher_no=args.get("voucher_no"),
+				voucher_entries=gl_map if include_voucher_entries else None)
+
+		validate_expense_against_budget(args, budget_contexts[context_key])
+		validated.add(key)
+
+def get_budget_against_dimensions():
+	return get_accounting_dimensions(as_list=False) + [
 		frappe._dict({'fieldname': 'project', 'document_type': 'Project', 'label': 'Project'}),
 		frappe._dict({'fieldname': 'cost_center', 'document_type': 'Cost Center', 'label': 'Cost Center'}),
 	]
 
-	for dimension in accounting_dimensions:
-		budget_against = dimension.fieldname
-		if (args.get(budget_against) and args.account
-				and frappe.db.get_value("Account", {"name": args.account, "root_type": "Expense"})):
+class BudgetContext(object):
+	"""
+		Submitted budgets of a company for a fiscal year and the amounts booked against them.
+		Each amount is loaded with one grouped query per budget against field, for all budget accounts,
+		and looked up in memory for every row validated. GL Entries of voucher_no are left out of the
+		loaded actual expense and voucher_entries are added in their place.
+	"""
+	def __init__(self, company, fiscal_year, voucher_type=None, voucher_no=None, voucher_entries=None):
+		self.company = company
+		self.fiscal_year = fiscal_year
+		self.voucher_type = voucher_type
+		self.voucher_no = voucher_no
+		self.voucher_entries = [frappe._dict(d) for d in voucher_entries or []]
+
+		self.budgets = frappe.db.sql("""
+			select
+				b.*, ba.account, ba.budget_amount,
+				ifnull(b.applicable_on_material_request, 0) as for_material_request,
+				ifnull(b.applicable_on_purchase_order, 0) as for_purchase_order,
+				ifnull(b.applicable_on_booking_actual_expenses, 0) as for_actual_expenses
+			from
+				`tabBudget` b, `tabBudget Account` ba
+			where
+				b.name=ba.parent and b.fiscal_year=%s and b.company=%s and b.docstatus=1
+		""", (fiscal_year, company), as_dict=True)
+
+		self.budget_accounts = list(set([d.account for d in self.budgets]))
+		self.tree_bounds = {}
+		self.actual_expense = {}
+		self.requested_amount = {}
+		self.ordered_amount = {}
+
+	def get_budget_records(self, args):
+		"""Budgets for args.account against args' value of the budget against field, or one of its parents"""
+		budget_against_field = args.budget_against_field
+		value = args.get(budget_against_field)
+
+		budgets = [d for d in self.budgets if d.account == args.account and d.get(budget_against_field)]
+		if not budgets:
+			return []
+
+		if args.is_tree:
+			bounds = self.get_tree_bounds(args.budget_against_doctype,
+				[value] + [d.get(budget_against_field) for d in budgets])
+			if value not in bounds:
+				return []
+
+			lft, rgt = bounds[value]
+			budgets = [d for d in budgets if d.get(budget_against_field) in bounds
+				and bounds[d.get(budget_against_field)][0] <= lft and bounds[d.get(budget_against_field)][1] >= rgt]
+		else:
+			budgets = [d for d in budgets if d.get(budget_against_field) == value]
 
-			doctype = dimension.document_type
+		return [frappe._dict(d, budget_against=d.get(budget_against_field)) for d in budgets]
 
-			if frappe.get_cached_value('DocType', doctype, 'is_tree'):
-				lft, rgt = frappe.db.get_value(doctype, args.get(budget_against), ["lft", "rgt"])
-				condition = """and exists(select name from `tab%s`
-					where lft<=%s and rgt>=%s and name=b.%s)""" % (doctype, lft, rgt, budget_against) #nosec
-				args.is_tree = True
-			else:
-				condition = "and b.%s=%s" % (budget_against, frappe.db.escape(args.get(budget_against)))
-				args.is_tree = False
+	def get_tree_bounds(self, doctype, names):
+		"""Returns {name: (lft, rgt)} for names of a tree doctype, loading the ones not seen yet"""
+		tree_bounds = self.tree_bounds.setdefault(doctype, {})
 
-			args.budget_against_field = budget_against
-			args.budget_against_doctype = doctype
-
-			budget_records = frappe.db.sql("""
-				select
-					b.{budget_against_field} as budget_against, ba.budget_amount, b.monthly_distribution,
-					ifnull(b.applicable_on_material_request, 0) as for_material_request,
-					ifnull(applicable_on_purchase_order, 0) as for_purchase_order,
-					ifnull(applicable_on_booking_actual_expenses,0) as for_actual_expenses,
-					b.action_if_annual_budget_exceeded, b.action_if_accumulated_monthly_budget_exceeded,
-					b.action_if_annual_budget_exceeded_on_mr, b.action_if_accumulated_monthly_budget_exceeded_on_mr,
-					b.action_if_annual_budget_exceeded_on_po, b.action_if_accumulated_monthly_budget_exceeded_on_po
-				from
-					`tabBudget` b, `tabBudget Account` ba
-				where
-					b.name=ba.parent and b.fiscal_year=%s
-					and ba.account=%s and b.docstatus=1
-					{condition}
-			""".format(condition=condition, budget_against_field=budget_against), (args.fiscal_year, args.account), as_dict=True) #nosec
+		missing = list(set([d for d in names if d and d not in tree_bounds]))
+		if missing:
+			for name, lft, rgt in frappe.db.sql("""
+				select name, lft, rgt from `tab{0}` where name in %s
+			""".format(doctype), [missing]): #nosec
+				tree_bounds[name] = (lft, rgt)
 
-			if budget_records:
-				validate_budget_records(args, budget_records)
+		return tree_bounds
+
+	def get_actual_expense(self, args):
+		budget_against_field = args.budget_against_field
+		value = args.get(budget_against_field)
 
-def validate_budget_records(args, budget_records):
+		if budget_against_field not in self.actual_expense:
+			self.actual_expense[budget_against_field] = self.get_actual_expense_entries(budget_against_field)
+
+		entries = self.actual_expense[budget_against_field].get(args.account) or []
+
+		if args.is_tree:
+			bounds = self.get_tree_bounds(args.budget_against_doctype,
+				[value] + [d.budget_against for d in entries])
+			if value not in bounds:
+				return 0.0
+
+			lft, rgt = bounds[value]
+			def is_applicable(budget_against):
+				return (budget_against in bounds
+					and bounds[budget_against][0] >= lft and bounds[budget_against][1] <= rgt)
+		else:
+			def is_applicable(budget_against):
+				return budget_against == value
+
+		month_end_date = getdate(args.month_end_date) if args.get("month_end_date") else None
+
+		amount = 0.0
+		for d in entries:
+			if is_applicable(d.budget_against) and (not month_end_date or getdate(d.posting_date) <= month_end_date):
+				amount += flt(d.amount)
+
+		return amount
+
+	def get_actual_expense_entries(self, budget_against_field):
+		"""Returns {account: [GL amount per budget against value and posting date]}, including voucher_entries"""
+		entries = {}
+		if not self.budget_accounts:
+			return entries
+
+		condition = ""
+		if self.voucher_type and self.voucher_no:
+			condition = "and not (gle.voucher_type=%(voucher_type)s and gle.voucher_no=%(voucher_no)s)"
+
+		for d in frappe.db.sql("""
+			select
+				gle.account, gle.{budget_against_field} as budget_against, gle.posting_date,
+				sum(gle.debit) - sum(gle.credit) as amount
+			from `tabGL Entry` gle
+			where gle.account in %(accounts)s
+				and gle.fiscal_year=%(fiscal_year)s
+				and gle.company=%(company)s
+				and gle.docstatus=1
+				and ifnull(gle.{budget_against_field}, '') != ''
+				{condition}
+			group by gle.account, gle.{budget_against_field}, gle.posting_date
+		""".format(budget_against_field=budget_against_field, condition=condition), { #nosec
+			"accounts": self.budget_accounts,
+			"fiscal_year": self.fiscal_year,
+			"company": self.company,
+			"voucher_type": self.voucher_type,
+			"voucher_no": self.voucher_no
+		}, as_dict=True):
+			entries.setdefault(d.account, []).append(d)
+
+		for d in self.voucher_entries:
+			if d.company == self.company and d.account in self.budget_accounts and d.get(budget_against_field):
+				entries.setdefault(d.account, []).append(frappe._dict({
+					"account": d.account,
+					"budget_against": d.get(budget_against_field),
+					"posting_date": d.posting_date,
+					"amount": flt(d.debit) - flt(d.credit)
+				}))
+
+		return entries
+
+	def get_requested_amount(self, args):
+		budget_against_field = args.budget_against_field
+		if budget_against_field not in self.requested_amount:
+			self.requested_amount[budget_against_field] = self.get_pending_amounts(budget_against_field,
+				"Material Request", "schedule_date", "sum((child.stock_qty - child.ordered_qty) * child.rate)",
+				"""child.stock_qty > child.ordered_qty and parent.material_request_type = 'Purchase'
+					and parent.status != 'Stopped'""")
+
+		return self.requested_amount[budget_against_field].get(
+			(args.item_code, args.expense_account, args.get(budget_against_field)), 0)
+
+	def get_ordered_amount(self, args):
+		budget_against_field = args.budget_against_field
+		if budget_against_field not in self.ordered_amount:
+			self.ordered_amount[budget_against_field] = self.get_pending_amounts(budget_against_field,
+				"Purchase Order", "transaction_date", "sum(child.amount - child.billed_amt)",
+				"child.amount > child.billed_amt and parent.status != 'Closed'")
+
+		return self.ordered_amount[budget_against_field].get(
+			(args.item_code, args.expense_account, args.get(budget_against_field)), 0)
+
+	def get_pending_amounts(self, budget_against_field, doctype, date_field, amount, condition):
+		"""Returns {(item_code, expense_account, budget against value): amount} of submitted doctype items"""
+		if not self.budget_accounts:
+			return {}
+
+		year_start_date, year_end_date = frappe.db.get_value("Fiscal Year", self.fiscal_year,
+			["year_start_date", "year_end_date"])
+
+		data = frappe.db.sql("""
+			select child.item_code, child.expense_account, child.{budget_against_field}, {amount}
+			from `tab{doctype} Item` child, `tab{doctype}` parent
+			where parent.name = child.parent and parent.docstatus = 1 and {condition}
+				and child.expense_account in %s and parent.{date_field} between %s and %s
+			group by child.item_code, child.expense_account, child.{budget_against_field}
+		""".format(budget_against_field=budget_against_field, amount=amount, doctype=doctype, #nosec
+			date_field=date_field, condition=condition), (self.budget_accounts, year_start_date, year_end_date))
+
+		return {(item_code, expense_account, value): flt(amount)
+			for item_code, expense_account, value, amount in data}
+
+def validate_budget_records(args, budget_records, budget_context=None):
 	for budget in budget_records:
 		if flt(budget.budget_amount):
-			amount = get_amount(args, budget)
+			amount = get_amount(args, budget, budget_context)
 			yearly_action, monthly_action = get_actions(args, budget)
 
 			if monthly_action in ["Stop", "Warn"]:
@@ -159,15 +349,16 @@ def validate_budget_records(args, budget_records):
 				args["month_end_date"] = get_last_day(args.posting_date)
 
 				compare_expense_with_budget(args, budget_amount,
-					_("Accumulated Monthly"), monthly_action, budget.budget_against, amount)
+					_("Accumulated Monthly"), monthly_action, budget.budget_against, amount, budget_context)
 
 			if yearly_action in ("Stop", "Warn") and monthly_action != "Stop" \
 				and yearly_action != monthly_action:
 				compare_expense_with_budget(args, flt(budget.budget_amount),
-						_("Annual"), yearly_action, budget.budget_against, amount)
+						_("Annual"), yearly_action, budget.budget_against, amount, budget_context)
 
-def compare_expense_with_budget(args, budget_amount, action_for, action, budget_against, amount=0):
-	actual_expense = amount or get_actual_expense(args)
+def compare_expense_with_budget(args, budget_amount, action_for, action, budget_against, amount=0,
+	budget_context=None):
+	actual_expense = amount or get_actual_expense(args, budget_context)
 	if actual_expense > budget_amount:
 		diff = actual_expense - budget_amount
 		currency = frappe.get_cached_value('Company',  args.company,  'default_currency')
@@ -201,19 +392,22 @@ def get_actions(args, budget):
 
 	return yearly_action, monthly_action
 
-def get_amount(args, budget):
+def get_amount(args, budget, budget_context=None):
 	amount = 0
 
 	if args.get('doctype') == 'Material Request' and budget.for_material_request:
-		amount = (get_requested_amount(args, budget)
-			+ get_ordered_amount(args, budget) + get_actual_expense(args))
+		amount = (get_requested_amount(args, budget, budget_context)
+			+ get_ordered_amount(args, budget, budget_context) + get_actual_expense(args, budget_context))
 
 	elif args.get('doctype') == 'Purchase Order' and budget.for_purchase_order:
-		amount = get_ordered_amount(args, budget) + get_actual_expense(args)
+		amount = get_ordered_amount(args, budget, budget_context) + get_actual_expense(args, budget_context)
 
 	return amount
 
-def get_requested_amount(args, budget):
+def get_requested_amount(args, budget, budget_context=None):
+	if budget_context:
+		return budget_context.get_requested_amount(args)
+
 	item_code = args.get('item_code')
 	condition = get_other_condition(args, budget, 'Material Request')
 
@@ -224,7 +418,10 @@ def get_requested_amount(args, budget):
 
 	return data[0][0] if data else 0
 
-def get_ordered_amount(args, budget):
+def get_ordered_amount(args, budget, budget_context=None):
+	if budget_context:
+		return budget_context.get_ordered_amount(args)
+
 	item_code = args.get('item_code')
 	condition = get_other_condition(args, budget, 'Purchase Order')
 
@@ -252,7 +449,10 @@ def get_other_condition(args, budget, for_doc):
 
 	return condition
 
-def get_actual_expense(args):
+def get_actual_expense(args, budget_context=None):
+	if budget_context:
+		return budget_context.get_actual_expense(args)
+
 	if not args.budget_against_doctype:
 		args.budget_against_doctype = frappe.unscrub(args.budget_against_field)
 
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+import frappe
+from frappe.utils import cint, flt, cstr, now_datetime
+from frappe.model.document import Document
+
+
+class GLClosingBalance(Document):
+	pass
+
+
+gl_closing_balance_key_fields = ("company", "fiscal_year", "account", "finance_book", "cost_center", "project",
+	"is_opening", "is_period_closing")
+gl_closing_balance_value_fields = ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency")
+gl_closing_balance_chunk_size = 500
+gl_closing_balance_verify_chunk_size = 50
+
+
+def on_doctype_update():
+	frappe.db.add_index("GL Closing Balance", ["company", "fiscal_year"])
+	frappe.db.add_index("GL Closing Balance", ["account", "fiscal_year"])
+
+
+def is_gl_closing_balance_enabled():
+	return cint(frappe.db.get_single_value("Accounts Settings", "maintain_gl_closing_balances"))
+
+
+def can_use_gl_closing_balances(filters=None):
+	"""Closing balances can be read instead of GL Entry when complete and every dimension filtered on is kept"""
+	from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+
+	if not is_gl_closing_balance_enabled() or not cint(frappe.db.get_default("gl_closing_balances_built")):
+		return False
+
+	if frappe.get_hooks("set_gl_conditions"):
+		return False
+
+	if filters:
+		if filters.get("presentation_currency"):
+			return False
+
+		dimension_fields = get_dimension_fields()
+		for dimension in get_accounting_dimensions(as_list=False):
+			if filters.get(dimension.fieldname) and dimension.fieldname not in dimension_fields:
+				return False
+
+	return True
+
+
+def get_dimension_fields():
+	"""Accounting dimensions that have a column in GL Closing Balance"""
+	from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+
+	meta = frappe.get_meta("GL Closing Balance")
+	return [d for d in get_accounting_dimensions() if meta.has_field(d)]
+
+
+def get_key_fields():
+	return list(gl_closing_balance_key_fields) + get_dimension_fields()
+
+
+def make_dimension_fields():
+	"""Add accounting dimensions created before GL Closing Balance existed"""
+	from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+	from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+
+	meta = frappe.get_meta("GL Closing Balance")
+	for dimension in get_accounting_dimensions(as_list=False, cache=False):
+		if not meta.has_field(dimension.fieldname):
+			create_custom_field("GL Closing Balance", {
+				"fieldname": dimension.fieldname,
+				"label": dimension.label,
+				"fieldtype": "Link",
+				"options": dimension.document_type,
+				"insert_after": "accounting_dimensions_section",
+				"read_only": 1,
+				"owner": "Administrator"
+			})
+
+	frappe.clear_cache(doctype="GL Closing Balance")
+
+
+def get_gl_closing_balance_name(key):
+	return hashlib.sha1("|".join(key).encode("utf-8")).hexdigest()
+
+
+def get_gl_closing_balance_key(gle, key_fields):
+	key = []
+	for fieldname in key_fields:
+		if fieldname == "is_opening":
+			key.append(cstr(gle.get("is_opening")) or "No")
+		elif fieldname == "is_period_closing":
+			is_period_closing = cint(gle.get("is_period_closing")) or gle.get("voucher_type") == "Period Closing Voucher"
+			key.append("1" if is_period_closing else "0")
+		else:
+			key.append(cstr(gle.get(fieldname)))
+
+	return tuple(key)
+
+
+def update_gl_closing_balances(gl_entries, sign=1):
+	"""Add (sign=1) or subtract (sign=-1) debit and credit of GL Entries from their closing balances"""
+	if not gl_entries or not is_gl_closing_balance_enabled():
+		return
+
+	key_fields = get_key_fields()
+
+	balances = {}
+	for gle in gl_entries:
+		key = get_gl_closing_balance_key(gle, key_fields)
+		balance = balances.setdefault(key, frappe._dict({"account_currency": gle.get("account_currency"),
+			"values": [0, 0, 0, 0]}))
+		for i, fieldname in enumerate(gl_closing_balance_value_fields):
+			balance["values"][i] += sign * flt(gle.get(fieldname))
+
+	timestamp = now_datetime()
+	user = frappe.session.user
+	rows = list(balances.items())
+	period_closing_index = key_fields.index("is_period_closing")
+
+	columns = ["name", "creation", "modified", "owner", "modified_by"] + key_fields \
+		+ ["account_currency"] + list(gl_closing_balance_value_fields)
+	placeholder = "({0})".format(", ".join(["%s"] * len(columns)))
+
+	for i in range(0, len(rows), gl_closing_balance_chunk_size):
+		values = []
+		for key, balance in rows[i:i + gl_closing_balance_chunk_size]:
+			key_values = list(key)
+			key_values[period_closing_index] = cint(key_values[period_closing_index])
+
+			values += [get_gl_closing_balance_name(key), timestamp, timestamp, user, user]
+			values += key_values + [balance.account_currency] + balance["values"]
+
+		count = len(values) // len(columns)
+
+		frappe.db.sql("""
+			insert into `tabGL Closing Balance` ({columns})
+			values {values}
+			on duplicate key update {updates}, modified = values(modified)
+		""".format(
+			columns=", ".join(["`{0}`".format(c) for c in columns]),
+			values=", ".join([placeholder] * count),
+			updates=", ".join(["`{0}` = `{0}` + values(`{0}`)".format(f) for f in gl_closing_balance_value_fields])
+		), values)
+
+
+def update_gl_closing_balances_from_gl_entries(conditions, values=None, sign=1):
+	"""
+		Add or subtract saved GL Entries matching conditions in closing balances.
+		Call with sign=-1 before GL Entries are deleted or changed in place.
+	"""
+	if not is_gl_closing_balance_enabled():
+		return
+
+	update_gl_closing_balances(get_gl_entry_totals(conditions, values), sign=sign)
+
+
+def get_gl_entry_totals(conditions, values=None):
+	"""Returns debit and credit of GL Entries matching conditions, summed per closing balance"""
+	key_fields = get_key_fields()
+
+	return frappe.db.sql("""
+		select {key_fields}, max(account_currency) as account_currency,
+			sum(debit) as debit, sum(credit) as credit,
+			sum(debit_in_account_currency) as debit_in_account_currency,
+			sum(credit_in_account_currency) as credit_in_account_currency
+		from (
+			select *, if(voucher_type = 'Period Closing Voucher', 1, 0) as is_period_closing
+			from `tabGL Entry`
+			where {conditions}
+		) gle
+		group by {key_fields}
+	""".format(key_fields=", ".join(key_fields), conditions=conditions), values, as_dict=1)
+
+
+def rebuild_gl_closing_balances(accounts=None):
+	"""Recreate closing balances from GL Entry, for all accounts or only the given ones"""
+	if not accounts:
+		frappe.db.set_default("gl_closing_balances_built", 0)
+		make_dimension_fields()
+		frappe.db.sql("delete from `tabGL Closing Balance`")
+		insert_gl_closing_balances("1=1")
+		frappe.db.set_default("gl_closing_balances_built", 1)
+	else:
+		frappe.db.sql("delete from `tabGL Closing Balance` where account in %s", [accounts])
+		insert_gl_closing_balances("account in %(accounts)s", accounts)
+
+
+def insert_gl_closing_balances(conditions, accounts=None):
+	key_fields = get_key_fields()
+	key_columns = [
+		"ifnull(nullif(is_opening, ''), 'No')" if f == "is_opening"
+			else f if f == "is_period_closing" else "ifnull({0}, '')".format(f)
+		for f in key_fields
+	]
+
+	frappe.db.sql("""
+		insert into `tabGL Closing Balance` (name, creation, modified, owner, modified_by,
+			{key_fields}, account_currency, debit, credit, debit_in_account_currency, credit_in_account_currency)
+		select sha1(concat_ws('|', {key_columns})),
+			%(timestamp)s, %(timestamp)s, %(user)s, %(user)s,
+			{key_columns},
+			max(account_currency), sum(debit), sum(credit),
+			sum(debit_in_account_currency), sum(credit_in_account_currency)
+		from (
+			select *, if(voucher_type = 'Period Closing Voucher', 1, 0) as is_period_closing
+			from `tabGL Entry`
+			where {conditions}
+		) gle
+		group by {key_columns}
+	""".format(key_fields=", ".join(key_fields), key_columns=", ".join(key_columns), conditions=conditions), {
+		"timestamp": now_datetime(),
+		"user": frappe.session.user,
+		"accounts": accounts
+	})
+
+
+def get_gl_closing_balance_differences(accounts):
+	"""Compare closing balances of accounts with GL Entry and return the differences"""
+	precision = frappe.get_precision("GL Entry", "debit") or 2
+	key_fields = get_key_fields()
+
+	expected = {}
+	for d in get_gl_entry_totals("account in %(accounts)s", {"accounts": accounts}):
+		expected[get_gl_closing_balance_key(d, key_fields)] = d
+
+	existing = {}
+	for d in frappe.get_all("GL Closing Balance", filters={"account": ("in", accounts)},
+		fields=key_fields + list(gl_closing_balance_value_fields)):
+		existing[get_gl_closing_balance_key(d, key_fields)] = d
+
+	differences = []
+	for key in sorted(set(expected) | set(existing)):
+		expected_balance, existing_balance = expected.get(key) or {}, existing.get(key) or {}
+		for fieldname in gl_closing_balance_value_fields:
+			if flt(expected_balance.get(fieldname), precision) != flt(existing_balance.get(fieldname), precision):
+				differences.append(frappe._dict({"key": key, "fieldname": fieldname,
+					"expected": flt(expected_balance.get(fieldname), precision),
+					"existing": flt(existing_balance.get(fieldname), precision)}))
+
+	return differences
+
+
+def verify_gl_closing_balances(workers=1, rebuild=False):
+	"""
+		Compare closing balances with GL Entry in chunks of accounts and return the differences.
+		With workers > 1, chunks are verified in parallel worker processes.
+		Run with `bench --site [site] verify-gl-closing-balances [--workers N] [--rebuild]`
+	"""
+	from erpnext.utilities.worker_pool import get_site_worker_pool
+
+	accounts = frappe.db.sql_list("""
+		select distinct account from `tabGL Entry`
+		union
+		select distinct account from `tabGL Closing Balance`
+	""")
+	chunks = [(accounts[i:i + gl_closing_balance_verify_chunk_size], rebuild)
+		for i in range(0, len(accounts), gl_closing_balance_verify_chunk_size)]
+
+	differences = []
+	if cint(workers) > 1:
+		pool = get_site_worker_pool(workers)
+
+		try:
+			for chunk_differences in pool.imap_unordered(verify_gl_closing_balances_for_accounts, chunks):
+				differences += chunk_differences
+		finally:
+			pool.close()
+			pool.join()
+	else:
+		for args in chunks:
+			differences += verify_gl_closing_balances_for_accounts(args)
+
+	if rebuild:
+		frappe.db.set_default("gl_closing_balances_built", 1)
+
+	return differences
+
+
+def verify_gl_closing_balances_for_accounts(args):
+	"""Verify one chunk of accounts, rebuilding them from GL Entry if asked and they differ"""
+	accounts, rebuild = args
+	differences = get_gl_closing_balance_differences(accounts)
+
+	if rebuild and differences:
+		rebuild_gl_closing_balances(accounts)
+		frappe.db.commit()
+
+	return differences
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+import unittest
+from frappe.utils import flt, getdate
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.accounts.doctype.gl_closing_balance.gl_closing_balance import rebuild_gl_closing_balances
+from erpnext.accounts.report.trial_balance.trial_balance import (get_rootwise_opening_balances_from_gl_entries,
+	get_rootwise_opening_balances_from_closing_balances)
+
+
+class TestGLClosingBalance(unittest.TestCase):
+	def setUp(self):
+		self.maintain_gl_closing_balances = frappe.db.get_single_value("Accounts Settings",
+			"maintain_gl_closing_balances")
+		frappe.db.set_value("Accounts Settings", None, "maintain_gl_closing_balances", 1)
+		rebuild_gl_closing_balances()
+
+		if not frappe.db.exists("Finance Book", "_Test Finance Book"):
+			frappe.get_doc({"doctype": "Finance Book", "finance_book_name": "_Test Finance Book"}).insert()
+
+	def tearDown(self):
+		frappe.db.set_value("Accounts Settings", None, "maintain_gl_closing_balances",
+			self.maintain_gl_closing_balances)
+
+	def test_opening_balances_match_gl_entries(self):
+		make_journal_entry("_Test Bank - _TC", "Sales - _TC", 400, posting_date="2012-06-30", submit=True)
+
+		jv = make_journal_entry("_Test Bank - _TC", "Sales - _TC", 250, posting_date="2012-08-31", save=False)
+		jv.finance_book = "_Test Finance Book"
+		jv.submit()
+
+		for finance_book in (None, "_Test Finance Book"):
+			for include_default_book_entries in (0, 1):
+				filters = frappe._dict({
+					"company": "_Test Company",
+					"fiscal_year": "_Test Fiscal Year 2013",
+					"from_date": getdate("2013-01-01"),
+					"to_date": getdate("2013-12-31"),
+					"year_start_date": getdate("2013-01-01"),
+					"year_end_date": getdate("2013-12-31"),
+					"finance_book": finance_book,
+					"include_default_book_entries": include_default_book_entries,
+					"with_period_closing_entry": 1,
+					"show_unclosed_fy_pl_balances": 1
+				})
+
+				for report_type in ("Balance Sheet", "Profit and Loss"):
+					self.assertEqual(
+						get_opening_balances(get_rootwise_opening_balances_from_closing_balances(filters, report_type)),
+						get_opening_balances(get_rootwise_opening_balances_from_gl_entries(filters, report_type)))
+
+
+def get_opening_balances(rows):
+	balances = {}
+	for d in rows:
+		if flt(d.opening_debit, 2) or flt(d.opening_credit, 2):
+			balances[d.account] = (flt(d.opening_debit, 2), flt(d.opening_credit, 2))
+
+	return balances
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+import frappe
+from frappe.utils import cint, flt, cstr, getdate, now_datetime
+from frappe.model.document import Document
+
+
+class GLDailyBalance(Document):
+	pass
+
+
+gl_daily_balance_key_fields = ("company", "account", "posting_date", "fiscal_year", "finance_book", "cost_center",
+	"is_opening", "is_period_closing")
+gl_daily_balance_value_fields = ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency")
+gl_daily_balance_chunk_size = 500
+
+
+def on_doctype_update():
+	frappe.db.add_index("GL Daily Balance", ["company", "posting_date"])
+	frappe.db.add_index("GL Daily Balance", ["account", "posting_date"])
+
+
+def is_gl_daily_balance_enabled():
+	return cint(frappe.db.get_single_value("Accounts Settings", "maintain_gl_daily_balances"))
+
+
+def can_use_gl_daily_balances(filters=None):
+	"""Daily balances can be read instead of GL Entry when complete and not filtered by project or dimensions"""
+	from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+
+	if not is_gl_daily_balance_enabled() or not cint(frappe.db.get_default("gl_daily_balances_built")):
+		return False
+
+	if frappe.get_hooks("set_gl_conditions"):
+		return False
+
+	if filters:
+		if filters.get("project"):
+			return False
+
+		for dimension in get_accounting_dimensions(as_list=False):
+			if filters.get(dimension.fieldname):
+				return False
+
+	return True
+
+
+def get_gl_daily_balance_name(key):
+	return hashlib.sha1("|".join(key).encode("utf-8")).hexdigest()
+
+
+def get_gl_daily_balance_key(gle):
+	return (
+		cstr(gle.get("company")),
+		cstr(gle.get("account")),
+		cstr(getdate(gle.get("posting_date"))),
+		cstr(gle.get("fiscal_year")),
+		cstr(gle.get("finance_book")),
+		cstr(gle.get("cost_center")),
+		cstr(gle.get("is_opening")) or "No",
+		"1" if gle.get("voucher_type") == "Period Closing Voucher" else "0"
+	)
+
+
+def update_gl_daily_balances(gl_entries, sign=1):
+	"""Add (sign=1) or subtract (sign=-1) debit and credit of GL Entries from their daily balances"""
+	if not gl_entries or not is_gl_daily_balance_enabled():
+		return
+
+	balances = {}
+	for gle in gl_entries:
+		key = get_gl_daily_balance_key(gle)
+		balance = balances.setdefault(key, frappe._dict({"account_currency": gle.get("account_currency"),
+			"values": [0, 0, 0, 0]}))
+		for i, fieldname in enumerate(gl_daily_balance_value_fields):
+			balance["values"][i] += sign * flt(gle.get(fieldname))
+
+	timestamp = now_datetime()
+	user = frappe.session.user
+	rows = list(balances.items())
+
+	for i in range(0, len(rows), gl_daily_balance_chunk_size):
+		values = []
+		for key, balance in rows[i:i + gl_daily_balance_chunk_size]:
+			values += [get_gl_daily_balance_name(key), timestamp, timestamp, user, user]
+			values += list(key[:-1]) + [cint(key[-1]), balance.account_currency] + balance["values"]
+
+		columns = ["name", "creation", "modified", "owner", "modified_by"] + list(gl_daily_balance_key_fields) \
+			+ ["account_currency"] + list(gl_daily_balance_value_fields)
+		placeholder = "({0})".format(", ".join(["%s"] * len(columns)))
+		count = len(values) // len(columns)
+
+		frappe.db.sql("""
+			insert into `tabGL Daily Balance` ({columns})
+			values {values}
+			on duplicate key update {updates}, modified = values(modified)
+		""".format(
+			columns=", ".join(["`{0}`".format(c) for c in columns]),
+			values=", ".join([placeholder] * count),
+			updates=", ".join(["`{0}` = `{0}` + values(`{0}`)".format(f) for f in gl_daily_balance_value_fields])
+		), values)
+
+
+def update_gl_daily_balances_from_gl_entries(conditions, values=None, sign=1):
+	"""
+		Add or subtract saved GL Entries matching conditions in daily balances.
+		Call with sign=-1 before GL Entries are deleted or changed in place.
+	"""
+	if not is_gl_daily_balance_enabled():
+		return
+
+	gl_entries = frappe.db.sql("""
+		select company, account, account_currency, posting_date, fiscal_year, finance_book, cost_center, is_opening,
+			if(is_period_closing, 'Period Closing Voucher', '') as voucher_type,
+			sum(debit) as debit, sum(credit) as credit,
+			sum(debit_in_account_currency) as debit_in_account_currency,
+			sum(credit_in_account_currency) as credit_in_account_currency
+		from (
+			select *, if(voucher_type = 'Period Closing Voucher', 1, 0) as is_period_closing
+			from `tabGL Entry`
+			where {0}
+		) gle
+		group by company, account, account_currency, posting_date, fiscal_year, finance_book, cost_center, is_opening,
+			is_period_closing
+	""".format(conditions), values, as_dict=1)
+
+	update_gl_daily_balances(gl_entries, sign=sign)
+
+
+def rebuild_gl_daily_balances():
+	"""Recreate all daily balances from GL Entry"""
+	frappe.db.set_default("gl_daily_balances_built", 0)
+	frappe.db.sql("delete from `tabGL Daily Balance`")
+
+	frappe.db.sql("""
+		insert into `tabGL Daily Balance` (name, creation, modified, owner, modified_by,
+			company, account, posting_date, fiscal_year, finance_book, cost_center, is_opening, is_period_closing,
+			account_currency, debit, credit, debit_in_account_currency, credit_in_account_currency)
+		select sha1(concat_ws('|', company, account, posting_date, ifnull(fiscal_year, ''), ifnull(finance_book, ''),
+				ifnull(cost_center, ''), ifnull(nullif(is_opening, ''), 'No'), is_period_closing)),
+			%(timestamp)s, %(timestamp)s, %(user)s, %(user)s,
+			company, account, posting_date, ifnull(fiscal_year, ''), ifnull(finance_book, ''), ifnull(cost_center, ''),
+			ifnull(nullif(is_opening, ''), 'No'), is_period_closing,
+			max(account_currency), sum(debit), sum(credit),
+			sum(debit_in_account_currency), sum(credit_in_account_currency)
+		from (
+			select *, if(voucher_type = 'Period Closing Voucher', 1, 0) as is_period_closing
+			from `tabGL Entry`
+		) gle
+		group by company, account, posting_date, ifnull(fiscal_year, ''), ifnull(finance_book, ''), ifnull(cost_center, ''),
+			ifnull(nullif(is_opening, ''), 'No'), is_period_closing
+	""", {"timestamp": now_datetime(), "user": frappe.session.user})
+
+	frappe.db.set_default("gl_daily_balances_built", 1)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+import unittest
+from frappe.utils import flt, nowdate, add_days
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance import rebuild_gl_daily_balances
+from erpnext.stock.doctype.item.test_item import create_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+
+
+class TestGLDailyBalance(unittest.TestCase):
+	def setUp(self):
+		self.maintain_gl_daily_balances = frappe.db.get_single_value("Accounts Settings", "maintain_gl_daily_balances")
+		frappe.db.set_value("Accounts Settings", None, "maintain_gl_daily_balances", 1)
+		rebuild_gl_daily_balances()
+
+	def tearDown(self):
+		frappe.db.set_value("Accounts Settings", None, "maintain_gl_daily_balances", self.maintain_gl_daily_balances)
+
+	def test_daily_balance_after_submit_and_cancel(self):
+		jv = make_journal_entry("_Test Bank - _TC", "Sales - _TC", 400, posting_date=add_days(nowdate(), -3), submit=True)
+		self.assert_daily_balances_match_gl_entries("_Test Company")
+
+		jv.cancel()
+		self.assert_daily_balances_match_gl_entries("_Test Company")
+
+	def test_daily_balance_after_stock_repost(self):
+		company = "_Test Company with perpetual inventory"
+		warehouse = "Stores - TCP1"
+		item_code = create_item("_Test GL Daily Balance Item " + frappe.generate_hash(length=8)).name
+
+		make_stock_entry(item_code=item_code, target=warehouse, company=company, qty=10, basic_rate=100,
+			expense_account="Stock Adjustment - TCP1", posting_date=add_days(nowdate(), -5))
+		make_stock_entry(item_code=item_code, source=warehouse, company=company, qty=8,
+			expense_account="Stock Adjustment - TCP1", posting_date=add_days(nowdate(), -2))
+		self.assert_daily_balances_match_gl_entries(company)
+
+		# backdated receipt changes the value of the issue, its GL Entries are reposted
+		make_stock_entry(item_code=item_code, target=warehouse, company=company, qty=5, basic_rate=40,
+			expense_account="Stock Adjustment - TCP1", posting_date=add_days(nowdate(), -6))
+		self.assert_daily_balances_match_gl_entries(company)
+
+	def assert_daily_balances_match_gl_entries(self, company):
+		gl_entries = get_balances("""
+			select account, posting_date, ifnull(finance_book, '') as finance_book, ifnull(cost_center, '') as cost_center,
+				ifnull(nullif(is_opening, ''), 'No') as is_opening, sum(debit) as debit, sum(credit) as credit,
+				sum(debit_in_account_currency) as debit_in_account_currency,
+				sum(credit_in_account_currency) as credit_in_account_currency
+			from `tabGL Entry`
+			where company = %s
+			group by account, posting_date, ifnull(finance_book, ''), ifnull(cost_center, ''),
+				ifnull(nullif(is_opening, ''), 'No')
+		""", company)
+
+		daily_balances = get_balances("""
+			select account, posting_date, finance_book, cost_center, is_opening, sum(debit) as debit,
+				sum(credit) as credit, sum(debit_in_account_currency) as debit_in_account_currency,
+				sum(credit_in_account_currency) as credit_in_account_currency
+			from `tabGL Daily Balance`
+			where company = %s
+			group by account, posting_date, finance_book, cost_center, is_opening
+		""", company)
+
+		self.assertEqual(daily_balances, gl_entries)
+
+
+def get_balances(query, company):
+	"""Returns non-zero balances by key, rounded to currency precision"""
+	balances = {}
+	for d in frappe.db.sql(query, company, as_dict=1):
+		values = tuple(flt(d[f], 2) for f in ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency"))
+		if any(values):
+			balances[(d.account, str(d.posting_date), d.finance_book, d.cost_center, d.is_opening)] = values
+
+	return balances
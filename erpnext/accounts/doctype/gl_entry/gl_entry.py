@@ -33,17 +33,20 @@ class GLEntry(Document):
 
 		if not self.flags.from_repost:
 			self.check_pl_account()
-			self.validate_party()
+			if not self.flags.party_validated:
+				self.validate_party()
 			self.validate_currency()
 
 	def on_update_with_args(self, adv_adj, from_repost=False):
 		if not from_repost:
-			self.validate_account_details(adv_adj)
-			self.validate_dimensions_for_pl_and_bs()
+			# account details are set in flags by validate_gl_entries for entries inserted together
+			self.validate_account_details(adv_adj, self.flags.account_details)
+			self.validate_dimensions_for_pl_and_bs(self.flags.mandatory_for_account)
 			check_freezing_date(self.posting_date, adv_adj)
 
 		validate_frozen_account(self.account, adv_adj)
-		validate_balance_type(self.account, adv_adj)
+		if not self.flags.ignore_balance_type:
+			validate_balance_type(self.account, adv_adj)
 
 	def check_mandatory(self):
 		mandatory = ['account', 'voucher_type', 'voucher_no', 'company']
@@ -86,14 +89,13 @@ class GLEntry(Document):
 
 		remove_dimensions_not_allowed_for_bs_account(self)
 
-	def validate_dimensions_for_pl_and_bs(self):
+	def validate_dimensions_for_pl_and_bs(self, mandatory_for_account=None):
 		account_type = frappe.db.get_value("Account", self.account, "report_type", cache=1)
 
 		accounting_dimensions = get_checks_for_pl_and_bs_accounts()
 		if accounting_dimensions:
-			mandatory_for_account = frappe.get_all("Mandatory Accounting Dimension",
-				filters={'parenttype': 'Account', 'parent': self.account}, fields=['accounting_dimension'])
-			mandatory_for_account = [d.accounting_dimension for d in mandatory_for_account]
+			if mandatory_for_account is None:
+				mandatory_for_account = get_mandatory_dimensions_for_gle([self.account]).get(self.account, [])
 
 			for dimension in get_checks_for_pl_and_bs_accounts():
 				if dimension.name in mandatory_for_account and self.company == dimension.company and not dimension.disabled:
@@ -119,10 +121,10 @@ class GLEntry(Document):
 			frappe.throw(_("{0} {1}: 'Profit and Loss' type account {2} not allowed in Opening Entry")
 				.format(self.voucher_type, self.voucher_no, self.account))
 
-	def validate_account_details(self, adv_adj):
+	def validate_account_details(self, adv_adj, account_details=None):
 		"""Account must be ledger, active and not freezed"""
 
-		ret = frappe.db.sql("""select is_group, docstatus, company
+		ret = account_details or frappe.db.sql("""select is_group, docstatus, company
 			from tabAccount where name=%s""", self.account, as_dict=1)[0]
 
 		if ret.is_group==1:
@@ -173,7 +175,7 @@ class GLEntry(Document):
 				.format(self.voucher_type, self.voucher_no, self.account,
 				(account_currency or company_currency)), InvalidAccountCurrency)
 
-		if self.party_type and self.party:
+		if self.party_type and self.party and not self.flags.party_validated:
 			validate_party_gle_currency(self.party_type, self.party, self.company, self.account_currency)
 
 	def validate_and_set_fiscal_year(self):
@@ -181,6 +183,51 @@ class GLEntry(Document):
 			self.fiscal_year = get_fiscal_year(self.posting_date, company=self.company)[0]
 
 
+def validate_gl_entries(gl_entries):
+	"""
+		Run the validate checks of GL Entries that are inserted together, with party checks run once
+		per party and account, and set the Account details used by on_update_with_args in flags.
+		Balance type is checked by the caller once for each account after on_update_with_args.
+	"""
+	accounts = [d.account for d in gl_entries]
+	account_details = get_account_details_for_gle(accounts)
+	mandatory_dimensions = get_mandatory_dimensions_for_gle(accounts)
+
+	validated_parties = set()
+	for gle in gl_entries:
+		party_key = (gle.party_type, gle.party, gle.company, gle.account)
+		gle.flags.party_validated = party_key in validated_parties
+		gle.flags.ignore_balance_type = True
+		gle.flags.account_details = account_details.get(gle.account)
+		gle.flags.mandatory_for_account = mandatory_dimensions.get(gle.account, [])
+
+		gle.validate()
+
+		validated_parties.add(party_key)
+
+
+def get_account_details_for_gle(accounts):
+	accounts = list(set(accounts))
+	if not accounts:
+		return {}
+
+	return {d.name: d for d in frappe.db.sql("""
+		select name, is_group, docstatus, company
+		from tabAccount where name in %s
+	""", [accounts], as_dict=1)}
+
+
+def get_mandatory_dimensions_for_gle(accounts):
+	mandatory_dimensions = {}
+	if get_checks_for_pl_and_bs_accounts():
+		for d in frappe.get_all("Mandatory Accounting Dimension",
+				filters={'parenttype': 'Account', 'parent': ['in', list(set(accounts))]},
+				fields=['parent', 'accounting_dimension']):
+			mandatory_dimensions.setdefault(d.parent, []).append(d.accounting_dimension)
+
+	return mandatory_dimensions
+
+
 def validate_balance_type(account, adv_adj=False):
 	if not adv_adj and account:
 		balance_must_be = frappe.db.get_value("Account", account, "balance_must_be", cache=1)
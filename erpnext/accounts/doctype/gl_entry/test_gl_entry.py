@@ -4,6 +4,8 @@
 import frappe, unittest
 from frappe.model.naming import parse_naming_series
 from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.accounts.doctype.gl_entry.gl_entry import GLEntry
+from erpnext.accounts.doctype.budget.test_budget import make_budget, set_total_expense_zero
 
 class TestGLEntry(unittest.TestCase):
 	def test_round_off_entry(self):
@@ -23,3 +25,68 @@ class TestGLEntry(unittest.TestCase):
 			and debit = 0 and credit = '.01'""", jv.name)
 
 		self.assertTrue(round_off_entry)
+
+	def test_bulk_inserted_gl_entries(self):
+		bulk_insert_gl_entries = frappe.db.get_single_value("Accounts Settings", "bulk_insert_gl_entries")
+		run_method = GLEntry.run_method
+
+		gl_entries, hooks = {}, {}
+		try:
+			for bulk_insert in (0, 1):
+				frappe.db.set_value("Accounts Settings", None, "bulk_insert_gl_entries", bulk_insert)
+				entry_hooks = hooks[bulk_insert] = {}
+
+				def record_run_method(doc, method, *args, **kwargs):
+					entry_hooks.setdefault(doc.account, []).append(method)
+					return run_method(doc, method, *args, **kwargs)
+
+				jv = make_journal_entry("_Test Account Cost for Goods Sold - _TC", "_Test Bank - _TC", 100,
+					"_Test Cost Center - _TC")
+				GLEntry.run_method = record_run_method
+				try:
+					jv.submit()
+				finally:
+					GLEntry.run_method = run_method
+
+				gl_entries[bulk_insert] = frappe.db.sql("""
+					select account, debit, credit, debit_in_account_currency, credit_in_account_currency,
+						party_type, party, against, cost_center, posting_date, fiscal_year, is_opening, docstatus
+					from `tabGL Entry`
+					where voucher_type='Journal Entry' and voucher_no=%s
+					order by account
+				""", jv.name, as_dict=1)
+		finally:
+			frappe.db.set_value("Accounts Settings", None, "bulk_insert_gl_entries", bulk_insert_gl_entries)
+
+		self.assertEqual(gl_entries[0], gl_entries[1])
+		self.assertTrue(hooks[0])
+		self.assertEqual(hooks[0], hooks[1])
+
+	def test_budget_validated_after_all_gl_entries(self):
+		bulk_insert_gl_entries = frappe.db.get_single_value("Accounts Settings", "bulk_insert_gl_entries")
+		try:
+			for bulk_insert in (0, 1):
+				frappe.db.set_value("Accounts Settings", None, "bulk_insert_gl_entries", bulk_insert)
+				set_total_expense_zero("2013-02-28", "cost_center")
+				budget = make_budget(budget_against="Cost Center")
+
+				# first row is over the annual budget, the voucher as a whole is not
+				jv = make_journal_entry("_Test Account Cost for Goods Sold - _TC", "_Test Bank - _TC", 120000,
+					"_Test Cost Center - _TC", posting_date="2013-02-28", save=False)
+				jv.accounts[1].credit_in_account_currency = 90000
+				jv.append("accounts", {
+					"account": "_Test Account Cost for Goods Sold - _TC",
+					"cost_center": "_Test Cost Center - _TC",
+					"credit_in_account_currency": 30000
+				})
+				jv.insert()
+				jv.submit()
+
+				self.assertTrue(frappe.db.get_value("GL Entry",
+					{"voucher_type": "Journal Entry", "voucher_no": jv.name}))
+
+				jv.cancel()
+				budget.load_from_db()
+				budget.cancel()
+		finally:
+			frappe.db.set_value("Accounts Settings", None, "bulk_insert_gl_entries", bulk_insert_gl_entries)
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+import frappe
+from frappe.utils import cint, flt, cstr
+from frappe.model.document import Document
+from erpnext.utilities.bulk_insert import bulk_insert
+
+
+class PartyOpenItem(Document):
+	pass
+
+
+party_open_item_key_fields = ("party_type", "party", "account", "voucher_type", "voucher_no")
+party_open_item_fields = party_open_item_key_fields + ("account_currency", "party_account_type", "company",
+	"posting_date", "due_date", "cost_center", "debit_in_account_currency", "credit_in_account_currency",
+	"invoice_amount", "payment_amount", "outstanding_amount")
+party_open_item_amount_fields = ("debit_in_account_currency", "credit_in_account_currency",
+	"invoice_amount", "payment_amount", "outstanding_amount")
+party_open_item_chunk_size = 500
+
+receivable_dr_or_cr = "debit_in_account_currency - credit_in_account_currency"
+payable_dr_or_cr = "credit_in_account_currency - debit_in_account_currency"
+
+
+def on_doctype_update():
+	frappe.db.add_index("Party Open Item", ["party_type", "party", "account"])
+	frappe.db.add_index("Party Open Item", ["voucher_no", "voucher_type"])
+
+
+def is_party_open_item_enabled():
+	return cint(frappe.db.get_single_value("Accounts Settings", "maintain_party_open_items"))
+
+
+def can_use_party_open_items():
+	return is_party_open_item_enabled() and cint(frappe.db.get_default("party_open_items_built"))
+
+
+def get_party_open_item_name(key):
+	return hashlib.sha1("|".join(key).encode("utf-8")).hexdigest()
+
+
+def get_party_open_item_key(gle):
+	"""Returns the open item a party GL Entry belongs to, which is its against voucher or else its own voucher"""
+	if not gle.get("party_type") or not gle.get("party"):
+		return None
+
+	if gle.get("against_voucher_type") and gle.get("against_voucher"):
+		voucher_type, voucher_no = gle.get("against_voucher_type"), gle.get("against_voucher")
+	else:
+		voucher_type, voucher_no = gle.get("voucher_type"), gle.get("voucher_no")
+
+	return (cstr(gle.get("party_type")), cstr(gle.get("party")), cstr(gle.get("account")),
+		cstr(voucher_type), cstr(voucher_no))
+
+
+def get_party_open_item_keys(conditions, values=None):
+	"""Returns open item keys of saved GL Entries matching conditions"""
+	gl_entries = frappe.db.sql("""
+		select distinct party_type, party, account, voucher_type, voucher_no, against_voucher_type, against_voucher
+		from `tabGL Entry`
+		where ifnull(party_type, '') != '' and ifnull(party, '') != '' and ({0})
+	""".format(conditions), values, as_dict=1)
+
+	return set([get_party_open_item_key(gle) for gle in gl_entries])
+
+
+def get_party_account_type_for_account(account):
+	root_type, account_type = frappe.get_cached_value("Account", account, ["root_type", "account_type"])
+	party_account_type = "Receivable" if root_type == "Asset" else "Payable"
+	return account_type or party_account_type
+
+
+def update_party_open_items(keys):
+	"""Recompute open items for (party_type, party, account, voucher_type, voucher_no) keys from GL Entry"""
+	if not is_party_open_item_enabled():
+		return
+
+	keys = list(set([key for key in keys if key]))
+
+	for i in range(0, len(keys), party_open_item_chunk_size):
+		chunk = set(keys[i:i + party_open_item_chunk_size])
+		voucher_nos = list(set([key[4] for key in chunk]))
+
+		open_items = get_party_open_items_from_gl_entries("voucher_no in %(voucher_nos)s",
+			"against_voucher in %(voucher_nos)s", {"voucher_nos": voucher_nos})
+		open_items = [d for d in open_items if get_key_from_open_item(d) in chunk]
+
+		frappe.db.sql("delete from `tabParty Open Item` where name in %s",
+			[[get_party_open_item_name(key) for key in chunk]])
+		insert_party_open_items(open_items)
+
+
+def insert_party_open_items(open_items):
+	for d in open_items:
+		d.name = get_party_open_item_name(get_key_from_open_item(d))
+
+	bulk_insert("Party Open Item", open_items, party_open_item_fields)
+
+
+def get_key_from_open_item(open_item):
+	return tuple(cstr(open_item.get(f)) for f in party_open_item_key_fields)
+
+
+def get_party_open_items_from_gl_entries(invoice_conditions=None, payment_conditions=None, values=None):
+	"""
+		Returns open items built from GL Entry, same as get_outstanding_invoices:
+		invoice amount is the voucher's own party entries and payment amount the entries made against it
+	"""
+	precision = frappe.get_precision("Sales Invoice", "outstanding_amount") or 2
+
+	invoices = frappe.db.sql("""
+		select
+			party_type, party, account, voucher_type, voucher_no,
+			max(company) as company, max(account_currency) as account_currency,
+			min(posting_date) as posting_date, max(due_date) as due_date, max(cost_center) as cost_center,
+			sum(debit_in_account_currency) as debit_in_account_currency,
+			sum(credit_in_account_currency) as credit_in_account_currency
+		from `tabGL Entry`
+		where ifnull(party_type, '') != '' and ifnull(party, '') != ''
+			and ifnull(against_voucher, '') = '' and voucher_type != 'Payment Entry' {0}
+		group by party_type, party, account, voucher_type, voucher_no
+	""".format(" and " + invoice_conditions if invoice_conditions else ""), values, as_dict=1)
+
+	if not invoices:
+		return []
+
+	payments = frappe.db.sql("""
+		select
+			party_type, party, account, against_voucher_type, against_voucher,
+			sum(debit_in_account_currency - credit_in_account_currency) as balance
+		from `tabGL Entry`
+		where ifnull(party_type, '') != '' and ifnull(party, '') != ''
+			and ifnull(against_voucher, '') != '' {0}
+		group by party_type, party, account, against_voucher_type, against_voucher
+	""".format(" and " + payment_conditions if payment_conditions else ""), values, as_dict=1)
+
+	payment_map = {}
+	for d in payments:
+		payment_map[(d.party_type, d.party, d.account, d.against_voucher_type, d.against_voucher)] = flt(d.balance)
+
+	due_dates = get_due_dates(invoices)
+
+	for d in invoices:
+		d.party_account_type = get_party_account_type_for_account(d.account)
+		sign = 1 if d.party_account_type == "Receivable" else -1
+
+		d.invoice_amount = flt(sign * (flt(d.debit_in_account_currency) - flt(d.credit_in_account_currency)), precision)
+		d.payment_amount = flt(-sign * payment_map.get((d.party_type, d.party, d.account, d.voucher_type, d.voucher_no), 0),
+			precision)
+		d.outstanding_amount = flt(d.invoice_amount - d.payment_amount, precision)
+
+		if d.party_type == "Employee":
+			d.due_date = d.posting_date
+		elif (d.voucher_type, d.voucher_no) in due_dates:
+			d.due_date = due_dates[(d.voucher_type, d.voucher_no)]
+
+	return invoices
+
+
+def get_due_dates(invoices):
+	"""Returns due date from the voucher for vouchers with a due date field"""
+	voucher_nos = {}
+	for d in invoices:
+		if d.party_type != "Employee":
+			voucher_nos.setdefault(d.voucher_type, set()).add(d.voucher_no)
+
+	due_dates = {}
+	for voucher_type, names in voucher_nos.items():
+		if not frappe.get_meta(voucher_type).has_field("due_date"):
+			continue
+
+		names = list(names)
+		for i in range(0, len(names), party_open_item_chunk_size):
+			for name, due_date in frappe.db.sql("""
+				select name, due_date from `tab{0}` where name in %s
+			""".format(voucher_type), [names[i:i + party_open_item_chunk_size]]):
+				due_dates[(voucher_type, name)] = due_date
+
+	return due_dates
+
+
+def get_party_open_items(party_type, party, account, condition=None):
+	"""Returns open items of a party account, condition is applied on Party Open Item columns"""
+	return frappe.db.sql("""
+		select
+			voucher_no, voucher_type, posting_date, due_date, account_currency as currency,
+			invoice_amount, payment_amount, outstanding_amount
+		from `tabParty Open Item`
+		where party_type = %(party_type)s and party = %(party)s and account = %(account)s {condition}
+		order by posting_date, voucher_no
+	""".format(condition=condition or ""), {
+		"party_type": party_type,
+		"party": party,
+		"account": account
+	}, as_dict=1)
+
+
+def get_party_open_item_balance(voucher_type, voucher_no, party_type, party, account, dr_or_cr):
+	"""Returns outstanding of the voucher in the direction of dr_or_cr, or None if it is not an open item"""
+	if dr_or_cr not in (receivable_dr_or_cr, payable_dr_or_cr):
+		return None
+
+	key = (cstr(party_type), cstr(party), cstr(account), cstr(voucher_type), cstr(voucher_no))
+	open_item = frappe.db.get_value("Party Open Item", get_party_open_item_name(key),
+		["party_account_type", "outstanding_amount"], as_dict=1)
+	if not open_item:
+		return None
+
+	if (open_item.party_account_type == "Receivable") == (dr_or_cr == receivable_dr_or_cr):
+		return flt(open_item.outstanding_amount)
+	else:
+		return -flt(open_item.outstanding_amount)
+
+
+def rebuild_party_open_items():
+	"""Recreate all open items from GL Entry"""
+	frappe.db.set_default("party_open_items_built", 0)
+	frappe.db.sql("delete from `tabParty Open Item`")
+
+	insert_party_open_items(get_party_open_items_from_gl_entries())
+
+	frappe.db.set_default("party_open_items_built", 1)
+
+
+def verify_party_open_items(rebuild=False):
+	"""
+		Compare open items with GL Entry and return the differences.
+		Run with `bench --site [site] verify-party-open-items [--rebuild]`
+	"""
+	precision = frappe.get_precision("Sales Invoice", "outstanding_amount") or 2
+
+	expected = {}
+	for d in get_party_open_items_from_gl_entries():
+		expected[get_key_from_open_item(d)] = d
+
+	existing = {}
+	for d in frappe.get_all("Party Open Item", fields=list(party_open_item_fields)):
+		existing[get_key_from_open_item(d)] = d
+
+	differences = []
+	for key in sorted(set(expected) | set(existing)):
+		expected_item, existing_item = expected.get(key), existing.get(key)
+		if not expected_item or not existing_item:
+			differences.append(frappe._dict({"key": key, "fieldname": None,
+				"expected": bool(expected_item), "existing": bool(existing_item)}))
+			continue
+
+		for fieldname in party_open_item_amount_fields:
+			if flt(expected_item.get(fieldname), precision) != flt(existing_item.get(fieldname), precision):
+				differences.append(frappe._dict({"key": key, "fieldname": fieldname,
+					"expected": flt(expected_item.get(fieldname), precision),
+					"existing": flt(existing_item.get(fieldname), precision)}))
+
+	if rebuild:
+		rebuild_party_open_items()
+
+	return differences
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+import unittest
+from frappe.utils import nowdate
+from erpnext.accounts.utils import get_outstanding_invoices
+from erpnext.accounts.doctype.party_open_item.party_open_item import (rebuild_party_open_items,
+	verify_party_open_items)
+from erpnext.accounts.doctype.payment_entry.payment_entry import get_payment_entry
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+
+
+class TestPartyOpenItem(unittest.TestCase):
+	def setUp(self):
+		self.maintain_party_open_items = frappe.db.get_single_value("Accounts Settings", "maintain_party_open_items")
+		frappe.db.set_value("Accounts Settings", None, "maintain_party_open_items", 1)
+		rebuild_party_open_items()
+
+	def tearDown(self):
+		frappe.db.set_value("Accounts Settings", None, "maintain_party_open_items", self.maintain_party_open_items)
+
+	def test_open_items_after_invoice_payment_return_and_cancel(self):
+		si = create_sales_invoice(qty=5, rate=100)
+		self.assert_open_items_match_gl_entries(si)
+
+		pe = get_payment_entry("Sales Invoice", si.name, party_amount=200, bank_account="_Test Bank - _TC")
+		pe.reference_no = "1"
+		pe.reference_date = nowdate()
+		pe.submit()
+		self.assert_open_items_match_gl_entries(si)
+
+		return_si = create_sales_invoice(qty=-1, rate=100, is_return=1, return_against=si.name)
+		self.assert_open_items_match_gl_entries(si)
+
+		return_si.cancel()
+		self.assert_open_items_match_gl_entries(si)
+
+		pe.cancel()
+		self.assert_open_items_match_gl_entries(si)
+
+		si.cancel()
+		self.assert_open_items_match_gl_entries(si)
+
+	def assert_open_items_match_gl_entries(self, si):
+		self.assertEqual(verify_party_open_items(), [])
+
+		open_item_invoices = get_outstanding_invoices("Customer", si.customer, si.debit_to)
+		gl_entry_invoices = get_outstanding_invoices("Customer", si.customer, si.debit_to, gl_entry_condition=True)
+		self.assertEqual(get_outstanding_amounts(open_item_invoices), get_outstanding_amounts(gl_entry_invoices))
+
+
+def get_outstanding_amounts(invoices):
+	return sorted((d.voucher_type, d.voucher_no, d.invoice_amount, d.payment_amount, d.outstanding_amount)
+		for d in invoices)
@@ -728,8 +728,10 @@ def get_outstanding_reference_documents(args):
 	if args.get("company"):
 		condition += " and company = {0}".format(frappe.db.escape(args.get("company")))
 
+	# cost center is filtered on each GL Entry of the invoice
 	outstanding_invoices = get_outstanding_invoices(args.get("party_type"), args.get("party"),
-		args.get("party_account"), condition=condition, include_negative_outstanding=True)
+		args.get("party_account"), condition=condition, include_negative_outstanding=True,
+		gl_entry_condition=bool(args.get("cost_center")))
 
 	if args.get("outstanding_amt_greater_than"):
 		outstanding_invoices = [i for i in outstanding_invoices if i["outstanding_amount"] > args.get("outstanding_amt_greater_than")]
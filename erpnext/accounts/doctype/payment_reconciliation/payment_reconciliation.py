@@ -38,8 +38,10 @@ class PaymentReconciliation(Document):
 
 		condition = self.check_condition()
 
+		# amount limits are applied on each GL Entry of the invoice
 		non_reconciled_invoices = get_outstanding_invoices(self.party_type, self.party,
-			self.receivable_payable_account, condition=condition)
+			self.receivable_payable_account, condition=condition,
+			gl_entry_condition=bool(self.minimum_amount or self.maximum_amount))
 
 		if self.limit:
 			non_reconciled_invoices = non_reconciled_invoices[:self.limit]
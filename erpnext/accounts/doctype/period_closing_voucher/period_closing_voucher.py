@@ -2,12 +2,14 @@
 # License: GNU General Public License v3. See license.txt
 
 import frappe
-from frappe.utils import flt
+from frappe.utils import flt, getdate
 from frappe import _
 from erpnext.accounts.utils import get_account_currency
 from erpnext.controllers.accounts_controller import AccountsController
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (get_accounting_dimensions,
 	get_dimension_filters)
+from erpnext.accounts.doctype.gl_closing_balance.gl_closing_balance import (can_use_gl_closing_balances,
+	get_dimension_fields as get_closing_balance_dimension_fields, update_gl_closing_balances_from_gl_entries)
 
 
 class PeriodClosingVoucher(AccountsController):
@@ -34,6 +36,12 @@ class PeriodClosingVoucher(AccountsController):
 			self._submit()
 
 	def on_cancel(self):
+		from erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance import update_gl_daily_balances_from_gl_entries
+		update_gl_daily_balances_from_gl_entries("voucher_type = 'Period Closing Voucher' and voucher_no = %s",
+			self.name, sign=-1)
+		update_gl_closing_balances_from_gl_entries("voucher_type = 'Period Closing Voucher' and voucher_no = %s",
+			self.name, sign=-1)
+
 		frappe.db.sql("""
 			delete from `tabGL Entry`
 			where voucher_type = 'Period Closing Voucher' and voucher_no=%s
@@ -56,7 +64,8 @@ class PeriodClosingVoucher(AccountsController):
 
 		validate_fiscal_year(self.posting_date, self.fiscal_year, self.company, label=_("Posting Date"), doc=self)
 
-		self.year_start_date = get_fiscal_year(self.posting_date, self.fiscal_year, company=self.company)[1]
+		self.year_start_date, self.year_end_date = get_fiscal_year(self.posting_date, self.fiscal_year,
+			company=self.company)[1:3]
 
 		pce = frappe.db.sql("""
 			select name from `tabPeriod Closing Voucher`
@@ -131,6 +140,9 @@ class PeriodClosingVoucher(AccountsController):
 		self.validate_posting_date()
 
 		"""Get balance for pl accounts"""
+		if self.can_use_closing_balances(dimension_fields):
+			return self.get_pl_balances_from_closing_balances(dimension_fields)
+
 		return frappe.db.sql("""
 			select
 				t1.account, t2.account_currency, {dimension_fields},
@@ -143,3 +155,44 @@ class PeriodClosingVoucher(AccountsController):
 			group by t1.account, {dimension_fields}
 		""".format(dimension_fields=', '.join(dimension_fields)),
 			(self.company, self.get("year_start_date"), self.posting_date), as_dict=1)
+
+	def can_use_closing_balances(self, dimension_fields):
+		"""Closing balances hold the whole fiscal year, so they can be used if nothing is posted after this voucher"""
+		if not can_use_gl_closing_balances():
+			return False
+
+		closing_balance_fields = ['t1.cost_center', 't1.project'] + \
+			['t1.{0}'.format(d) for d in get_closing_balance_dimension_fields()]
+		if set(dimension_fields) - set(closing_balance_fields):
+			return False
+
+		if getdate(self.posting_date) >= getdate(self.get("year_end_date")):
+			return True
+
+		return not frappe.db.sql("""
+			select name from `tabGL Entry`
+			where company = %s and fiscal_year = %s and posting_date > %s
+			limit 1
+		""", (self.company, self.fiscal_year, self.posting_date))
+
+	def get_pl_balances_from_closing_balances(self, dimension_fields):
+		pl_accounts = frappe.db.sql("""
+			select
+				t1.account, t2.account_currency, {dimension_fields},
+				sum(t1.debit_in_account_currency) - sum(t1.credit_in_account_currency) as balance_in_account_currency,
+				sum(t1.debit) - sum(t1.credit) as balance_in_company_currency
+			from `tabGL Closing Balance` t1, `tabAccount` t2
+			where t1.account = t2.name and t2.report_type = 'Profit and Loss'
+			and t2.docstatus < 2 and t2.company = %s
+			and t1.company = %s and t1.fiscal_year = %s
+			group by t1.account, {dimension_fields}
+		""".format(dimension_fields=', '.join(dimension_fields)),
+			(self.company, self.company, self.fiscal_year), as_dict=1)
+
+		# closing balances keep empty dimensions as blank instead of null
+		for d in pl_accounts:
+			for fieldname in dimension_fields:
+				fieldname = fieldname.split(".")[1]
+				d[fieldname] = d.get(fieldname) or None
+
+		return pl_accounts
@@ -33,6 +33,19 @@ class PricingRule(Document):
 
 		if not self.margin_type: self.margin_rate_or_amount = 0.0
 
+	def on_update(self):
+		self.clear_pricing_rule_index()
+
+	def on_trash(self):
+		self.clear_pricing_rule_index()
+
+	def after_rename(self, old_name, new_name, merge):
+		self.clear_pricing_rule_index()
+
+	def clear_pricing_rule_index(self):
+		from erpnext.accounts.doctype.pricing_rule.utils import clear_pricing_rule_index
+		clear_pricing_rule_index()
+
 	def validate_duplicate_apply_on(self):
 		field = apply_on_dict.get(self.apply_on)
 		if not field:
@@ -186,6 +199,8 @@ def apply_pricing_rule(args, doc=None):
 	item_list = args.get("items")
 	args.pop("items")
 
+	doc = get_pricing_rule_doc(doc)
+
 	set_serial_nos_based_on_fifo = frappe.get_cached_value("Stock Settings", None,
 		"automatically_set_serial_nos_based_on_fifo")
 
@@ -215,11 +230,7 @@ def get_pricing_rule_for_item(args, price_list_rate=0, doc=None, for_validate=Fa
 	from erpnext.accounts.doctype.pricing_rule.utils import (get_pricing_rules,
 		get_applied_pricing_rules, get_pricing_rule_items, get_product_discount_rule)
 
-	if isinstance(doc, string_types):
-		doc = json.loads(doc)
-
-	if doc:
-		doc = frappe.get_doc(doc)
+	doc = get_pricing_rule_doc(doc)
 
 	if (args.get('is_free_item') or
 		args.get("parenttype") == "Material Request"): return {}
@@ -294,6 +305,21 @@ def get_pricing_rule_for_item(args, price_list_rate=0, doc=None, for_validate=Fa
 
 	return item_details
 
+def get_pricing_rule_doc(doc):
+	"""
+		Returns the transaction to match pricing rules against, without building a Document from it.
+		Pricing rules only read parent values and item rows, so a dict is wrapped with its rows kept as they are,
+		keeping the cost per item row the same however many rows the transaction has.
+	"""
+	if isinstance(doc, string_types):
+		doc = json.loads(doc)
+
+	if doc and not isinstance(doc, Document):
+		doc = frappe._dict(doc)
+		doc["items"] = doc.get("items") or []
+
+	return doc
+
 def update_args_for_pricing_rule(args):
 	if not (args.item_group and args.brand):
 		try:
@@ -0,0 +1,132 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""
+Benchmark of pricing rule matching with the SQL queries and with the pricing rule index.
+
+Matches the same generated item lines with both, checks that both find the same rules and prints the time taken
+by each. With rules > 0, that many Pricing Rules are created on random items, item groups and customers first and
+rolled back at the end. Run with
+
+	bench --site [site] execute erpnext.accounts.doctype.pricing_rule.pricing_rule_benchmark.run --kwargs "{'lines': 1000, 'rules': 3000}"
+"""
+
+import copy
+import json
+import random
+import timeit
+import frappe
+from frappe.utils import nowdate
+from erpnext.accounts.doctype.pricing_rule.pricing_rule import update_args_for_pricing_rule
+from erpnext.accounts.doctype.pricing_rule.utils import (_get_pricing_rules, get_pricing_rules_from_index,
+	get_pricing_rule_index, apply_on_table)
+
+apply_on_list = ['Item Code', 'Item Group', 'Brand']
+
+
+def run(lines=1000, rules=0, seed=1, company=None, repeat=3):
+	rng = random.Random(seed)
+	company = company or frappe.defaults.get_defaults().company
+
+	try:
+		if rules:
+			make_pricing_rules(rules, rng, company)
+
+		item_lines = get_item_lines(lines, rng, company)
+
+		sql_time, sql_result = time_matching(get_rules_from_db, item_lines, repeat)
+		print("SQL: {0:.3f}s for {1} lines".format(sql_time, lines))
+
+		index_time, index_result = time_matching(get_rules_from_index, item_lines, repeat)
+		print("Index: {0:.3f}s for {1} lines".format(index_time, lines))
+
+		same_result = dump_result(sql_result) == dump_result(index_result)
+		print("Same rules: {0}".format(same_result))
+		print("Speedup: {0:.2f}x".format(sql_time / index_time if index_time else 0))
+	finally:
+		if rules:
+			frappe.db.rollback()
+
+	return same_result
+
+
+def time_matching(get_rules, item_lines, repeat):
+	timings = []
+	for i in range(repeat):
+		frappe.flags.tree_conditions = {}
+		frappe.flags.tree_ancestors = {}
+
+		start = timeit.default_timer()
+		result = [get_rules(copy.deepcopy(args)) for args in item_lines]
+		timings.append(timeit.default_timer() - start)
+
+	return min(timings), result
+
+
+def get_rules_from_db(args):
+	return [_get_pricing_rules(apply_on, args, {}) for apply_on in apply_on_list]
+
+
+def get_rules_from_index(args):
+	index = get_pricing_rule_index()
+	return [get_pricing_rules_from_index(apply_on, args, index) for apply_on in apply_on_list]
+
+
+def get_item_lines(lines, rng, company):
+	"""Generate selling item lines for random items and customers, with item and customer groups set"""
+	items = frappe.get_all("Item", filters={"disabled": 0, "has_variants": 0}, pluck="name")
+	customers = frappe.get_all("Customer", filters={"disabled": 0}, pluck="name") or [None]
+	price_list = frappe.db.get_single_value("Selling Settings", "selling_price_list")
+
+	item_lines = []
+	for i in range(lines):
+		args = frappe._dict({
+			"item_code": rng.choice(items),
+			"customer": rng.choice(customers),
+			"company": company,
+			"price_list": price_list,
+			"transaction_date": nowdate(),
+			"doctype": "Sales Invoice",
+			"selling_or_buying": "selling",
+		})
+		update_args_for_pricing_rule(args)
+		item_lines.append(args)
+
+	return item_lines
+
+
+def make_pricing_rules(rules, rng, company):
+	"""Create Pricing Rules applied on random items, item groups or brands, some for a customer"""
+	items = frappe.get_all("Item", filters={"disabled": 0}, pluck="name")
+	item_groups = frappe.get_all("Item Group", pluck="name")
+	brands = frappe.get_all("Brand", pluck="name")
+	customers = frappe.get_all("Customer", filters={"disabled": 0}, pluck="name")
+
+	for i in range(rules):
+		apply_on = rng.choice(['Item Code'] * 6 + ['Item Group'] * 3 + (['Brand'] if brands else []))
+		value = rng.choice({'Item Code': items, 'Item Group': item_groups, 'Brand': brands}[apply_on])
+
+		doc = frappe.get_doc({
+			"doctype": "Pricing Rule",
+			"title": "_Benchmark Pricing Rule {0}".format(i),
+			"apply_on": apply_on,
+			"selling": 1,
+			"company": company,
+			"rate_or_discount": "Discount Percentage",
+			"discount_percentage": rng.randint(1, 20),
+			"priority": str(rng.randint(1, 20)),
+		})
+		doc.append(apply_on_table[apply_on], {
+			frappe.scrub(apply_on): value
+		})
+
+		if customers and rng.random() < 0.3:
+			doc.applicable_for = "Customer"
+			doc.customer = rng.choice(customers)
+
+		doc.insert(ignore_permissions=True)
+
+
+def dump_result(result):
+	return json.dumps([[sorted([(d.name, d.get('item_code') or d.get('item_group') or d.get('brand'), d.uom)
+		for d in rules]) for rules in line] for line in result], default=str)
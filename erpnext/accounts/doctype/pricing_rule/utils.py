@@ -21,10 +21,10 @@ apply_on_table = {
 
 def get_pricing_rules(args, doc=None):
 	pricing_rules = []
-	values =  {}
+	index = get_pricing_rule_index()
 
 	for apply_on in ['Item Code', 'Item Group', 'Brand']:
-		pricing_rules.extend(_get_pricing_rules(apply_on, args, values))
+		pricing_rules.extend(get_pricing_rules_from_index(apply_on, args, index))
 		if pricing_rules and not apply_multiple_pricing_rules(pricing_rules):
 			break
 
@@ -98,6 +98,149 @@ def _get_pricing_rules(apply_on, args, values):
 
 	return pricing_rules
 
+def get_pricing_rules_from_index(apply_on, args, index=None):
+	"""Returns the same rows as _get_pricing_rules, matched in memory against the pricing rule index"""
+	apply_on_field = frappe.scrub(apply_on)
+
+	if not args.get(apply_on_field): return []
+
+	if apply_on_field == 'item_code':
+		if "variant_of" not in args:
+			args.variant_of = frappe.get_cached_value("Item", args.item_code, "variant_of")
+
+		item_values = [args.item_code, args.variant_of] if args.variant_of else [args.item_code]
+	elif apply_on_field == 'item_group':
+		item_values = get_tree_ancestors("Item Group", args.item_group)
+	else:
+		item_values = [args.brand]
+
+	if not args.price_list: args.price_list = None
+
+	if not index:
+		index = get_pricing_rule_index()
+
+	matched_children = {}
+	for value in item_values:
+		for name in index.apply_on.get((apply_on_field, cstr(value)), []):
+			matched_children.setdefault(name, set()).add(cstr(value))
+
+	# rules applied on other items match with all their rows
+	for name in index.other.get((apply_on_field, cstr(args.get(apply_on_field))), []):
+		matched_children[name] = None
+
+	tree_values = {}
+	for parenttype in ["Warehouse", "Customer Group", "Territory", "Supplier Group"]:
+		field = frappe.scrub(parenttype)
+		if args.get(field):
+			tree_values[field] = get_tree_ancestors(parenttype, args.get(field)) + ['']
+
+	transaction_date = getdate(args.get("transaction_date")) if args.get("transaction_date") else None
+
+	pricing_rules = []
+	for name, values in matched_children.items():
+		rule = index.rules[name]
+		if not match_pricing_rule(rule, args, tree_values, transaction_date):
+			continue
+
+		for child in index.children.get((apply_on_field, name), []):
+			if values is None or cstr(child.get(apply_on_field)) in values:
+				pricing_rule = frappe._dict(rule)
+				pricing_rule[apply_on_field] = child.get(apply_on_field)
+				pricing_rule.uom = child.uom
+				pricing_rules.append(pricing_rule)
+
+	return sorted(pricing_rules, key=lambda d: (cstr(d.priority), d.name), reverse=True)
+
+def match_pricing_rule(rule, args, tree_values, transaction_date=None):
+	if not cint(rule.get(args.selling_or_buying)):
+		return False
+
+	for field in ["company", "customer", "supplier", "campaign", "sales_partner"]:
+		if cstr(rule.get(field)) not in (args.get(field) or '', ''):
+			return False
+
+	for field, values in tree_values.items():
+		if cstr(rule.get(field)) not in values:
+			return False
+
+	if transaction_date:
+		if transaction_date < getdate(rule.valid_from or '2000-01-01') \
+			or transaction_date > getdate(rule.valid_upto or '2500-12-31'):
+			return False
+
+	if cstr(rule.for_price_list) not in (args.price_list or '', ''):
+		return False
+
+	return True
+
+def get_pricing_rule_index():
+	"""
+		Returns enabled pricing rules indexed by the item code, item group or brand they apply on.
+		The index is cached for the site and rebuilt when pricing rules are added, changed or removed.
+	"""
+	version = get_pricing_rule_index_version()
+
+	index = frappe.cache().get_value("pricing_rule_index")
+	if not index or index.version != version:
+		index = build_pricing_rule_index(version)
+		frappe.cache().set_value("pricing_rule_index", index)
+
+	return index
+
+def get_pricing_rule_index_version():
+	# also changes when rules are removed or when a transaction that changed rules is rolled back
+	version = [cstr(d) for d in frappe.db.sql("""
+		select count(*), max(modified)
+		from `tabPricing Rule`
+	""")[0]]
+
+	# rules and rows changed by raw sql do not change modified
+	tables = ["`tabPricing Rule`"] + ["`tabPricing Rule {0}`".format(apply_on) for apply_on in apply_on_table]
+	version += [cstr(d[1]) for d in frappe.db.sql("checksum table {0}".format(", ".join(tables)))]
+
+	return tuple(version)
+
+def build_pricing_rule_index(version):
+	index = frappe._dict({
+		"version": version,
+		"rules": {},
+		"children": {},
+		"apply_on": {},
+		"other": {}
+	})
+
+	for rule in frappe.db.sql("select * from `tabPricing Rule` where disable = 0", as_dict=1):
+		index.rules[rule.name] = rule
+
+		if rule.apply_rule_on_other is not None:
+			for apply_on in apply_on_table:
+				field = frappe.scrub(apply_on)
+				if rule.get("other_" + field):
+					index.other.setdefault((field, cstr(rule.get("other_" + field))), []).append(rule.name)
+
+	for apply_on in apply_on_table:
+		field = frappe.scrub(apply_on)
+		for d in frappe.db.sql("""
+			select parent, {field}, uom
+			from `tabPricing Rule {apply_on}`
+			where parenttype = 'Pricing Rule'
+			order by parent, idx
+		""".format(field=field, apply_on=apply_on), as_dict=1):
+			if d.parent not in index.rules:
+				continue
+
+			index.children.setdefault((field, d.parent), []).append(d)
+
+			# rows are ordered by parent, so a rule with the same value twice is only added once
+			names = index.apply_on.setdefault((field, cstr(d.get(field))), [])
+			if not names or names[-1] != d.parent:
+				names.append(d.parent)
+
+	return index
+
+def clear_pricing_rule_index():
+	frappe.cache().delete_value("pricing_rule_index")
+
 def apply_multiple_pricing_rules(pricing_rules):
 	apply_multiple_rule = [d.apply_multiple_pricing_rules
 		for d in pricing_rules if d.apply_multiple_pricing_rules]
@@ -137,6 +280,23 @@ def _get_tree_conditions(args, parenttype, table, allow_blank=True):
 			frappe.flags.tree_conditions[key] = condition
 	return condition
 
+def get_tree_ancestors(parenttype, name):
+	"""Returns name and all its ancestors in the tree, like the values used in _get_tree_conditions"""
+	if not frappe.flags.tree_ancestors:
+		frappe.flags.tree_ancestors = {}
+
+	key = (parenttype, name)
+	if key not in frappe.flags.tree_ancestors:
+		try:
+			lft, rgt = frappe.db.get_value(parenttype, name, ["lft", "rgt"])
+		except TypeError:
+			frappe.throw(_("Invalid {0}").format(name))
+
+		frappe.flags.tree_ancestors[key] = frappe.db.sql_list("""select name from `tab%s`
+			where lft<=%s and rgt>=%s""" % (parenttype, '%s', '%s'), (lft, rgt))
+
+	return list(frappe.flags.tree_ancestors[key])
+
 def get_other_conditions(conditions, values, args):
 	for field in ["company", "customer", "supplier", "campaign", "sales_partner"]:
 		if args.get(field):
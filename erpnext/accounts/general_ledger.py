@@ -2,12 +2,18 @@
 # License: GNU General Public License v3. See license.txt
 
 import frappe, erpnext
-from frappe.utils import flt, cstr, cint
+from frappe.utils import flt, cstr, cint, now_datetime
 from frappe import _
 from erpnext.accounts.utils import get_stock_and_account_balance
 from frappe.model.meta import get_field_precision
-from erpnext.accounts.doctype.budget.budget import validate_expense_against_budget
+from erpnext.accounts.doctype.budget.budget import validate_expense_against_budget_for_entries
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+from erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance import (update_gl_daily_balances,
+	update_gl_daily_balances_from_gl_entries)
+from erpnext.accounts.doctype.gl_closing_balance.gl_closing_balance import (update_gl_closing_balances,
+	update_gl_closing_balances_from_gl_entries)
+from erpnext.accounts.doctype.party_open_item.party_open_item import (update_party_open_items,
+	get_party_open_item_key, get_party_open_item_keys)
 from collections import OrderedDict
 
 
@@ -152,17 +158,26 @@ def save_entries(gl_map, adv_adj, update_outstanding, from_repost=False):
 
 	round_off_debit_credit(gl_map)
 
-	reference_documents_for_update = set()
-	for entry in gl_map:
-		make_entry(entry, adv_adj, from_repost)
+	if cint(frappe.db.get_single_value("Accounts Settings", "bulk_insert_gl_entries")):
+		saved_entries = make_entries_in_bulk(gl_map, adv_adj, from_repost)
+	else:
+		saved_entries = []
+		for entry in gl_map:
+			saved_entries.append(make_entry(entry, adv_adj, from_repost))
 
-		# check against budget
-		if not from_repost:
-			validate_expense_against_budget(entry)
+	# check against budget
+	if not from_repost:
+		validate_expense_against_budget_for_entries(gl_map)
 
-		if update_outstanding and not from_repost:
+	reference_documents_for_update = set()
+	if update_outstanding and not from_repost:
+		for entry in gl_map:
 			add_to_reference_documents_for_update(reference_documents_for_update, entry)
 
+	update_gl_daily_balances(saved_entries)
+	update_gl_closing_balances(saved_entries)
+	update_party_open_items([get_party_open_item_key(gle) for gle in saved_entries])
+
 	from erpnext.accounts.doctype.gl_entry.gl_entry import update_outstanding_amt
 	for voucher_type, voucher_no, account, party_type, party in reference_documents_for_update:
 		update_outstanding_amt(voucher_type, voucher_no, account, party_type, party)
@@ -178,6 +193,47 @@ def make_entry(args, adv_adj, from_repost=False):
 	gle.run_method("on_update_with_args", adv_adj, from_repost)
 	gle.flags.ignore_validate = True
 	gle.submit()
+	return gle
+
+
+def make_entries_in_bulk(gl_map, adv_adj, from_repost=False):
+	"""
+		Same as make_entry for all GL Entries of a voucher, with the entries validated together and
+		inserted with a multi-row INSERT statement. Hooks of GL Entry run for every entry as in make_entry,
+		balance type is checked once per account.
+	"""
+	from erpnext.accounts.doctype.gl_entry.gl_entry import validate_gl_entries, validate_balance_type
+	from erpnext.utilities.bulk_insert import bulk_insert
+
+	gl_entries = []
+	for args in gl_map:
+		gle = frappe.new_doc("GL Entry")
+		gle.update(args)
+		gle.flags.ignore_permissions = 1
+		gle.flags.from_repost = from_repost
+		gl_entries.append(gle)
+
+	validate_gl_entries(gl_entries)
+
+	creation = now_datetime()
+	for gle in gl_entries:
+		gle.set_new_name()
+		gle.creation = gle.modified = creation
+
+	bulk_insert("GL Entry", [d.get_valid_dict() for d in gl_entries], frappe.get_meta("GL Entry").get_valid_columns())
+
+	for gle in gl_entries:
+		gle.set("__islocal", False)
+		gle.run_method("on_update_with_args", adv_adj, from_repost)
+
+	for account in set([d.account for d in gl_entries]):
+		validate_balance_type(account, adv_adj)
+
+	for gle in gl_entries:
+		gle.flags.ignore_validate = True
+		gle.submit()
+
+	return gl_entries
 
 
 def validate_account_for_perpetual_inventory(gl_map):
@@ -344,22 +400,39 @@ def delete_gl_entries(gl_entries=None, voucher_type=None, voucher_no=None, adv_a
 	for entry in gl_entries:
 		validate_frozen_account(entry["account"], adv_adj)
 		validate_balance_type(entry["account"], adv_adj)
-		if not adv_adj:
-			validate_expense_against_budget(entry)
 
 		if update_outstanding and not adv_adj:
 			add_to_reference_documents_for_update(reference_documents_for_update, entry)
 
+	if not adv_adj:
+		validate_expense_against_budget_for_entries(gl_entries, include_voucher_entries=False)
+
 	for voucher_type, voucher_no, account, party_type, party in reference_documents_for_update:
 		update_outstanding_amt(voucher_type, voucher_no, account, party_type, party, on_cancel=True)
 
 
 def delete_voucher_gl_entries(voucher_type, voucher_no):
 	if voucher_type and voucher_no:
-		frappe.db.sql("""
-			delete from `tabGL Entry`
-			where voucher_type = %s and voucher_no = %s
-		""", (voucher_type, voucher_no))
+		delete_gl_entries_for_vouchers([(voucher_type, voucher_no)])
+
+
+def delete_gl_entries_for_vouchers(vouchers, chunk_size=500):
+	"""Delete GL Entries of a list of (voucher_type, voucher_no) and remove them from GL Daily Balance,
+	GL Closing Balance and Party Open Item"""
+	for i in range(0, len(vouchers), chunk_size):
+		chunk = vouchers[i:i + chunk_size]
+		if len(chunk) == 1:
+			condition, values = "voucher_type = %s and voucher_no = %s", tuple(chunk[0])
+		else:
+			condition, values = "(voucher_type, voucher_no) in %s", [chunk]
+
+		update_gl_daily_balances_from_gl_entries(condition, values, sign=-1)
+		update_gl_closing_balances_from_gl_entries(condition, values, sign=-1)
+		open_item_keys = get_party_open_item_keys(condition, values)
+
+		frappe.db.sql("delete from `tabGL Entry` where {0}".format(condition), values)
+
+		update_party_open_items(open_item_keys)
 
 
 def add_to_reference_documents_for_update(reference_documents_for_update, entry):
@@ -706,8 +706,8 @@ class ReceivablePayableReport(object):
 		return row
 
 	def get_entries_after(self, report_date, party_type):
-		# returns a distinct list
-		return list(set([(e.voucher_type, e.voucher_no) for e in self.get_gl_entries(party_type, report_date, for_future=True)]))
+		# returns a distinct set
+		return set([(e.voucher_type, e.voucher_no) for e in self.get_gl_entries(party_type, report_date, for_future=True)])
 
 	def get_entries_till(self, report_date, party_type):
 		# returns a generator
@@ -780,8 +780,17 @@ class ReceivablePayableReport(object):
 			doctype = "Purchase Invoice"
 
 		if doctype:
-			return_entries = frappe._dict(frappe.get_all(doctype,
-				filters={"is_return": 1, "docstatus": 1}, fields=["name", "return_against"], as_list=1))
+			# only returns that appear in the party ledger
+			voucher_nos = list(set([e.voucher_no for e in self.get_all_gl_entries(party_type)]))
+
+			return_entries = frappe._dict()
+			for i in range(0, len(voucher_nos), 1000):
+				return_entries.update(frappe.db.sql("""
+					select name, return_against
+					from `tab{0}`
+					where is_return = 1 and docstatus = 1 and name in %s
+				""".format(doctype), [voucher_nos[i:i + 1000]]))
+
 			return return_entries
 		else:
 			return []
@@ -876,6 +885,26 @@ class ReceivablePayableReport(object):
 		return self.party_map
 
 	def get_gl_entries(self, party_type, date=None, for_future=False):
+		"""Returns party GL Entries on or before date, or after date if for_future"""
+		gl_entries = self.get_all_gl_entries(party_type)
+
+		if date:
+			date = getdate(date)
+			if for_future:
+				gl_entries = [e for e in gl_entries if e.posting_date > date]
+			else:
+				gl_entries = [e for e in gl_entries if e.posting_date <= date]
+
+		return gl_entries
+
+	def get_all_gl_entries(self, party_type):
+		"""
+			Fetch party GL Entries for all dates once, grouped by voucher, against voucher and party.
+			Date cut-offs are applied in memory by get_gl_entries.
+		"""
+		if hasattr(self, "all_gl_entries"):
+			return self.all_gl_entries
+
 		conditions, values = self.prepare_conditions(party_type)
 
 		if self.filters.get(scrub(party_type)) or self.filters.get("account"):
@@ -883,13 +912,7 @@ class ReceivablePayableReport(object):
 		else:
 			select_fields = "sum(gle.debit) as debit, sum(gle.credit) as credit"
 
-		if date and not for_future:
-			conditions += " and gle.posting_date <= '%s'" % date
-
-		if date and for_future:
-			conditions += " and gle.posting_date > '%s'" % date
-
-		self.gl_entries = frappe.db.sql("""
+		self.all_gl_entries = frappe.db.sql("""
 			select
 				gle.name, gle.posting_date, gle.account, gle.party_type, gle.party, gle.voucher_type, gle.voucher_no,
 				gle.against_voucher_type, gle.against_voucher, gle.account_currency, gle.remarks, gle.cost_center, gle.project,
@@ -898,12 +921,13 @@ class ReceivablePayableReport(object):
 				`tabGL Entry` gle
 			where
 				gle.docstatus < 2 and gle.party_type=%s and (gle.party is not null and gle.party != '') {conditions}
-				group by gle.voucher_type, gle.voucher_no, gle.against_voucher_type, gle.against_voucher, gle.party
+				group by gle.voucher_type, gle.voucher_no, gle.against_voucher_type, gle.against_voucher, gle.party,
+					gle.posting_date
 				order by gle.posting_date, gle.party""".format(  # nosec
 			select_fields=select_fields,
 			conditions=conditions), values, as_dict=True)
 
-		return self.gl_entries
+		return self.all_gl_entries
 
 	def prepare_conditions(self, party_type):
 		conditions = [""]
@@ -987,16 +1011,12 @@ class ReceivablePayableReport(object):
 	def get_gl_entries_for(self, party, party_type, against_voucher_type, against_voucher):
 		if not hasattr(self, "gl_entries_map"):
 			self.gl_entries_map = {}
-			for gle in self.get_gl_entries(party_type):
+			for gle in self.get_all_gl_entries(party_type):
 				if gle.against_voucher_type and gle.against_voucher:
-					self.gl_entries_map.setdefault(gle.party, {})\
-						.setdefault(gle.against_voucher_type, {})\
-						.setdefault(gle.against_voucher, [])\
+					self.gl_entries_map.setdefault((gle.party, gle.against_voucher_type, gle.against_voucher), [])\
 						.append(gle)
 
-		return self.gl_entries_map.get(party, {})\
-			.get(against_voucher_type, {})\
-			.get(against_voucher, [])
+		return self.gl_entries_map.get((party, against_voucher_type, against_voucher), [])
 
 	def get_payment_term_detail(self, voucher_nos):
 		payment_term_map = frappe._dict()
@@ -7,6 +7,7 @@ from frappe.utils import cint, cstr
 from erpnext.accounts.report.financial_statements import (get_period_list, get_columns, get_data)
 from erpnext.accounts.report.profit_and_loss_statement.profit_and_loss_statement import get_net_profit_loss
 from erpnext.accounts.utils import get_fiscal_year
+from erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance import can_use_gl_daily_balances
 
 
 def execute(filters=None):
@@ -136,13 +137,19 @@ def get_account_type_based_gl_data(company, start_date, end_date, account_type,
 		cond = " AND (finance_book in (%s, '') OR finance_book IS NULL)" %(frappe.db.escape(cstr(filters.finance_book)))
 
 
+	if can_use_gl_daily_balances(filters):
+		gl_table, closing_condition = "tabGL Daily Balance", "is_period_closing = 0"
+	else:
+		gl_table, closing_condition = "tabGL Entry", "voucher_type != 'Period Closing Voucher'"
+
 	gl_sum = frappe.db.sql_list("""
 		select sum(credit) - sum(debit)
-		from `tabGL Entry`
+		from `{gl_table}`
 		where company=%s and posting_date >= %s and posting_date <= %s
-			and voucher_type != 'Period Closing Voucher'
+			and {closing_condition}
 			and account in ( SELECT name FROM tabAccount WHERE account_type = %s) {cond}
-	""".format(cond=cond), (company, start_date, end_date, account_type))
+	""".format(cond=cond, gl_table=gl_table, closing_condition=closing_condition),
+		(company, start_date, end_date, account_type))
 
 	return gl_sum[0] if gl_sum and gl_sum[0] else 0
 
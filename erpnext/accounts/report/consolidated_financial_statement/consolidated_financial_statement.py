@@ -1,11 +1,13 @@
 # Copyright (c) 2013, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
+import hashlib
 import frappe, erpnext
 from frappe import _
 from frappe.utils import flt, cint
-from erpnext.accounts.report.utils import get_currency, convert_to_presentation_currency
+from erpnext.accounts.report.utils import get_currency, convert
 from erpnext.accounts.report.financial_statements import get_fiscal_year_data, sort_accounts
+from erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance import can_use_gl_daily_balances
 from erpnext.accounts.report.balance_sheet.balance_sheet import (get_provisional_profit_loss,
 	check_opening_balance, get_chart_data)
 from erpnext.accounts.report.profit_and_loss_statement.profit_and_loss_statement import (get_net_profit_loss,
@@ -13,6 +15,8 @@ from erpnext.accounts.report.profit_and_loss_statement.profit_and_loss_statement
 from erpnext.accounts.report.cash_flow.cash_flow import (get_cash_flow_accounts, get_account_type_based_gl_data,
 	add_total_row_account)
 
+consolidated_statement_workers = 4
+
 def execute(filters=None):
 	columns, data, message, chart = [], [], [], []
 
@@ -330,7 +334,9 @@ def set_gl_entries_by_account(from_date, to_date, root_lft, root_rgt, filters, g
 	company_lft, company_rgt = frappe.get_cached_value('Company',
 		filters.get('company'),  ["lft", "rgt"])
 
-	additional_conditions = get_additional_conditions(from_date, ignore_closing_entries, filters)
+	use_daily_balances = can_use_gl_daily_balances(filters)
+	additional_conditions = get_additional_conditions(from_date, ignore_closing_entries, filters,
+		for_daily_balances=use_daily_balances)
 	companies = frappe.db.sql(""" select name, default_currency from `tabCompany`
 		where lft >= %(company_lft)s and rgt <= %(company_rgt)s""", {
 			"company_lft": company_lft,
@@ -342,28 +348,24 @@ def set_gl_entries_by_account(from_date, to_date, root_lft, root_rgt, filters, g
 		'presentation_currency': filters.get('presentation_currency')
 	})
 
+	args = frappe._dict({
+		"additional_conditions": additional_conditions,
+		"use_daily_balances": use_daily_balances,
+		"from_date": from_date,
+		"to_date": to_date,
+		"lft": root_lft,
+		"rgt": root_rgt,
+		"finance_book": filters.get("finance_book")
+	})
+	company_balances = get_company_balances([d.name for d in companies], args)
+
 	for d in companies:
-		gl_entries = frappe.db.sql("""select gl.posting_date, gl.account, gl.debit, gl.credit, gl.is_opening, gl.company,
-			gl.fiscal_year, gl.debit_in_account_currency, gl.credit_in_account_currency, gl.account_currency,
-			acc.account_name, acc.account_number
-			from `tabGL Entry` gl, `tabAccount` acc where acc.name = gl.account and gl.company = %(company)s
-			{additional_conditions} and gl.posting_date <= %(to_date)s and acc.lft >= %(lft)s and acc.rgt <= %(rgt)s
-			order by gl.account, gl.posting_date""".format(additional_conditions=additional_conditions),
-			{
-				"from_date": from_date,
-				"to_date": to_date,
-				"lft": root_lft,
-				"rgt": root_rgt,
-				"company": d.name,
-				"finance_book": filters.get("finance_book"),
-				"company_fb": frappe.db.get_value("Company", d.name, 'default_finance_book')
-			},
-			as_dict=True)
+		gl_entries = company_balances[d.name]
 
 		if filters and filters.get('presentation_currency') != d.default_currency:
 			currency_info['company'] = d.name
 			currency_info['company_currency'] = d.default_currency
-			convert_to_presentation_currency(gl_entries, currency_info)
+			convert_balances_to_presentation_currency(gl_entries, currency_info)
 
 		for entry in gl_entries:
 			key = entry.account_number or entry.account_name
@@ -372,16 +374,125 @@ def set_gl_entries_by_account(from_date, to_date, root_lft, root_rgt, filters, g
 
 	return gl_entries_by_account
 
+def get_company_balances(companies, args):
+	"""
+		Returns {company: [balances]} of debit and credit per account and posting date bucket.
+		Balances are cached per company until its GL changes, and the companies not in cache
+		are queried concurrently, each with its own database connection.
+	"""
+	company_balances = {}
+	pending = []
+
+	versions = get_company_gl_versions(companies, args.use_daily_balances)
+	for company in companies:
+		cache_key = get_company_balances_cache_key(company, args, versions.get(company))
+		balances = frappe.cache().get_value(cache_key)
+		if balances is None:
+			pending.append((company, cache_key))
+		else:
+			company_balances[company] = balances
+
+	# uncommitted GL Entries are only visible on the current connection
+	if len(pending) > 1 and not frappe.flags.in_test and not frappe.db.transaction_writes:
+		from concurrent.futures import ThreadPoolExecutor
+
+		site, sites_path = frappe.local.site, frappe.local.sites_path
+		with ThreadPoolExecutor(max_workers=min(len(pending), consolidated_statement_workers)) as executor:
+			results = list(executor.map(lambda d: get_company_balances_in_worker(site, sites_path, d[0], args),
+				pending))
+	else:
+		results = [get_balances_for_company(company, args) for company, cache_key in pending]
+
+	for (company, cache_key), balances in zip(pending, results):
+		frappe.cache().set_value(cache_key, balances, expires_in_sec=24 * 60 * 60)
+		company_balances[company] = balances
+
+	# entries are converted in place, so the cached balances are not shared with the caller
+	return {company: [frappe._dict(d) for d in balances] for company, balances in company_balances.items()}
+
+def get_company_gl_versions(companies, use_daily_balances):
+	"""Returns {company: (last modified, count)} of the GL rows read for the company"""
+	return {d.company: (str(d.modified), d.count) for d in frappe.db.sql("""
+		select company, max(modified) as modified, count(*) as count
+		from `{0}`
+		where company in %s
+		group by company
+	""".format("tabGL Daily Balance" if use_daily_balances else "tabGL Entry"), [companies], as_dict=1)}
+
+def get_company_balances_cache_key(company, args, version):
+	account_modified = frappe.db.sql("select max(modified) from `tabAccount` where company = %s", company)[0][0]
+	params = frappe.as_json([args, version, str(account_modified)])
+
+	return "consolidated_financial_statement|{0}|{1}".format(company,
+		hashlib.sha1(params.encode("utf-8")).hexdigest())
+
+def get_company_balances_in_worker(site, sites_path, company, args):
+	frappe.init(site=site, sites_path=sites_path)
+	frappe.connect()
+	try:
+		return get_balances_for_company(company, args)
+	finally:
+		frappe.destroy()
+
+def get_balances_for_company(company, args):
+	"""
+		Debit and credit of the company's GL per account, summed per posting date for Income and Expense
+		accounts, whose exchange rate is taken on the posting date, and for the whole period for the rest
+	"""
+	gl_table = "tabGL Daily Balance" if args.use_daily_balances else "tabGL Entry"
+
+	return frappe.db.sql("""
+		select
+			if(acc.root_type in ('Income', 'Expense'), gl.posting_date, %(from_date)s) as posting_date,
+			gl.account, gl.company, acc.root_type, gl.account_currency, acc.account_name, acc.account_number,
+			sum(gl.debit) as debit, sum(gl.credit) as credit,
+			sum(gl.debit_in_account_currency) as debit_in_account_currency,
+			sum(gl.credit_in_account_currency) as credit_in_account_currency
+		from `{gl_table}` gl, `tabAccount` acc
+		where acc.name = gl.account and gl.company = %(company)s
+			{additional_conditions} and gl.posting_date <= %(to_date)s and acc.lft >= %(lft)s and acc.rgt <= %(rgt)s
+		group by gl.account, gl.account_currency, if(acc.root_type in ('Income', 'Expense'), gl.posting_date, %(from_date)s)
+		order by gl.account, posting_date
+	""".format(gl_table=gl_table, additional_conditions=args.additional_conditions), {
+		"from_date": args.from_date,
+		"to_date": args.to_date,
+		"lft": args.lft,
+		"rgt": args.rgt,
+		"company": company,
+		"finance_book": args.finance_book,
+		"company_fb": frappe.db.get_value("Company", company, 'default_finance_book')
+	}, as_dict=True)
+
+def convert_balances_to_presentation_currency(balances, currency_info):
+	"""
+		Same conversion as convert_to_presentation_currency, applied to summed debit and credit:
+		Income and Expense at the rate of the posting date and other accounts at the rate of the report date
+	"""
+	presentation_currency = currency_info['presentation_currency']
+	company_currency = currency_info['company_currency']
+
+	for entry in balances:
+		if entry.account_currency != presentation_currency:
+			date = entry.posting_date if entry.root_type in ('Income', 'Expense') else currency_info['report_date']
+			entry.debit = convert(entry.debit, presentation_currency, company_currency, date)
+			entry.credit = convert(entry.credit, presentation_currency, company_currency, date)
+		else:
+			entry.debit = flt(entry.debit_in_account_currency)
+			entry.credit = flt(entry.credit_in_account_currency)
+
 def validate_entries(key, entry, accounts_by_name):
 	if key not in accounts_by_name:
 		field = "Account number" if entry.account_number else "Account name"
 		frappe.throw(_("{0} {1} is not present in the parent company").format(field, key))
 
-def get_additional_conditions(from_date, ignore_closing_entries, filters):
+def get_additional_conditions(from_date, ignore_closing_entries, filters, for_daily_balances=False):
 	additional_conditions = []
 
 	if ignore_closing_entries:
-		additional_conditions.append("gl.voucher_type != 'Period Closing Voucher'")
+		if for_daily_balances:
+			additional_conditions.append("gl.is_period_closing = 0")
+		else:
+			additional_conditions.append("gl.voucher_type != 'Period Closing Voucher'")
 
 	if from_date:
 		additional_conditions.append("gl.posting_date >= %(from_date)s")
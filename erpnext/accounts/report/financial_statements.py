@@ -16,6 +16,7 @@ from erpnext.accounts.utils import get_fiscal_year
 from six import itervalues
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions,\
 	get_dimension_with_children
+from erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance import can_use_gl_daily_balances
 
 
 def get_period_list(from_fiscal_year, to_fiscal_year, periodicity, accumulated_values=False,
@@ -373,7 +374,9 @@ def set_gl_entries_by_account(company, from_date, to_date, root_lft, root_rgt, f
 		ignore_closing_entries=False):
 
 	"""Returns a dict like { "account": [gl entries], ... }"""
-	additional_conditions = get_additional_conditions(from_date, ignore_closing_entries, filters)
+	use_daily_balances = can_use_gl_daily_balances(filters)
+	additional_conditions = get_additional_conditions(from_date, ignore_closing_entries, filters,
+		for_daily_balances=use_daily_balances)
 
 	accounts = frappe.db.sql_list("""select name from `tabAccount`
 		where lft >= %s and rgt <= %s and company = %s""", (root_lft, root_rgt, company))
@@ -399,15 +402,29 @@ def set_gl_entries_by_account(company, from_date, to_date, root_lft, root_rgt, f
 					key: value
 				})
 
-		gl_entries = frappe.db.sql("""
-			select posting_date, account, debit, credit, debit_in_account_currency, credit_in_account_currency,
-				is_opening, fiscal_year, account_currency
-			from `tabGL Entry`
-			where company=%(company)s
-				{additional_conditions}
-				and posting_date <= %(to_date)s
-			order by account, posting_date
-		""".format(additional_conditions=additional_conditions), gl_filters, as_dict=True)  #nosec
+		if use_daily_balances:
+			gl_entries = frappe.db.sql("""
+				select posting_date, account, sum(debit) as debit, sum(credit) as credit,
+					sum(debit_in_account_currency) as debit_in_account_currency,
+					sum(credit_in_account_currency) as credit_in_account_currency,
+					is_opening, fiscal_year, account_currency
+				from `tabGL Daily Balance`
+				where company=%(company)s
+					{additional_conditions}
+					and posting_date <= %(to_date)s
+				group by account, posting_date, is_opening, fiscal_year, account_currency
+				order by account, posting_date
+			""".format(additional_conditions=additional_conditions), gl_filters, as_dict=True)  #nosec
+		else:
+			gl_entries = frappe.db.sql("""
+				select posting_date, account, debit, credit, debit_in_account_currency, credit_in_account_currency,
+					is_opening, fiscal_year, account_currency
+				from `tabGL Entry`
+				where company=%(company)s
+					{additional_conditions}
+					and posting_date <= %(to_date)s
+				order by account, posting_date
+			""".format(additional_conditions=additional_conditions), gl_filters, as_dict=True)  #nosec
 
 		if filters and filters.get('presentation_currency'):
 			convert_to_presentation_currency(gl_entries, get_currency(filters))
@@ -418,13 +435,16 @@ def set_gl_entries_by_account(company, from_date, to_date, root_lft, root_rgt, f
 		return gl_entries_by_account
 
 
-def get_additional_conditions(from_date, ignore_closing_entries, filters):
+def get_additional_conditions(from_date, ignore_closing_entries, filters, for_daily_balances=False):
 	additional_conditions = []
 
 	accounting_dimensions = get_accounting_dimensions(as_list=False)
 
 	if ignore_closing_entries:
-		additional_conditions.append("voucher_type != 'Period Closing Voucher'")
+		if for_daily_balances:
+			additional_conditions.append("is_period_closing = 0")
+		else:
+			additional_conditions.append("voucher_type != 'Period Closing Voucher'")
 
 	if from_date:
 		additional_conditions.append("posting_date >= %(from_date)s")
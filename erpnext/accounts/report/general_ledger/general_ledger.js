@@ -222,7 +222,32 @@ frappe.query_reports["General Ledger"] = {
 			"fieldtype": "Data",
 			"hidden": 1
 		}
-	]
+	],
+	onload: function(report) {
+		report.page.add_menu_item(__("Export Without Grouping"), function() {
+			frappe.prompt({
+				fieldname: "file_format",
+				label: __("File Format"),
+				fieldtype: "Select",
+				options: "CSV\nExcel",
+				default: "CSV",
+				reqd: 1
+			}, function(values) {
+				frappe.call({
+					method: "erpnext.accounts.report.general_ledger.general_ledger.export_general_ledger",
+					args: {
+						filters: report.get_values(),
+						file_format: values.file_format
+					}
+				});
+			}, __("Export General Ledger"));
+		});
+
+		frappe.realtime.on("general_ledger_export", function(data) {
+			frappe.msgprint(__("General Ledger export is ready: {0}",
+				['<a href="' + data.file_url + '" target="_blank">' + data.file_url + '</a>']));
+		});
+	}
 }
 
 erpnext.utils.add_dimensions('General Ledger', 15);
@@ -1,10 +1,16 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
+import io
+import csv
+import hmac
+import json
+import base64
+import hashlib
 import frappe
 from erpnext.accounts.report.utils import get_currency, convert_to_presentation_currency
 from erpnext import get_default_company
-from frappe.utils import getdate, cstr, flt
+from frappe.utils import getdate, cstr, flt, cint
 from frappe import _, _dict
 from erpnext.accounts.utils import get_account_currency
 from erpnext.accounts.party import set_party_name_in_list
@@ -25,8 +31,9 @@ def execute(filters=None):
 		not filters.get('account'):
 		frappe.throw(_("Select an account to print in account currency"))
 
-	for acc in frappe.db.sql("""select name, is_group from tabAccount""", as_dict=1):
-		account_details.setdefault(acc.name, acc)
+	if filters.get('account'):
+		for acc in frappe.db.sql("""select name, is_group from tabAccount where name = %s""", filters.account, as_dict=1):
+			account_details.setdefault(acc.name, acc)
 
 	validate_filters(filters, account_details)
 
@@ -184,37 +191,23 @@ def get_result(filters, account_details, accounting_dimensions):
 def get_gl_entries(filters, accounting_dimensions):
 	currency_map = get_currency(filters)
 	filters.ledger_currency = currency_map.get("presentation_currency") or currency_map.get("company_currency")
-	dimensions_fields = ", " + ", ".join([d.fieldname for d in accounting_dimensions]) if accounting_dimensions else ""
 
-	sales_person_join = ""
-	sales_person_field = ""
-	if filters.get("sales_person") or filters.get("group_by") == _("Group by Sales Person"):
-		sales_person_join = "inner join `tabSales Team` steam on steam.parenttype = party_type and steam.parent = party"
-		sales_person_field = ", steam.sales_person"
+	fields, joins = get_gl_entry_fields_and_joins(filters, accounting_dimensions)
 
 	order_by = "gle.posting_date, gle.account, gle.creation"
 	if filters.get("voucher_no"):
 		order_by = "gle.posting_date, gle.creation"
 
 	gl_entries = frappe.db.sql("""
-		select
-			gle.posting_date, gle.account, gle.party_type, gle.party,
-			gle.voucher_type, gle.voucher_no, gle.cost_center, gle.project,
-			gle.debit, gle.credit, gle.debit_in_account_currency, gle.credit_in_account_currency,
-			gle.remarks, gle.against, gle.is_opening,
-			gle.against_voucher_type, gle.against_voucher,
-			gle.reference_no, gle.reference_date,
-			gle.account_currency, %(ledger_currency)s as currency
-			{sales_person_field} {dimensions_fields}
+		select {fields}
 		from `tabGL Entry` gle
-		{sales_person_join}
+		{joins}
 		where {conditions}
 		order by {order_by}
 	""".format(
+		fields=fields,
+		joins=joins,
 		conditions=get_conditions(filters, accounting_dimensions),
-		dimensions_fields=dimensions_fields,
-		sales_person_field=sales_person_field,
-		sales_person_join=sales_person_join,
 		order_by=order_by,
 	), filters, as_dict=1)
 
@@ -224,6 +217,29 @@ def get_gl_entries(filters, accounting_dimensions):
 		return gl_entries
 
 
+def get_gl_entry_fields_and_joins(filters, accounting_dimensions):
+	dimensions_fields = ", " + ", ".join([d.fieldname for d in accounting_dimensions]) if accounting_dimensions else ""
+
+	sales_person_join = ""
+	sales_person_field = ""
+	if filters.get("sales_person") or filters.get("group_by") == _("Group by Sales Person"):
+		sales_person_join = "inner join `tabSales Team` steam on steam.parenttype = party_type and steam.parent = party"
+		sales_person_field = ", steam.sales_person"
+
+	fields = """
+		gle.posting_date, gle.account, gle.party_type, gle.party,
+		gle.voucher_type, gle.voucher_no, gle.cost_center, gle.project,
+		gle.debit, gle.credit, gle.debit_in_account_currency, gle.credit_in_account_currency,
+		gle.remarks, gle.against, gle.is_opening,
+		gle.against_voucher_type, gle.against_voucher,
+		gle.reference_no, gle.reference_date,
+		gle.account_currency, %(ledger_currency)s as currency
+		{sales_person_field} {dimensions_fields}
+	""".format(sales_person_field=sales_person_field, dimensions_fields=dimensions_fields)
+
+	return fields, sales_person_join
+
+
 def merge_similar_entries(filters, gl_entries, supplier_invoice_details):
 	merged_gles = OrderedDict()
 
@@ -650,3 +666,336 @@ def get_columns(filters, accounting_dimensions):
 		columns = [col for col in columns if not col.get('hide_if_merge_similar')]
 
 	return columns
+
+
+streaming_page_length = 2000
+
+
+@frappe.whitelist()
+def get_general_ledger_page(filters, cursor=None, page_length=500):
+	"""
+		Returns a page of the General Ledger without grouping and a cursor for the next page.
+		The Opening row comes with the first page, the Total and Closing rows with the last page.
+	"""
+	check_general_ledger_permission()
+
+	filters = get_streaming_filters(filters)
+	accounting_dimensions = get_accounting_dimensions(as_list=False)
+	page_length = min(cint(page_length) or 500, streaming_page_length)
+
+	out = _dict(result=[], cursor=None)
+	if cursor:
+		state = decode_ledger_cursor(cursor, filters)
+	else:
+		state = get_streaming_start_state(filters, accounting_dimensions)
+		out.columns = get_columns(filters, accounting_dimensions)
+		out.result.append(get_streaming_opening_row(filters, state))
+
+	gl_entries = get_next_gl_entries(filters, accounting_dimensions, state, page_length)
+	out.result += gl_entries
+
+	if len(gl_entries) < page_length:
+		out.result += get_streaming_closing_rows(filters, state)
+	else:
+		out.cursor = encode_ledger_cursor(state, filters)
+
+	return out
+
+
+@frappe.whitelist()
+def export_general_ledger(filters, file_format="CSV"):
+	check_general_ledger_permission()
+	get_streaming_filters(filters)
+
+	frappe.enqueue("erpnext.accounts.report.general_ledger.general_ledger.write_general_ledger_file",
+		queue="long", timeout=3600, filters=filters, file_format=file_format, user=frappe.session.user)
+	frappe.msgprint(_("General Ledger is being exported. You will be notified when the file is ready."))
+
+
+def write_general_ledger_file(filters, file_format="CSV", user=None):
+	"""Write the General Ledger without grouping to a private CSV or Excel file page by page"""
+	filters = get_streaming_filters(filters)
+	accounting_dimensions = get_accounting_dimensions(as_list=False)
+	state = get_streaming_start_state(filters, accounting_dimensions)
+	columns = get_columns(filters, accounting_dimensions)
+
+	file_name = "general_ledger_{0}.{1}".format(frappe.generate_hash(length=10),
+		"xlsx" if file_format == "Excel" else "csv")
+	path = frappe.get_site_path("private", "files", file_name)
+
+	if file_format == "Excel":
+		from openpyxl import Workbook
+		workbook = Workbook(write_only=True)
+		sheet = workbook.create_sheet(_("General Ledger"))
+		write_row = sheet.append
+	else:
+		csv_file = io.open(path, "w", newline="", encoding="utf-8")
+		write_row = csv.writer(csv_file).writerow
+
+	def write_ledger_rows(rows):
+		for d in rows:
+			write_row([get_file_value(d, c["fieldname"], file_format) for c in columns])
+
+	write_row([c["label"] for c in columns])
+	write_ledger_rows([get_streaming_opening_row(filters, state)])
+
+	while True:
+		gl_entries = get_next_gl_entries(filters, accounting_dimensions, state, streaming_page_length)
+		write_ledger_rows(gl_entries)
+		if len(gl_entries) < streaming_page_length:
+			break
+
+	write_ledger_rows(get_streaming_closing_rows(filters, state))
+
+	if file_format == "Excel":
+		workbook.save(path)
+	else:
+		csv_file.close()
+
+	file_doc = frappe.get_doc({
+		"doctype": "File",
+		"file_name": file_name,
+		"file_url": "/private/files/" + file_name,
+		"is_private": 1
+	})
+	file_doc.flags.ignore_permissions = True
+	file_doc.insert()
+
+	frappe.publish_realtime("general_ledger_export", {"file_url": file_doc.file_url}, user=user or frappe.session.user)
+	return file_doc.file_url
+
+
+def check_general_ledger_permission():
+	if not frappe.get_doc("Report", "General Ledger").is_permitted():
+		frappe.throw(_("You don't have access to Report: {0}").format(_("General Ledger")), frappe.PermissionError)
+
+
+def get_file_value(row, fieldname, file_format):
+	value = row.get(fieldname)
+	if row.get("_isGroupTotal") and fieldname == "account":
+		value = cstr(value).strip("'")
+
+	if file_format != "Excel" and value is not None and not isinstance(value, (int, float)):
+		value = cstr(value)
+
+	return value
+
+
+def get_streaming_filters(filters):
+	if isinstance(filters, string_types):
+		filters = json.loads(filters)
+	filters = frappe._dict(filters)
+
+	if filters.get("group_by") or filters.get("merge_similar_entries"):
+		frappe.throw(_("Paginated and exported General Ledger is not available with Group By or Merge Similar Entries"))
+
+	if filters.get('print_in_account_currency') and not filters.get('account'):
+		frappe.throw(_("Select an account to print in account currency"))
+
+	account_details = {}
+	if filters.get('account'):
+		for acc in frappe.db.sql("""select name, is_group from tabAccount where name = %s""", filters.account, as_dict=1):
+			account_details.setdefault(acc.name, acc)
+
+	validate_filters(filters, account_details)
+	validate_party(filters)
+	get_customer_linked_suppliers(filters)
+	filters = set_account_currency(filters)
+
+	currency_map = get_currency(filters)
+	filters.ledger_currency = currency_map.get("presentation_currency") or currency_map.get("company_currency")
+
+	# columns can not depend on rows that are not read yet
+	filters.show_party = True
+	filters.show_party_name = True
+
+	return filters
+
+
+def get_streaming_conditions(filters, accounting_dimensions):
+	"""Returns conditions for opening and for ledger rows, split the same way as calculate_opening_closing"""
+	conditions = get_conditions(filters, accounting_dimensions)
+
+	opening_condition = "gle.posting_date < %(from_date)s"
+	if not filters.get("show_opening_entries"):
+		opening_condition += " or ifnull(gle.is_opening, 'No') = 'Yes'"
+
+	return ("{0} and ({1})".format(conditions, opening_condition),
+		"{0} and not ({1}) and gle.posting_date <= %(to_date)s".format(conditions, opening_condition))
+
+
+def get_streaming_start_state(filters, accounting_dimensions):
+	"""Returns the running state of a streamed ledger, with opening totals from one aggregate query"""
+	opening_conditions, row_conditions = get_streaming_conditions(filters, accounting_dimensions)
+	fields, joins = get_gl_entry_fields_and_joins(filters, accounting_dimensions)
+
+	group_fields, group_by = "", ""
+	if filters.get("presentation_currency"):
+		# conversion depends on account and posting date
+		group_fields = "gle.account, gle.account_currency, gle.posting_date,"
+		group_by = "group by gle.account, gle.account_currency, gle.posting_date"
+
+	opening = frappe.db.sql("""
+		select {group_fields}
+			sum(gle.debit) as debit, sum(gle.credit) as credit,
+			sum(gle.debit_in_account_currency) as debit_in_account_currency,
+			sum(gle.credit_in_account_currency) as credit_in_account_currency
+		from `tabGL Entry` gle
+		{joins}
+		where {conditions}
+		{group_by}
+	""".format(group_fields=group_fields, joins=joins, conditions=opening_conditions, group_by=group_by),
+		filters, as_dict=1)
+
+	if filters.get("presentation_currency"):
+		# convert debits and credits separately as convert_to_presentation_currency expects one of them
+		entries = []
+		for d in opening:
+			entries.append(_dict(d, credit=0, credit_in_account_currency=0))
+			entries.append(_dict(d, debit=0, debit_in_account_currency=0))
+		opening = convert_to_presentation_currency(entries, get_currency(filters))
+
+	state = _dict(last=None, balance=0.0, totals=_dict())
+	for key in ('opening', 'total', 'closing'):
+		state.totals[key] = [0.0, 0.0, 0.0, 0.0]
+
+	for d in opening:
+		update_streaming_totals(state, 'opening', d)
+		update_streaming_totals(state, 'closing', d)
+
+	state.balance = state.totals.opening[0] - state.totals.opening[1]
+	return state
+
+
+def get_next_gl_entries(filters, accounting_dimensions, state, page_length):
+	"""Returns the next page of ledger rows after state.last and updates the running balance and totals"""
+	opening_conditions, row_conditions = get_streaming_conditions(filters, accounting_dimensions)
+	fields, joins = get_gl_entry_fields_and_joins(filters, accounting_dimensions)
+
+	order_by = ["gle.posting_date", "gle.account", "gle.creation", "gle.name"]
+	if filters.get("voucher_no"):
+		order_by = ["gle.posting_date", "gle.creation", "gle.name"]
+
+	values = frappe._dict(filters)
+	if state.last:
+		row_conditions += " and ({0}) > ({1})".format(", ".join(order_by),
+			", ".join(["%(_last_{0})s".format(i) for i in range(len(order_by))]))
+		for i, value in enumerate(state.last):
+			values["_last_{0}".format(i)] = value
+
+	gl_entries = frappe.db.sql("""
+		select {fields}, gle.name as _gl_entry, gle.creation as _creation
+		from `tabGL Entry` gle
+		{joins}
+		where {conditions}
+		order by {order_by}
+		limit {page_length}
+	""".format(fields=fields, joins=joins, conditions=row_conditions, order_by=", ".join(order_by),
+		page_length=cint(page_length)), values, as_dict=1)
+
+	if not gl_entries:
+		return []
+
+	last = gl_entries[-1]
+	if filters.get("voucher_no"):
+		state.last = [cstr(last.posting_date), cstr(last._creation), last._gl_entry]
+	else:
+		state.last = [cstr(last.posting_date), last.account, cstr(last._creation), last._gl_entry]
+
+	if filters.get('presentation_currency'):
+		gl_entries = convert_to_presentation_currency(gl_entries, get_currency(filters))
+
+	supplier_invoice_details = get_supplier_invoice_details_for(gl_entries)
+	set_party_name_in_list(gl_entries)
+
+	precision = frappe.get_precision("GL Entry", "debit") + 1
+	for gle in gl_entries:
+		del gle['_gl_entry'], gle['_creation']
+
+		gle['disable_party_name_formatter'] = 1
+		gle['against_bill_no'] = supplier_invoice_details.get((gle.get('against_voucher_type'),
+			gle.get('against_voucher')), '')
+
+		update_streaming_totals(state, 'total', gle)
+		update_streaming_totals(state, 'closing', gle)
+
+		state.balance = get_balance(gle, state.balance, 'debit', 'credit')
+		gle['balance'] = flt(state.balance, precision)
+		gle['account_currency'] = filters.account_currency
+		gle['currency'] = filters.presentation_currency or filters.company_currency
+
+	return gl_entries
+
+
+def update_streaming_totals(state, key, gle):
+	for i, fieldname in enumerate(("debit", "credit", "debit_in_account_currency", "credit_in_account_currency")):
+		state.totals[key][i] += flt(gle.get(fieldname))
+
+
+def get_streaming_total_row(filters, state, key):
+	precision = frappe.get_precision("GL Entry", "debit") + 1
+
+	row = get_totals_dict()[key]
+	row.debit, row.credit, row.debit_in_account_currency, row.credit_in_account_currency = state.totals[key]
+	row.balance = flt(row.debit - row.credit, precision)
+	row.account_currency = filters.account_currency
+	row.currency = filters.presentation_currency or filters.company_currency
+	return row
+
+
+def get_streaming_opening_row(filters, state):
+	row = get_streaming_total_row(filters, state, 'opening')
+
+	if frappe.get_cached_value("Accounts Settings", None, "no_opening_total_general_ledger"):
+		row.debit = 0
+		row.credit = 0
+
+	return row
+
+
+def get_streaming_closing_rows(filters, state):
+	total_row = get_streaming_total_row(filters, state, 'total')
+	closing_row = get_streaming_total_row(filters, state, 'closing')
+
+	if frappe.get_cached_value("Accounts Settings", None, "no_total_row_general_ledger"):
+		closing_row.debit = total_row.debit
+		closing_row.credit = total_row.credit
+		return [closing_row]
+
+	return [total_row, closing_row]
+
+
+def get_supplier_invoice_details_for(gl_entries):
+	inv_details = {}
+	for voucher_type in ['Purchase Invoice', 'Journal Entry']:
+		names = list(set([d.against_voucher for d in gl_entries if d.against_voucher_type == voucher_type]))
+		if names:
+			for d in frappe.db.sql("""select name, bill_no from `tab{0}`
+					where name in %s and docstatus = 1 and bill_no is not null and bill_no != ''""".format(voucher_type),
+					[names], as_dict=1):
+				inv_details[(voucher_type, d.name)] = d.bill_no
+
+	return inv_details
+
+
+def encode_ledger_cursor(state, filters):
+	"""Returns the state as a cursor signed for the filters and the user"""
+	payload = base64.urlsafe_b64encode(json.dumps(state).encode("utf-8")).decode("utf-8")
+	return "{0}.{1}".format(payload, get_ledger_cursor_signature(payload, filters))
+
+
+def decode_ledger_cursor(cursor, filters):
+	payload, signature = (cstr(cursor).rsplit(".", 1) + [""])[:2]
+	if not hmac.compare_digest(cstr(signature), get_ledger_cursor_signature(payload, filters)):
+		frappe.throw(_("Invalid cursor for these filters, reload the General Ledger"))
+
+	state = frappe._dict(json.loads(base64.urlsafe_b64decode(payload.encode("utf-8")).decode("utf-8")))
+	state.totals = frappe._dict(state.totals)
+	return state
+
+
+def get_ledger_cursor_signature(payload, filters):
+	from frappe.utils.password import get_encryption_key
+
+	message = "|".join([payload, frappe.session.user, json.dumps(filters, sort_keys=True, default=cstr)])
+	return hmac.new(get_encryption_key().encode("utf-8"), message.encode("utf-8"), hashlib.sha256).hexdigest()
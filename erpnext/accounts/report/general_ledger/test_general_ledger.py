@@ -0,0 +1,70 @@
+import io
+import csv
+import frappe
+import unittest
+from frappe.utils import flt, cstr, today, add_days
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.accounts.report.general_ledger.general_ledger import (execute, get_columns, get_general_ledger_page,
+	get_streaming_filters, write_general_ledger_file)
+from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+
+class TestGeneralLedger(unittest.TestCase):
+	def test_paginated_and_exported_ledger_match_report(self):
+		make_journal_entry("_Test Bank - _TC", "Sales - _TC", 100, posting_date=add_days(today(), -10), submit=True)
+		for i in range(5):
+			make_journal_entry("_Test Bank - _TC", "Sales - _TC", 50 + i, posting_date=add_days(today(), -i), submit=True)
+		make_journal_entry("Sales - _TC", "_Test Bank - _TC", 70, posting_date=add_days(today(), -2), submit=True)
+
+		filters = frappe._dict({
+			"company": "_Test Company",
+			"account": "_Test Bank - _TC",
+			"from_date": add_days(today(), -5),
+			"to_date": today()
+		})
+
+		expected = get_ledger_values(execute(frappe._dict(filters))[1])
+
+		rows, cursor = [], None
+		while True:
+			page = get_general_ledger_page(frappe.as_json(filters), cursor=cursor, page_length=2)
+			rows += page.result
+			cursor = page.cursor
+			if not cursor:
+				break
+
+		self.assertEqual(get_ledger_values(rows), expected)
+
+		file_url = write_general_ledger_file(frappe.as_json(filters))
+		self.assertEqual(get_ledger_values(read_exported_rows(filters, file_url)), expected)
+
+		# a cursor can not be used with other filters
+		page = get_general_ledger_page(frappe.as_json(filters), page_length=2)
+		other_filters = frappe._dict(filters, from_date=add_days(today(), -3))
+		self.assertRaises(frappe.ValidationError, get_general_ledger_page, frappe.as_json(other_filters),
+			cursor=page.cursor, page_length=2)
+
+
+def get_ledger_values(rows):
+	"""Returns opening, ledger rows with running balance and total rows of a General Ledger"""
+	values = []
+	for d in rows:
+		if d.get("_isGroupTotal") or d.get("voucher_no"):
+			values.append((cstr(d.get("account")).strip("'"), d.get("voucher_no") or None, flt(d.get("debit"), 2), flt(d.get("credit"), 2),
+				flt(d.get("balance"), 2) if d.get("voucher_no") else None))
+
+	return values
+
+
+def read_exported_rows(filters, file_url):
+	columns = get_columns(get_streaming_filters(frappe.as_json(filters)), get_accounting_dimensions(as_list=False))
+	path = frappe.get_site_path("private", "files", file_url.rsplit("/", 1)[-1])
+
+	rows = []
+	with io.open(path, "r", newline="", encoding="utf-8") as f:
+		for i, values in enumerate(csv.reader(f)):
+			if i:
+				row = frappe._dict(zip([c["fieldname"] for c in columns], values))
+				row._isGroupTotal = not row.voucher_no
+				rows.append(row)
+
+	return rows
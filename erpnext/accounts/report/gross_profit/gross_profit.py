@@ -24,6 +24,7 @@ class GrossProfitGenerator(object):
 		self.show_item_name = frappe.defaults.get_global_default('item_naming_by') != "Item Name"
 
 		self.data = []
+		self.group_totals_map = None
 
 	def run(self):
 		if self.filters.from_date > self.filters.to_date:
@@ -39,7 +40,7 @@ class GrossProfitGenerator(object):
 		return columns, data
 
 	def load_invoice_items(self):
-		conditions = self.get_conditions()
+		conditions = self.conditions = self.get_conditions()
 
 		self.data = frappe.db.sql("""
 			select
@@ -95,16 +96,76 @@ class GrossProfitGenerator(object):
 				d.split_percentage = 100
 
 	def get_cogs(self):
-		update_item_valuation_rates(self.data)
+		self.set_valuation_rates()
+		self.calculate_gross_profit()
 
-		for item in self.data:
-			item.cogs_per_unit = flt(item.valuation_rate) * flt(item.conversion_factor)
-			item.cogs_per_unit = item.cogs_per_unit * item.split_percentage / 100
+	def calculate_gross_profit(self):
+		set_gross_profit_columns(self.data)
 
-			item.cogs_qty = flt(item.qty) - flt(item.get('returned_qty'))
-			item.cogs = item.cogs_per_unit * item.cogs_qty
+	def set_valuation_rates(self):
+		"""
+			Set valuation rate from the outgoing rate of the Stock Ledger Entries for stock items, loaded by joining
+			Stock Ledger Entry on voucher_detail_no, and from the last purchase rate for other items
+		"""
+		item_codes = list(set([d.item_code for d in self.data if d.item_code]))
+		stock_item_codes = set(get_stock_items(item_codes))
 
-			self.postprocess_row(item)
+		sle_outgoing_rate = {}
+		if any(d.item_code in stock_item_codes for d in self.data):
+			sle_outgoing_rate = self.get_sle_outgoing_rates()
+
+		last_purchase_rate_item_dates = list(set([(d.item_code, getdate(d.posting_date)) for d in self.data
+			if d.item_code and d.item_code not in stock_item_codes]))
+		item_last_purchase_rate = get_item_last_purchase_rate(last_purchase_rate_item_dates)
+
+		for d in self.data:
+			if not d.item_code:
+				d.valuation_rate = 0
+			elif d.item_code in stock_item_codes:
+				if d.delivery_note_item:
+					d.valuation_rate = flt(sle_outgoing_rate.get(('Delivery Note', d.delivery_note_item)))
+				elif d.update_stock and d.name:
+					d.valuation_rate = flt(sle_outgoing_rate.get(('Sales Invoice', d.name)))
+				else:
+					d.valuation_rate = 0
+			else:
+				d.valuation_rate = flt(item_last_purchase_rate.get((d.item_code, getdate(d.posting_date))))
+
+	def get_sle_outgoing_rates(self):
+		conditions = self.conditions
+
+		out = {}
+		for voucher_type, voucher_detail_no, source_condition in (
+			('Delivery Note', 'si_item.delivery_note_item', "ifnull(si_item.delivery_note_item, '') != ''"),
+			('Sales Invoice', 'si_item.name', "ifnull(si_item.delivery_note_item, '') = '' and si.update_stock = 1")
+		):
+			values = self.filters.copy()
+			values['voucher_type'] = voucher_type
+
+			for d in frappe.db.sql("""
+				select sle.voucher_detail_no, sum(sle.stock_value_difference) / sum(sle.actual_qty) as outgoing_rate
+				from `tabStock Ledger Entry` sle
+				inner join (
+					select distinct {voucher_detail_no} as voucher_detail_no
+					from `tabSales Invoice` si
+					inner join `tabSales Invoice Item` si_item on si_item.parent = si.name
+					left join `tabCustomer` c on c.name = si.customer
+					left join `tabItem` i on i.name = si_item.item_code
+					left join `tabSales Team` sp on sp.parent = si.name and sp.parenttype = 'Sales Invoice'
+					where
+						si.docstatus = 1
+						and (si.return_against = '' or si.return_against is null)
+						and si.is_opening != 'Yes'
+						and {source_condition}
+						{conditions}
+				) invoice_item on invoice_item.voucher_detail_no = sle.voucher_detail_no
+				where sle.voucher_type = %(voucher_type)s
+				group by sle.voucher_detail_no
+			""".format(voucher_detail_no=voucher_detail_no, source_condition=source_condition, conditions=conditions),
+				values, as_dict=1):
+				out[(voucher_type, d.voucher_detail_no)] = d.outgoing_rate
+
+		return out
 
 	def get_grouped_data(self):
 		data = self.data
@@ -139,10 +200,7 @@ class GrossProfitGenerator(object):
 			postprocess_group=sort_group, totals_only=self.filters.totals_only)
 
 	def calculate_group_totals(self, data, group_field, group_value, grouped_by):
-		total_fields = [
-			'qty', 'stock_qty', 'cogs_qty', 'cogs',
-			'base_net_amount', 'returned_qty', 'base_returned_amount'
-		]
+		total_fields = group_total_fields
 
 		totals = frappe._dict()
 
@@ -155,9 +213,14 @@ class GrossProfitGenerator(object):
 			totals[f] = 0
 
 		# Add totals
-		for d in data:
-			for f in total_fields:
-				totals[f] += flt(d[f])
+		group_totals = self.get_group_totals(data, grouped_by)
+		if group_totals:
+			for f, value in zip(group_total_fields, group_totals):
+				totals[f] = value
+		else:
+			for d in data:
+				for f in total_fields:
+					totals[f] += flt(d[f])
 
 		# Set group values
 		if data:
@@ -203,6 +266,19 @@ class GrossProfitGenerator(object):
 		totals.cogs_per_unit = totals.cogs / totals.cogs_qty if totals.cogs_qty else 0
 		return totals
 
+	def get_group_totals(self, data, grouped_by):
+		"""
+			Returns sums of group_total_fields for the group from a hash aggregation of all rows by every
+			level of grouping, made in one pass on the first call. None if the group does not match the rows.
+		"""
+		if self.group_totals_map is None:
+			self.group_totals_map = get_group_totals_map(self.data, [f for f in self.group_by if f])
+
+		key = tuple(sorted(grouped_by.items()))
+		group_totals = self.group_totals_map.get(key)
+		if group_totals and group_totals[0] == len(data):
+			return group_totals[1]
+
 	def postprocess_row(self, item):
 		item.revenue = item.base_net_amount - flt(item.get('base_returned_amount'))
 		item.revenue_per_unit = item.revenue / item.cogs_qty if item.cogs_qty else 0
@@ -548,88 +624,71 @@ class GrossProfitGenerator(object):
 
 
 
+group_total_fields = [
+	'qty', 'stock_qty', 'cogs_qty', 'cogs',
+	'base_net_amount', 'returned_qty', 'base_returned_amount'
+]
 
 
-
-def update_item_valuation_rates(items, doc=None):
-	from frappe.model.document import Document
-
-	if not doc:
-		doc = frappe._dict()
-
-	args = items
-	if doc:
-		args = []
-		doc_dict = doc.as_dict() if isinstance(doc, Document) else doc
-		for d in items:
-			cur_arg = doc_dict.copy()
-			cur_arg.update(d.as_dict() if isinstance(d, Document) else d)
-			args.append(d)
-
-	incoming_rate_data = get_item_incoming_rate_data(args)
-
-	for i, d in enumerate(items):
-		source_info = incoming_rate_data.source_map.get(i)
-		if source_info:
-			source_type, source_key = source_info
-			source_object = incoming_rate_data.get(source_type)
-
-			if source_object:
-				d.valuation_rate = flt(source_object.get(source_key))
-			else:
-				d.valuation_rate = 0
-		else:
-			d.valuation_rate = 0
-
-
-def get_item_incoming_rate_data(args):
+def set_gross_profit_columns(data):
 	"""
-	args list:
-		'dt' or 'parenttype' or 'doctype'
-		'child_docname' or 'name'
-		'doc_status' or 'docstatus'
-		'item_code'
-		'batch_no'
-		'update_stock'
-		'delivery_note_item'
+		Compute cost and gross profit of all rows column by column, with the same arithmetic as
+		GrossProfitGenerator.postprocess_row, and set them on the rows
 	"""
+	valuation_rate = [flt(d.valuation_rate) for d in data]
+	conversion_factor = [flt(d.conversion_factor) for d in data]
+	split_percentage = [d.split_percentage for d in data]
+	qty = [flt(d.qty) for d in data]
+	returned_qty = [flt(d.get('returned_qty')) for d in data]
+	base_net_amount = [d.base_net_amount for d in data]
+	base_returned_amount = [flt(d.get('base_returned_amount')) for d in data]
+
+	cogs_per_unit = [r * cf * sp / 100 for r, cf, sp in zip(valuation_rate, conversion_factor, split_percentage)]
+	cogs_qty = [q - rq for q, rq in zip(qty, returned_qty)]
+	cogs = [cpu * q for cpu, q in zip(cogs_per_unit, cogs_qty)]
+
+	revenue = [a - ra for a, ra in zip(base_net_amount, base_returned_amount)]
+	revenue_per_unit = [r / q if q else 0 for r, q in zip(revenue, cogs_qty)]
+	gross_profit = [r - c for r, c in zip(revenue, cogs)]
+	gross_profit_per_unit = [gp / q if q else 0 for gp, q in zip(gross_profit, cogs_qty)]
+	profit_margin = [gp / r * 100 if r else 0 for gp, r in zip(gross_profit, revenue)]
+	profit_markup = [gp / c * 100 if c else 0 for gp, c in zip(gross_profit, cogs)]
+
+	for i, d in enumerate(data):
+		d.cogs_per_unit = cogs_per_unit[i]
+		d.cogs_qty = cogs_qty[i]
+		d.cogs = cogs[i]
+		d.revenue = revenue[i]
+		d.revenue_per_unit = revenue_per_unit[i]
+		d.gross_profit = gross_profit[i]
+		d.gross_profit_per_unit = gross_profit_per_unit[i]
+		d.profit_margin = profit_margin[i]
+		d.profit_markup = profit_markup[i]
+
+
+def get_group_totals_map(data, group_fields):
+	"""
+		Returns {((field, value), ...): [row count, [sums of group_total_fields]]} for every level of grouping,
+		outermost first, with rows added in their order so that sums match adding the rows of each group
+	"""
+	levels = [sorted(group_fields[:i]) for i in range(len(group_fields) + 1)]
 
-	source_map = {}
-
-	item_codes = list(set([d.get('item_code') for d in args if d.get('item_code')]))
-	stock_item_codes = get_stock_items(item_codes)
-
-	for i, d in enumerate(args):
-		if not d.get('item_code'):
-			continue
-
-		parent_doctype = d.get('dt') or d.get('parenttype') or d.get('doctype')
-		row_name = d.get('child_docname') or d.get('name')
-		docstatus = d.get('doc_status') or d.get('docstatus')
+	totals_map = {}
+	for d in data:
+		values = [flt(d[f]) for f in group_total_fields]
+		for fields in levels:
+			key = tuple((f, d.get(f)) for f in fields)
 
-		if d.get('item_code') in stock_item_codes and parent_doctype in ('Sales Invoice', 'Delivery Note'):
-			if d.get('delivery_note_item') and parent_doctype == "Sales Invoice":
-				voucher_detail_no = ('Delivery Note', d.get('delivery_note_item'))
-				source_map[i] = ('sle_outgoing_rate', voucher_detail_no)
-			elif docstatus == 1:
-				if row_name and (parent_doctype == "Delivery Note" or d.get('update_stock')):
-					voucher_detail_no = (parent_doctype, row_name)
-					source_map[i] = ('sle_outgoing_rate', voucher_detail_no)
-			else:
-				# get_incoming_rate
-				source_map[i] = (None, None)
-		else:
-			transaction_date = getdate(d.get('transaction_date') or d.get('posting_date') or d.get('date'))
-			source_map[i] = ('item_last_purchase_rate', (d.get('item_code'), transaction_date))
+			group_totals = totals_map.get(key)
+			if not group_totals:
+				group_totals = totals_map[key] = [0, [0] * len(group_total_fields)]
 
-	last_purchase_rate_item_dates = list(set([key for obj, key in source_map.values() if obj == 'item_last_purchase_rate']))
-	voucher_detail_nos = [key for obj, key in source_map.values() if obj == 'sle_outgoing_rate']
+			group_totals[0] += 1
+			sums = group_totals[1]
+			for i, value in enumerate(values):
+				sums[i] += value
 
-	out = frappe._dict()
-	out.sle_outgoing_rate = get_sle_outgoing_rate(voucher_detail_nos)
-	out.item_last_purchase_rate = get_item_last_purchase_rate(last_purchase_rate_item_dates)
-	out.source_map = source_map
-	return out
+	return totals_map
 
 
 def get_item_last_purchase_rate(args):
@@ -645,29 +704,6 @@ def get_item_last_purchase_rate(args):
 	return out
 
 
-def get_sle_outgoing_rate(voucher_detail_nos):
-	out = {}
-	if not voucher_detail_nos:
-		return out
-
-	values = []
-	for voucher_type, voucher_detail_no in voucher_detail_nos:
-		values.append(voucher_type)
-		values.append(voucher_detail_no)
-
-	res = frappe.db.sql("""
-		select sum(stock_value_difference) / sum(actual_qty) as outgoing_rate, voucher_type, voucher_detail_no
-		from `tabStock Ledger Entry`
-		where (voucher_type, voucher_detail_no) in ({0})
-		group by voucher_type, voucher_detail_no
-	""".format(", ".join(["(%s, %s)"] * len(voucher_detail_nos))), values, as_dict=1)
-
-	for d in res:
-		out[(d.voucher_type, d.voucher_detail_no)] = d.outgoing_rate
-
-	return out
-
-
 def get_stock_items(item_codes):
 	stock_items = []
 	if item_codes:
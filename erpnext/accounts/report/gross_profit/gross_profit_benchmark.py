@@ -0,0 +1,197 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""
+Benchmark of the Gross Profit computation on a generated dataset.
+
+Compares the row by row computation with the columnar one on the same rows, checks that both give the same
+output and prints the time taken by each. Valuation rates are generated with the rows, so only the in memory
+computation and grouping are measured. RowWiseGrossProfitGenerator also looks up valuation rates row by row,
+so that the report can be run both ways on the same invoices. Run with
+
+	bench --site [site] execute erpnext.accounts.report.gross_profit.gross_profit_benchmark.run --kwargs "{'rows': 200000}"
+"""
+
+import copy
+import json
+import random
+import timeit
+import frappe
+from frappe.utils import flt, add_days, getdate
+from erpnext.accounts.report.gross_profit.gross_profit import (GrossProfitGenerator, get_item_last_purchase_rate,
+	get_stock_items)
+
+
+class RowWiseGrossProfitGenerator(GrossProfitGenerator):
+	"""Row by row computation of cost and gross profit, with group totals summed from the rows of each group"""
+	def set_valuation_rates(self):
+		update_item_valuation_rates(self.data)
+
+	def calculate_gross_profit(self):
+		for item in self.data:
+			item.cogs_per_unit = flt(item.valuation_rate) * flt(item.conversion_factor)
+			item.cogs_per_unit = item.cogs_per_unit * item.split_percentage / 100
+
+			item.cogs_qty = flt(item.qty) - flt(item.get('returned_qty'))
+			item.cogs = item.cogs_per_unit * item.cogs_qty
+
+			self.postprocess_row(item)
+
+	def get_group_totals(self, data, grouped_by):
+		return None
+
+
+def update_item_valuation_rates(items):
+	"""Set valuation rate of each row from the Stock Ledger Entries of its own voucher row or the last purchase rate"""
+	incoming_rate_data = get_item_incoming_rate_data(items)
+
+	for i, d in enumerate(items):
+		source_info = incoming_rate_data.source_map.get(i)
+		if source_info:
+			source_type, source_key = source_info
+			source_object = incoming_rate_data.get(source_type)
+
+			if source_object:
+				d.valuation_rate = flt(source_object.get(source_key))
+			else:
+				d.valuation_rate = 0
+		else:
+			d.valuation_rate = 0
+
+
+def get_item_incoming_rate_data(args):
+	source_map = {}
+
+	item_codes = list(set([d.get('item_code') for d in args if d.get('item_code')]))
+	stock_item_codes = get_stock_items(item_codes)
+
+	for i, d in enumerate(args):
+		if not d.get('item_code'):
+			continue
+
+		parent_doctype = d.get('parenttype')
+		row_name = d.get('name')
+
+		if d.get('item_code') in stock_item_codes and parent_doctype == 'Sales Invoice':
+			if d.get('delivery_note_item'):
+				source_map[i] = ('sle_outgoing_rate', ('Delivery Note', d.get('delivery_note_item')))
+			elif d.get('docstatus') == 1 and row_name and d.get('update_stock'):
+				source_map[i] = ('sle_outgoing_rate', (parent_doctype, row_name))
+		else:
+			transaction_date = getdate(d.get('posting_date'))
+			source_map[i] = ('item_last_purchase_rate', (d.get('item_code'), transaction_date))
+
+	last_purchase_rate_item_dates = list(set([key for obj, key in source_map.values() if obj == 'item_last_purchase_rate']))
+	voucher_detail_nos = [key for obj, key in source_map.values() if obj == 'sle_outgoing_rate']
+
+	out = frappe._dict()
+	out.sle_outgoing_rate = get_sle_outgoing_rate(voucher_detail_nos)
+	out.item_last_purchase_rate = get_item_last_purchase_rate(last_purchase_rate_item_dates)
+	out.source_map = source_map
+	return out
+
+
+def get_sle_outgoing_rate(voucher_detail_nos):
+	out = {}
+	if not voucher_detail_nos:
+		return out
+
+	values = []
+	for voucher_type, voucher_detail_no in voucher_detail_nos:
+		values.append(voucher_type)
+		values.append(voucher_detail_no)
+
+	res = frappe.db.sql("""
+		select sum(stock_value_difference) / sum(actual_qty) as outgoing_rate, voucher_type, voucher_detail_no
+		from `tabStock Ledger Entry`
+		where (voucher_type, voucher_detail_no) in ({0})
+		group by voucher_type, voucher_detail_no
+	""".format(", ".join(["(%s, %s)"] * len(voucher_detail_nos))), values, as_dict=1)
+
+	for d in res:
+		out[(d.voucher_type, d.voucher_detail_no)] = d.outgoing_rate
+
+	return out
+
+
+def run(rows=100000, seed=1, group_by="Customer,Item", repeat=3):
+	data = get_dataset(rows, seed)
+	group_by = ["Group by " + d.strip() for d in group_by.split(",") if d.strip()]
+
+	results = {}
+	for generator_class in (RowWiseGrossProfitGenerator, GrossProfitGenerator):
+		timings = []
+		for i in range(repeat):
+			generator = get_generator(generator_class, copy.deepcopy(data), group_by)
+			start = timeit.default_timer()
+			generator.calculate_gross_profit()
+			result = generator.get_grouped_data()
+			timings.append(timeit.default_timer() - start)
+
+		results[generator_class.__name__] = frappe._dict({"time": min(timings), "result": result})
+		print("{0}: {1:.3f}s for {2} rows".format(generator_class.__name__, min(timings), rows))
+
+	row_wise, columnar = results["RowWiseGrossProfitGenerator"], results["GrossProfitGenerator"]
+	same_result = dump_result(row_wise.result) == dump_result(columnar.result)
+	print("Same output: {0}".format(same_result))
+	print("Speedup: {0:.2f}x".format(row_wise.time / columnar.time if columnar.time else 0))
+
+	return same_result
+
+
+def get_generator(generator_class, data, group_by):
+	"""Set up the report on in memory rows, without reading filters or defaults from the database"""
+	generator = generator_class.__new__(generator_class)
+	generator.filters = frappe._dict({"totals_only": 0})
+	for i, group in enumerate(group_by[:3]):
+		generator.filters["group_by_" + str(i + 1)] = group
+
+	generator.has_depreciation = False
+	generator.show_item_name = False
+	generator.data = data
+	generator.group_totals_map = None
+
+	return generator
+
+
+def get_dataset(rows, seed=1):
+	"""Generate invoice item rows like the ones returned by load_invoice_items, with valuation rates set"""
+	rng = random.Random(seed)
+	customers = ["Customer {0}".format(i) for i in range(max(rows // 200, 1))]
+	items = ["Item {0}".format(i) for i in range(max(rows // 100, 1))]
+	from_date = getdate("2026-01-01")
+
+	data = []
+	for i in range(rows):
+		qty = rng.randint(1, 20)
+		returned_qty = rng.choice([0] * 9 + [rng.randint(0, qty)])
+		rate = round(rng.uniform(1, 500), 2)
+		base_net_amount = round(qty * rate, 2)
+		depreciation_percentage = rng.choice([0] * 4 + [rng.randint(1, 50)])
+
+		data.append(frappe._dict({
+			"parent": "SINV-{0:07d}".format(i // 5),
+			"name": "row-{0}".format(i),
+			"idx": i % 5 + 1,
+			"posting_date": add_days(from_date, rng.randint(0, 364)),
+			"customer": rng.choice(customers),
+			"customer_group": "Commercial",
+			"territory": "All Territories",
+			"item_code": rng.choice(items),
+			"item_group": "Products",
+			"qty": qty,
+			"stock_qty": qty,
+			"conversion_factor": 1,
+			"base_net_amount": base_net_amount,
+			"returned_qty": returned_qty,
+			"base_returned_amount": round(returned_qty * rate, 2),
+			"valuation_rate": round(rate * rng.uniform(0.5, 1.1), 2),
+			"split_percentage": 100 - depreciation_percentage,
+			"doc_type": "Item",
+		}))
+
+	return data
+
+
+def dump_result(result):
+	return json.dumps(result, default=str, sort_keys=True)
@@ -0,0 +1,71 @@
+import json
+import frappe
+import unittest
+from frappe.utils import flt, nowdate, add_days
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from erpnext.accounts.doctype.sales_invoice.sales_invoice import make_sales_return
+from erpnext.accounts.report.gross_profit.gross_profit import execute
+from erpnext.accounts.report.gross_profit.gross_profit_benchmark import RowWiseGrossProfitGenerator
+from erpnext.stock.doctype.delivery_note.delivery_note import make_sales_invoice
+from erpnext.stock.doctype.delivery_note.test_delivery_note import create_delivery_note
+from erpnext.stock.doctype.item.test_item import create_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+
+test_dependencies = ["Product Bundle"]
+
+
+class TestGrossProfit(unittest.TestCase):
+	def test_columnar_and_row_wise_gross_profit_match(self):
+		warehouse = "_Test Warehouse - _TC"
+		item_code = create_item("_Test Gross Profit Item " + frappe.generate_hash(length=8)).name
+
+		make_stock_entry(item_code=item_code, target=warehouse, qty=20, basic_rate=100, posting_date=add_days(nowdate(), -5))
+		for bundle_item in ("_Test Item", "_Test Item Home Desktop 100"):
+			make_stock_entry(item_code=bundle_item, target=warehouse, qty=10, basic_rate=100)
+
+		# invoice with stock update and a return against it
+		si = create_sales_invoice(item_code=item_code, qty=5, rate=200, update_stock=1,
+			posting_date=add_days(nowdate(), -3))
+		return_si = make_sales_return(si.name)
+		return_si.items[0].qty = -2
+		return_si.insert()
+		return_si.submit()
+
+		# invoices against delivery notes, for a stock item and a product bundle
+		for dn_item_code, qty in ((item_code, 4), ("_Test Product Bundle Item", 2)):
+			dn = create_delivery_note(item_code=dn_item_code, qty=qty, rate=500)
+			dn_si = make_sales_invoice(dn.name)
+			dn_si.insert()
+			dn_si.submit()
+
+		# backdated receipt changes the outgoing rate of the later entries
+		make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=70, posting_date=add_days(nowdate(), -7))
+
+		for group_by in ([], ["Group by Invoice"], ["Group by Customer", "Group by Item"]):
+			filters = {
+				"company": "_Test Company",
+				"from_date": add_days(nowdate(), -10),
+				"to_date": nowdate(),
+				"include_non_stock_items": 1
+			}
+			for i, group in enumerate(group_by):
+				filters["group_by_" + str(i + 1)] = group
+
+			expected_columns, expected_data = RowWiseGrossProfitGenerator(frappe._dict(filters)).run()
+			columns, data = execute(frappe._dict(filters))
+
+			self.assertEqual(dump_result(columns), dump_result(expected_columns))
+			self.assertEqual(dump_result(data), dump_result(expected_data))
+
+		rows = execute(frappe._dict({
+			"company": "_Test Company",
+			"from_date": add_days(nowdate(), -10),
+			"to_date": nowdate(),
+			"sales_invoice": si.name
+		}))[1]
+		self.assertEqual(flt(rows[0].returned_qty), 2)
+		self.assertTrue(flt(rows[0].valuation_rate))
+
+
+def dump_result(result):
+	return json.dumps(result, default=str, sort_keys=True)
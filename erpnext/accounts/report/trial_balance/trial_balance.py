@@ -7,6 +7,8 @@ from frappe.utils import flt, getdate, formatdate, cstr
 from erpnext.accounts.report.financial_statements \
 	import filter_accounts, set_gl_entries_by_account, filter_out_zero_value_rows
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions, get_dimension_with_children
+from erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance import can_use_gl_daily_balances
+from erpnext.accounts.doctype.gl_closing_balance.gl_closing_balance import can_use_gl_closing_balances
 
 
 value_fields = ("opening_debit", "opening_credit", "debit", "credit", "closing_debit", "closing_credit")
@@ -82,9 +84,12 @@ def get_data(filters):
 	if filters.project:
 		filters.project = [filters.project]
 
-	set_gl_entries_by_account(filters.company, filters.from_date, filters.to_date,
-		min_lft, max_rgt, filters, gl_entries_by_account,
-		ignore_closing_entries=not flt(filters.with_period_closing_entry))
+	if can_use_closing_balances(filters):
+		set_gl_entries_by_account_from_closing_balances(filters, gl_entries_by_account)
+	else:
+		set_gl_entries_by_account(filters.company, filters.from_date, filters.to_date,
+			min_lft, max_rgt, filters, gl_entries_by_account,
+			ignore_closing_entries=not flt(filters.with_period_closing_entry))
 
 	total_row = calculate_values(accounts, gl_entries_by_account, opening_balances, filters, company_currency)
 	accumulate_values_into_parents(accounts, accounts_by_name)
@@ -105,13 +110,53 @@ def get_opening_balances(filters):
 	return balance_sheet_opening
 
 
+def can_use_closing_balances(filters):
+	"""Closing balances are kept per fiscal year, so they can be used when the whole fiscal year is shown"""
+	return (filters.from_date == filters.year_start_date and filters.to_date == filters.year_end_date
+		and can_use_gl_closing_balances(filters))
+
+
 def get_rootwise_opening_balances(filters, report_type):
+	if can_use_closing_balances(filters):
+		gle = get_rootwise_opening_balances_from_closing_balances(filters, report_type)
+	else:
+		gle = get_rootwise_opening_balances_from_gl_entries(filters, report_type)
+
+	opening = frappe._dict()
+	for d in gle:
+		opening.setdefault(d.account, d)
+
+	hooks = frappe.get_hooks('get_opening_account_balances')
+	for method in hooks:
+		opening_balances = frappe.get_attr(method)(filters)
+		if opening_balances is None:
+			continue
+
+		for account, opening_entry in opening_balances.items():
+			opening_data = opening.setdefault(account, frappe._dict({
+				'account': account, 'opening_debit': 0, 'opening_credit': 0
+			}))
+
+			if opening_entry.opening_balance >= 0:
+				opening_data['opening_debit'] += opening_entry.opening_balance
+			else:
+				opening_data['opening_credit'] += -1 * opening_entry.opening_balance
+
+	return opening
+
+
+def get_rootwise_opening_balances_from_gl_entries(filters, report_type):
+	use_daily_balances = can_use_gl_daily_balances(filters)
+
 	additional_conditions = []
 	if not filters.show_unclosed_fy_pl_balances and report_type == "Profit and Loss":
 		additional_conditions.append("posting_date >= %(year_start_date)s")
 
 	if not flt(filters.with_period_closing_entry):
-		additional_conditions.append("voucher_type != 'Period Closing Voucher'")
+		if use_daily_balances:
+			additional_conditions.append("is_period_closing = 0")
+		else:
+			additional_conditions.append("voucher_type != 'Period Closing Voucher'")
 
 	if filters.cost_center:
 		lft, rgt = frappe.db.get_value('Cost Center', filters.cost_center, ['lft', 'rgt'])
@@ -163,36 +208,113 @@ def get_rootwise_opening_balances(filters, report_type):
 	gle = frappe.db.sql("""
 		select
 			account, sum(debit) as opening_debit, sum(credit) as opening_credit
-		from `tabGL Entry`
+		from `{gl_table}`
 		where
 			company = %(company)s
 			{additional_conditions}
 			and (posting_date < %(from_date)s or is_opening = 'Yes')
 			and account in (select name from `tabAccount` where report_type=%(report_type)s)
 		group by account
-	""".format(additional_conditions=additional_conditions), query_filters, as_dict=True)
+	""".format(additional_conditions=additional_conditions,
+		gl_table="tabGL Daily Balance" if use_daily_balances else "tabGL Entry"), query_filters, as_dict=True)
 
-	opening = frappe._dict()
-	for d in gle:
-		opening.setdefault(d.account, d)
+	return gle
 
-	hooks = frappe.get_hooks('get_opening_account_balances')
-	for method in hooks:
-		opening_balances = frappe.get_attr(method)(filters)
-		if opening_balances is None:
-			continue
 
-		for account, opening_entry in opening_balances.items():
-			opening_data = opening.setdefault(account, frappe._dict({
-				'account': account, 'opening_debit': 0, 'opening_credit': 0
-			}))
+def get_rootwise_opening_balances_from_closing_balances(filters, report_type):
+	additional_conditions, query_filters = get_closing_balance_conditions(filters, for_opening=True)
 
-			if opening_entry.opening_balance >= 0:
-				opening_data['opening_debit'] += opening_entry.opening_balance
-			else:
-				opening_data['opening_credit'] += -1 * opening_entry.opening_balance
+	if not filters.show_unclosed_fy_pl_balances and report_type == "Profit and Loss":
+		additional_conditions.append("fy.year_start_date >= %(year_start_date)s")
 
-	return opening
+	query_filters.update({
+		"from_date": filters.from_date,
+		"report_type": report_type,
+		"year_start_date": filters.year_start_date
+	})
+
+	return frappe.db.sql("""
+		select
+			cb.account, sum(cb.debit) as opening_debit, sum(cb.credit) as opening_credit
+		from `tabGL Closing Balance` cb, `tabFiscal Year` fy
+		where
+			cb.fiscal_year = fy.name and cb.company = %(company)s
+			{additional_conditions}
+			and (fy.year_end_date < %(from_date)s or cb.is_opening = 'Yes')
+			and cb.account in (select name from `tabAccount` where report_type=%(report_type)s)
+		group by cb.account
+	""".format(additional_conditions="".join([" and " + c for c in additional_conditions])),
+		query_filters, as_dict=True)
+
+
+def set_gl_entries_by_account_from_closing_balances(filters, gl_entries_by_account):
+	additional_conditions, query_filters = get_closing_balance_conditions(filters)
+
+	query_filters.update({
+		"from_date": filters.from_date,
+		"to_date": filters.to_date
+	})
+
+	gl_entries = frappe.db.sql("""
+		select
+			cb.account, sum(cb.debit) as debit, sum(cb.credit) as credit, cb.is_opening
+		from `tabGL Closing Balance` cb, `tabFiscal Year` fy
+		where
+			cb.fiscal_year = fy.name and cb.company = %(company)s
+			{additional_conditions}
+			and fy.year_start_date >= %(from_date)s and fy.year_end_date <= %(to_date)s
+		group by cb.account, cb.is_opening
+	""".format(additional_conditions="".join([" and " + c for c in additional_conditions])),
+		query_filters, as_dict=True)
+
+	for entry in gl_entries:
+		gl_entries_by_account.setdefault(entry.account, []).append(entry)
+
+	return gl_entries_by_account
+
+
+def get_closing_balance_conditions(filters, for_opening=False):
+	"""
+		Returns conditions on GL Closing Balance matching the ones used on GL Entry
+		for opening balances (for_opening) or for the period in set_gl_entries_by_account
+	"""
+	additional_conditions = []
+	query_filters = {
+		"company": filters.company,
+		"finance_book": cstr(filters.finance_book),
+		"company_fb": frappe.db.get_value("Company", filters.company, 'default_finance_book')
+	}
+
+	if not flt(filters.with_period_closing_entry):
+		additional_conditions.append("cb.is_period_closing = 0")
+
+	if filters.cost_center:
+		lft, rgt = frappe.db.get_value('Cost Center', filters.cost_center, ['lft', 'rgt'])
+		additional_conditions.append("""cb.cost_center in (select name from `tabCost Center`
+			where lft >= {0} and rgt <= {1})""".format(lft, rgt))
+
+	if filters.project:
+		additional_conditions.append("cb.project in %(project)s")
+		query_filters["project"] = filters.project if isinstance(filters.project, list) else [filters.project]
+
+	# same finance book conditions as get_rootwise_opening_balances_from_gl_entries and set_gl_entries_by_account
+	if filters.include_default_book_entries and (filters.finance_book or not for_opening):
+		additional_conditions.append("cb.finance_book in (%(finance_book)s, %(company_fb)s, '')")
+	elif for_opening and filters.finance_book:
+		additional_conditions.append("cb.finance_book = %(finance_book)s")
+	elif not for_opening:
+		additional_conditions.append("cb.finance_book in (%(finance_book)s, '')")
+
+	for dimension in get_accounting_dimensions(as_list=False):
+		if filters.get(dimension.fieldname):
+			values = filters.get(dimension.fieldname)
+			if frappe.get_cached_value('DocType', dimension.document_type, 'is_tree'):
+				values = get_dimension_with_children(dimension.document_type, values)
+
+			additional_conditions.append("cb.{0} in %({0})s".format(dimension.fieldname))
+			query_filters[dimension.fieldname] = values if isinstance(values, list) else [values]
+
+	return additional_conditions, query_filters
 
 
 def calculate_values(accounts, gl_entries_by_account, opening_balances, filters, company_currency):
@@ -10,6 +10,8 @@ from frappe import throw, _
 from frappe.utils import formatdate, get_number_format_info
 # imported to enable erpnext.accounts.utils.get_account_currency
 from erpnext.accounts.doctype.account.account import get_account_currency
+from erpnext.accounts.doctype.party_open_item.party_open_item import (can_use_party_open_items,
+	get_party_open_items, get_party_open_item_balance, get_party_open_item_keys, update_party_open_items)
 
 from erpnext.stock.utils import get_stock_value_on
 from erpnext.stock import get_warehouse_account_map
@@ -135,10 +137,7 @@ def get_balance_on(account=None, date=None, party_type=None, party=None, company
 	if cost_center and report_type == 'Profit and Loss':
 		cc = frappe.get_doc("Cost Center", cost_center)
 		if cc.is_group:
-			cond.append(""" exists (
-				select 1 from `tabCost Center` cc where cc.name = gle.cost_center
-				and cc.lft >= %s and cc.rgt <= %s
-			)""" % (cc.lft, cc.rgt))
+			cond.append(get_descendant_ledgers_condition("gle.cost_center", "Cost Center", cost_center))
 
 		else:
 			cond.append("""gle.cost_center = %s """ % (frappe.db.escape(cost_center, percent=False), ))
@@ -156,10 +155,7 @@ def get_balance_on(account=None, date=None, party_type=None, party=None, company
 				% year_start_date)
 		# different filter for group and ledger - improved performance
 		if acc.is_group:
-			cond.append("""exists (
-				select name from `tabAccount` ac where ac.name = gle.account
-				and ac.lft >= %s and ac.rgt <= %s
-			)""" % (acc.lft, acc.rgt))
+			cond.append(get_descendant_ledgers_condition("gle.account", "Account", account))
 
 			# If group and currency same as company,
 			# always return balance based on debit and credit in company currency
@@ -189,6 +185,128 @@ def get_balance_on(account=None, date=None, party_type=None, party=None, company
 		return flt(bal)
 
 
+def get_balances_on(accounts, date=None, company=None, in_account_currency=True, cost_center=None,
+	ignore_account_permission=False):
+	"""
+		Returns {account: balance} for many accounts with one grouped query per report type,
+		same as calling get_balance_on for each account
+	"""
+	balances = frappe._dict({account: 0.0 for account in accounts})
+	if not accounts:
+		return balances
+
+	if not date:
+		date = nowdate()
+
+	try:
+		year_start_date = get_fiscal_year(date, company=company, verbose=0)[1]
+	except FiscalYearError:
+		if getdate(date) > getdate(nowdate()):
+			year_start_date = get_fiscal_year(nowdate(), verbose=1)[1]
+		else:
+			return balances
+
+	account_details = frappe.db.sql("""
+		select name, report_type, is_group, account_currency, company
+		from tabAccount
+		where name in %s
+	""", [list(set(accounts))], as_dict=1)
+
+	ledgers_by_report_type = {}
+	account_ledgers = {}
+	account_in_account_currency = {}
+	for acc in account_details:
+		if not (frappe.flags.ignore_account_permission or ignore_account_permission):
+			frappe.has_permission("Account", "read", acc.name, throw=True)
+
+		account_ledgers[acc.name] = get_descendant_ledgers("Account", acc.name) if acc.is_group else [acc.name]
+		ledgers_by_report_type.setdefault(acc.report_type, set()).update(account_ledgers[acc.name])
+
+		# group accounts in company currency are always in company currency
+		account_in_account_currency[acc.name] = in_account_currency and not (acc.is_group
+			and acc.account_currency == frappe.get_cached_value('Company', acc.company, "default_currency"))
+
+	ledger_balances = {}
+	for report_type, ledgers in ledgers_by_report_type.items():
+		if not ledgers:
+			continue
+
+		cond = ["gle.posting_date <= %(date)s", "gle.account in %(ledgers)s"]
+		if report_type == 'Profit and Loss':
+			cond.append("gle.posting_date >= %(year_start_date)s and gle.voucher_type != 'Period Closing Voucher'")
+
+			if cost_center:
+				if frappe.get_cached_value("Cost Center", cost_center, "is_group"):
+					cond.append(get_descendant_ledgers_condition("gle.cost_center", "Cost Center", cost_center))
+				else:
+					cond.append("gle.cost_center = %(cost_center)s")
+
+		if company:
+			cond.append("gle.company = %(company)s")
+
+		for d in frappe.db.sql("""
+			select account,
+				sum(debit) - sum(credit) as balance,
+				sum(debit_in_account_currency) - sum(credit_in_account_currency) as balance_in_account_currency
+			from `tabGL Entry` gle
+			where {0}
+			group by account
+		""".format(" and ".join(cond)), {
+			"date": date,
+			"year_start_date": year_start_date,
+			"ledgers": list(ledgers),
+			"cost_center": cost_center,
+			"company": company
+		}, as_dict=1):
+			ledger_balances[d.account] = d
+
+	for account, ledgers in account_ledgers.items():
+		fieldname = "balance_in_account_currency" if account_in_account_currency[account] else "balance"
+		balances[account] = flt(sum([flt(ledger_balances[d][fieldname]) for d in ledgers if d in ledger_balances]))
+
+	return balances
+
+
+def get_descendant_ledgers(doctype, name):
+	"""Returns ledger (non group) nodes under a group Account or Cost Center from the cached tree closure"""
+	return get_tree_closure(doctype).get(name) or []
+
+
+def get_descendant_ledgers_condition(fieldname, doctype, name):
+	ledgers = get_descendant_ledgers(doctype, name)
+	if not ledgers:
+		return "1=0"
+
+	return "{0} in ({1})".format(fieldname, ", ".join([frappe.db.escape(d, percent=False) for d in ledgers]))
+
+
+def get_tree_closure(doctype):
+	"""Returns {group: [descendant ledgers]} for a tree doctype, cached until the tree changes"""
+	def _get_tree_closure():
+		closure = {}
+		parents = []
+		for d in frappe.db.sql("""
+			select name, lft, rgt, is_group from `tab{0}` order by lft
+		""".format(doctype), as_dict=1):
+			while parents and parents[-1].rgt < d.lft:
+				parents.pop()
+
+			if d.is_group:
+				closure.setdefault(d.name, [])
+				parents.append(d)
+			else:
+				for parent in parents:
+					closure[parent.name].append(d.name)
+
+		return closure
+
+	return frappe.cache().hget("tree_closure", doctype, _get_tree_closure)
+
+
+def clear_tree_closure_cache(doc, method=None):
+	frappe.cache().hdel("tree_closure", doc.doctype)
+
+
 def get_balance_on_voucher(voucher_type, voucher_no, party_type, party, account, dr_or_cr=None, include_original_references=False):
 	if not dr_or_cr:
 		if erpnext.get_party_account_type(party_type) == 'Receivable':
@@ -196,6 +314,11 @@ def get_balance_on_voucher(voucher_type, voucher_no, party_type, party, account,
 		else:
 			dr_or_cr = "credit_in_account_currency - debit_in_account_currency"
 
+	if not include_original_references and not isinstance(account, list) and can_use_party_open_items():
+		balance = get_party_open_item_balance(voucher_type, voucher_no, party_type, party, account, dr_or_cr)
+		if balance is not None:
+			return balance
+
 	if isinstance(account, list):
 		account = [frappe.db.escape(d) for d in account]
 		account_condition = "account in ({0})".format(", ".join(account))
@@ -251,10 +374,7 @@ def get_count_on(account, fieldname, date):
 
 		# different filter for group and ledger - improved performance
 		if acc.is_group:
-			cond.append("""exists (
-				select name from `tabAccount` ac where ac.name = gle.account
-				and ac.lft >= %s and ac.rgt <= %s
-			)""" % (acc.lft, acc.rgt))
+			cond.append(get_descendant_ledgers_condition("gle.account", "Account", account))
 		else:
 			cond.append("""gle.account = %s """ % (frappe.db.escape(account, percent=False), ))
 
@@ -596,6 +716,14 @@ def unlink_ref_doc_from_payment_entries(ref_doc, validate_permission=False):
 	remove_ref_doc_link_from_jv(ref_doc.doctype, ref_doc.name)
 	remove_ref_doc_link_from_pe(ref_doc.doctype, ref_doc.name)
 
+	linked_gl_entries = frappe.db.sql_list("""
+		select name from `tabGL Entry`
+		where ((against_voucher_type=%(doctype)s and against_voucher=%(name)s)
+			or (original_against_voucher_type=%(doctype)s and original_against_voucher=%(name)s))
+			and voucher_no != ifnull(against_voucher, '')
+	""", {"doctype": ref_doc.doctype, "name": ref_doc.name})
+	open_item_keys = get_party_open_item_keys("name in %s", [linked_gl_entries]) if linked_gl_entries else set()
+
 	frappe.db.sql("""
 		update `tabGL Entry`
 		set against_voucher_type=original_against_voucher_type, against_voucher=original_against_voucher,
@@ -621,6 +749,10 @@ def unlink_ref_doc_from_payment_entries(ref_doc, validate_permission=False):
 			and voucher_no != ifnull(against_voucher, '')
 	""", (now(), frappe.session.user, ref_doc.doctype, ref_doc.name))
 
+	if linked_gl_entries:
+		open_item_keys |= get_party_open_item_keys("name in %s", [linked_gl_entries])
+		update_party_open_items(open_item_keys)
+
 	if ref_doc.doctype in ("Sales Invoice", "Purchase Invoice", "Landed Cost Voucher", "Expense Claim"):
 		ref_doc.set("advances", [])
 
@@ -701,6 +833,9 @@ def get_company_default(company, fieldname):
 
 
 def fix_total_debit_credit():
+	from erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance import update_gl_daily_balances_from_gl_entries
+	from erpnext.accounts.doctype.gl_closing_balance.gl_closing_balance import update_gl_closing_balances_from_gl_entries
+
 	vouchers = frappe.db.sql("""select voucher_type, voucher_no,
 		sum(debit) - sum(credit) as diff
 		from `tabGL Entry`
@@ -711,10 +846,23 @@ def fix_total_debit_credit():
 		if abs(d.diff) > 0:
 			dr_or_cr = d.voucher_type == "Sales Invoice" and "credit" or "debit"
 
-			frappe.db.sql("""update `tabGL Entry` set %s = %s + %s
-				where voucher_type = %s and voucher_no = %s and %s > 0 limit 1""" %
-				(dr_or_cr, dr_or_cr, '%s', '%s', '%s', dr_or_cr),
-				(d.diff, d.voucher_type, d.voucher_no))
+			gl_entry = frappe.db.sql_list("""select name from `tabGL Entry`
+				where voucher_type = %s and voucher_no = %s and {0} > 0 limit 1""".format(dr_or_cr),
+				(d.voucher_type, d.voucher_no))
+			if not gl_entry:
+				continue
+
+			# the entry is removed from the GL rollups and added back after the update
+			update_gl_daily_balances_from_gl_entries("name = %s", gl_entry, sign=-1)
+			update_gl_closing_balances_from_gl_entries("name = %s", gl_entry, sign=-1)
+			open_item_keys = get_party_open_item_keys("name = %s", gl_entry)
+
+			frappe.db.sql("""update `tabGL Entry` set {0} = {0} + %s
+				where name = %s""".format(dr_or_cr), (d.diff, gl_entry[0]))
+
+			update_gl_daily_balances_from_gl_entries("name = %s", gl_entry, sign=1)
+			update_gl_closing_balances_from_gl_entries("name = %s", gl_entry, sign=1)
+			update_party_open_items(open_item_keys)
 
 
 def get_stock_and_account_balance(account=None, posting_date=None, company=None):
@@ -790,7 +938,15 @@ def get_held_invoices(party_type, party):
 	return held_invoices
 
 
-def get_outstanding_invoices(party_type, party, account, condition=None, include_negative_outstanding=False):
+def get_outstanding_invoices(party_type, party, account, condition=None, include_negative_outstanding=False,
+		gl_entry_condition=False):
+	"""
+		Returns outstanding invoices of a party account.
+
+		:param condition: applied on voucher_type, voucher_no, posting_date, due_date or company
+		:param gl_entry_condition: condition also filters other GL Entry columns, such as cost center or amounts,
+			and is applied on each GL Entry instead of the party open items
+	"""
 	outstanding_invoices = []
 	precision = frappe.get_precision("Sales Invoice", "outstanding_amount") or 2
 
@@ -810,6 +966,44 @@ def get_outstanding_invoices(party_type, party, account, condition=None, include
 
 	held_invoices = get_held_invoices(party_type, party)
 
+	if can_use_party_open_items() and not gl_entry_condition:
+		# condition is applied on Party Open Item which has the voucher columns of GL Entry
+		invoice_list = get_party_open_items(party_type, party, account, condition)
+		pe_map = frappe._dict()
+		for d in invoice_list:
+			pe_map[(d.voucher_type, d.voucher_no)] = d.payment_amount
+	else:
+		invoice_list, pe_map = get_invoices_and_payments_from_gl_entries(party_type, party, account,
+			dr_or_cr, payment_dr_or_cr, condition)
+
+	for d in invoice_list:
+		payment_amount = pe_map.get((d.voucher_type, d.voucher_no), 0)
+		outstanding_amount = flt(d.invoice_amount - payment_amount, precision)
+		diff = abs(outstanding_amount) if include_negative_outstanding else outstanding_amount
+		if diff > 0.5 / (10**precision):
+			if d.voucher_type != "Purchase Invoice" or d.voucher_no not in held_invoices:
+				due_date = d.get("due_date") if "due_date" in d else frappe.db.get_value(
+					d.voucher_type, d.voucher_no, "posting_date" if party_type == "Employee" else "due_date")
+
+				outstanding_invoices.append(
+					frappe._dict({
+						'voucher_no': d.voucher_no,
+						'voucher_type': d.voucher_type,
+						'posting_date': d.posting_date,
+						'invoice_amount': flt(d.invoice_amount),
+						'payment_amount': payment_amount,
+						'outstanding_amount': outstanding_amount,
+						'due_date': due_date,
+						'currency': d.currency
+					})
+				)
+
+	outstanding_invoices = sorted(outstanding_invoices,
+		key=lambda k: (k['outstanding_amount'] > 0, k['due_date'] or getdate(nowdate())))
+	return outstanding_invoices
+
+
+def get_invoices_and_payments_from_gl_entries(party_type, party, account, dr_or_cr, payment_dr_or_cr, condition=None):
 	invoice_list = frappe.db.sql("""
 		select
 			voucher_no, voucher_type, posting_date, ifnull(sum({dr_or_cr}), 0) as invoice_amount
@@ -846,32 +1040,7 @@ def get_outstanding_invoices(party_type, party, account, condition=None, include
 	for d in payment_entries:
 		pe_map.setdefault((d.against_voucher_type, d.against_voucher), d.payment_amount)
 
-	for d in invoice_list:
-		payment_amount = pe_map.get((d.voucher_type, d.voucher_no), 0)
-		outstanding_amount = flt(d.invoice_amount - payment_amount, precision)
-		diff = abs(outstanding_amount) if include_negative_outstanding else outstanding_amount
-		if diff > 0.5 / (10**precision):
-			if not d.voucher_type == "Purchase Invoice" or d.voucher_no not in held_invoices:
-				due_date = frappe.db.get_value(
-					d.voucher_type, d.voucher_no, "posting_date" if party_type == "Employee" else "due_date")
-
-			if d.voucher_type != "Purchase Invoice" or d.voucher_no not in held_invoices:
-				outstanding_invoices.append(
-					frappe._dict({
-						'voucher_no': d.voucher_no,
-						'voucher_type': d.voucher_type,
-						'posting_date': d.posting_date,
-						'invoice_amount': flt(d.invoice_amount),
-						'payment_amount': payment_amount,
-						'outstanding_amount': outstanding_amount,
-						'due_date': due_date,
-						'currency': d.currency
-					})
-				)
-
-	outstanding_invoices = sorted(outstanding_invoices,
-		key=lambda k: (k['outstanding_amount'] > 0, k['due_date'] or getdate(nowdate())))
-	return outstanding_invoices
+	return invoice_list, pe_map
 
 
 def get_account_name(account_type=None, root_type=None, is_group=None, account_currency=None, company=None):
@@ -43,6 +43,52 @@ def make_demo(context, site, domain='Manufacturing', days=100,
 			from erpnext.demo import demo
 			demo.make(domain, days)
 
+@click.command('verify-party-open-items')
+@click.option('--rebuild', default=False, is_flag=True,
+	help='Rebuild Party Open Items from GL Entry after comparing')
+@pass_context
+def verify_party_open_items(context, rebuild=False):
+	"Compare Party Open Items with GL Entry and print the differences"
+	from erpnext.accounts.doctype.party_open_item.party_open_item import verify_party_open_items
+
+	for site in context.sites:
+		with frappe.init_site(site):
+			frappe.connect()
+			differences = verify_party_open_items(rebuild=rebuild)
+			for d in differences:
+				print("{0}: {1} expected {2}, found {3}".format(" / ".join(d.key), d.fieldname or "open item",
+					d.expected, d.existing))
+
+			print("{0}: {1} differences found".format(site, len(differences)))
+			if rebuild:
+				frappe.db.commit()
+				print("{0}: Party Open Items rebuilt".format(site))
+
+@click.command('verify-gl-closing-balances')
+@click.option('--workers', default=1, type=int,
+	help='Number of worker processes that verify chunks of accounts in parallel')
+@click.option('--rebuild', default=False, is_flag=True,
+	help='Rebuild the accounts that differ from GL Entry')
+@pass_context
+def verify_gl_closing_balances(context, workers=1, rebuild=False):
+	"Compare GL Closing Balances with GL Entry and print the differences"
+	from erpnext.accounts.doctype.gl_closing_balance.gl_closing_balance import verify_gl_closing_balances
+
+	for site in context.sites:
+		with frappe.init_site(site):
+			frappe.connect()
+			differences = verify_gl_closing_balances(workers=workers, rebuild=rebuild)
+			for d in differences:
+				print("{0}: {1} expected {2}, found {3}".format(" / ".join(d.key), d.fieldname,
+					d.expected, d.existing))
+
+			print("{0}: {1} differences found".format(site, len(differences)))
+			if rebuild:
+				frappe.db.commit()
+				print("{0}: GL Closing Balances rebuilt".format(site))
+
 commands = [
-	make_demo
+	make_demo,
+	verify_party_open_items,
+	verify_gl_closing_balances
 ]
\ No newline at end of file
@@ -10,7 +10,8 @@ from erpnext.stock.get_item_details import get_conversion_factor, get_default_su
 from erpnext.buying.utils import validate_for_items, update_last_purchase_rate
 from erpnext.stock.stock_ledger import get_valuation_rate
 from erpnext.stock.doctype.stock_entry.stock_entry import get_used_alternative_items
-from erpnext.accounts.doctype.budget.budget import validate_expense_against_budget
+from erpnext.accounts.doctype.budget.budget import validate_expense_against_budget, BudgetContext
+from erpnext.accounts.utils import get_fiscal_year
 from erpnext.controllers.transaction_controller import TransactionController
 import json
 
@@ -1007,15 +1008,18 @@ class BuyingController(TransactionController):
 
 	def validate_budget(self):
 		if self.docstatus == 1:
+			posting_date = self.schedule_date if self.doctype == 'Material Request' else self.transaction_date
+			budget_context = BudgetContext(self.company, get_fiscal_year(posting_date, company=self.company)[0])
+
 			for data in self.get('items'):
 				args = data.as_dict()
 				args.update({
 					'doctype': self.doctype,
 					'company': self.company,
-					'posting_date': self.schedule_date if self.doctype == 'Material Request' else self.transaction_date
+					'posting_date': posting_date
 				})
 
-				validate_expense_against_budget(args)
+				validate_expense_against_budget(args, budget_context)
 
 	def process_fixed_asset(self):
 		if self.doctype == 'Purchase Invoice' and not self.update_stock:
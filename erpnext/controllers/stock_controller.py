@@ -7,7 +7,9 @@ from frappe.utils import cint, flt, cstr
 from frappe import _
 import frappe.defaults
 from erpnext.accounts.utils import get_fiscal_year
-from erpnext.accounts.general_ledger import make_gl_entries, delete_gl_entries, process_gl_map, delete_voucher_gl_entries
+from erpnext.accounts.general_ledger import make_gl_entries, delete_gl_entries, process_gl_map, delete_gl_entries_for_vouchers
+from erpnext.accounts.doctype.gl_daily_balance.gl_daily_balance import update_gl_daily_balances_from_gl_entries
+from erpnext.accounts.doctype.gl_closing_balance.gl_closing_balance import update_gl_closing_balances_from_gl_entries
 from erpnext.controllers.accounts_controller import AccountsController
 from erpnext.stock.stock_ledger import get_valuation_rate
 from erpnext.stock import get_warehouse_account_map
@@ -15,6 +17,9 @@ from frappe.model.meta import get_field_precision
 import json
 
 
+gl_repost_chunk_size = 500
+
+
 class QualityInspectionRequiredError(frappe.ValidationError): pass
 class QualityInspectionRejectedError(frappe.ValidationError): pass
 class QualityInspectionNotSubmittedError(frappe.ValidationError): pass
@@ -548,9 +553,11 @@ def update_gl_entries_for_reposted_stock_vouchers(excluded_vouchers=None, only_i
 		if only_if_value_changed:
 			vouchers = [d for d in vouchers if d in frappe.flags.stock_ledger_vouchers_value_changed]
 
-		update_gl_entries_for_stock_voucher(vouchers, excluded_vouchers=excluded_vouchers, verbose=verbose)
+		update_gl_entries_for_stock_voucher(vouchers, excluded_vouchers=excluded_vouchers, verbose=verbose,
+			value_deltas=frappe.flags.stock_ledger_voucher_value_deltas)
 
 		frappe.flags.stock_ledger_vouchers_reposted = None
+		frappe.flags.stock_ledger_voucher_value_deltas = None
 
 
 def update_gl_entries_after(posting_date, posting_time, for_warehouses=None, for_items=None, item_warehouse_list=None):
@@ -559,14 +566,32 @@ def update_gl_entries_after(posting_date, posting_time, for_warehouses=None, for
 	update_gl_entries_for_stock_voucher(future_stock_vouchers)
 
 
-def update_gl_entries_for_stock_voucher(stock_vouchers, excluded_vouchers=None, verbose=False):
+def update_gl_entries_for_stock_voucher(stock_vouchers, excluded_vouchers=None, verbose=False, value_deltas=None):
+	"""
+		Repost GL Entries of stock vouchers whose stock value has changed.
+
+		:param value_deltas: dict of (voucher_type, voucher_no) -> {warehouse: change in stock_value_difference}
+			recorded during repost. Vouchers with only one stock row per warehouse account and one counter row
+			are adjusted in place using these, the rest are rebuilt from the voucher document.
+	"""
 	gle = get_voucherwise_gl_entries(stock_vouchers)
 
 	if excluded_vouchers and isinstance(excluded_vouchers, tuple):
 		excluded_vouchers = [excluded_vouchers]
 
+	stock_vouchers = [d for d in stock_vouchers if not excluded_vouchers or d not in excluded_vouchers]
+
+	adjusted_vouchers = set()
+	if value_deltas:
+		adjusted_vouchers = adjust_stock_gl_entries(stock_vouchers, gle, value_deltas)
+		if verbose:
+			for voucher_type, voucher_no in adjusted_vouchers:
+				print("Adjusted GLEs for {0} {1}".format(voucher_type, voucher_no))
+
+	vouchers_to_delete = []
+	vouchers_to_make = []
 	for voucher_type, voucher_no in stock_vouchers:
-		if excluded_vouchers and (voucher_type, voucher_no) in excluded_vouchers:
+		if (voucher_type, voucher_no) in adjusted_vouchers:
 			continue
 
 		existing_gle = gle.get((voucher_type, voucher_no), [])
@@ -577,12 +602,157 @@ def update_gl_entries_for_stock_voucher(stock_vouchers, excluded_vouchers=None,
 				if verbose:
 					print("Reposting GLEs for {0} {1}".format(voucher_type, voucher_no))
 
-				delete_voucher_gl_entries(voucher_type, voucher_no)
-				voucher_obj.make_gl_entries(gl_entries=expected_gle, repost_future_gle=False, from_repost=True)
+				if existing_gle:
+					vouchers_to_delete.append((voucher_type, voucher_no))
+				vouchers_to_make.append((voucher_obj, expected_gle))
 		elif existing_gle:
 			if verbose:
 				print("Deleting GLEs for {0} {1} because expected GLEs is empty".format(voucher_type, voucher_no))
-			delete_voucher_gl_entries(voucher_type, voucher_no)
+			vouchers_to_delete.append((voucher_type, voucher_no))
+
+	delete_gl_entries_for_vouchers(vouchers_to_delete, gl_repost_chunk_size)
+
+	for voucher_obj, expected_gle in vouchers_to_make:
+		voucher_obj.make_gl_entries(gl_entries=expected_gle, repost_future_gle=False, from_repost=True)
+
+
+def adjust_stock_gl_entries(stock_vouchers, voucherwise_gle, value_deltas):
+	"""
+		Adjust the stock and counter (expense) GL Entry of vouchers that use StockController.get_gl_entries
+		by the change in stock_value_difference of their Stock Ledger Entries.
+
+		A voucher is adjusted only if the existing GL Entries have exactly one row per stock account and
+		one counter row in company currency, and the adjusted stock rows match the reposted Stock Ledger Entries.
+		Returns set of (voucher_type, voucher_no) that were adjusted.
+	"""
+	from frappe.model.base_document import get_controller
+
+	precision = frappe.get_precision("GL Entry", "debit")
+
+	candidates = []
+	for voucher in stock_vouchers:
+		if voucher not in value_deltas or not voucherwise_gle.get(voucher):
+			continue
+
+		controller = get_controller(voucher[0])
+		if getattr(controller, "get_gl_entries", None) is not StockController.get_gl_entries:
+			continue
+
+		candidates.append(voucher)
+
+	stock_values = get_voucherwise_stock_value_difference(candidates)
+
+	gl_updates = []
+	adjusted_vouchers = set()
+	for voucher in candidates:
+		existing_gle = voucherwise_gle[voucher]
+		warehouse_account = get_warehouse_account_map(existing_gle[0].company)
+
+		# expected net value per stock account from reposted Stock Ledger Entries
+		expected_values = {}
+		account_deltas = {}
+		for warehouse, stock_value_difference in stock_values.get(voucher, []):
+			if not warehouse_account.get(warehouse):
+				break
+			account = warehouse_account[warehouse]["account"]
+			expected_values[account] = expected_values.get(account, 0) + flt(stock_value_difference, precision)
+		else:
+			for warehouse, delta in value_deltas[voucher].items():
+				account = warehouse_account.get(warehouse, {}).get("account")
+				account_deltas[account] = account_deltas.get(account, 0) + flt(delta)
+
+			updates = get_adjusted_stock_gl_entries(existing_gle, expected_values, account_deltas, precision)
+			if updates is not None:
+				gl_updates += updates
+				adjusted_vouchers.add(voucher)
+
+	bulk_update_gl_entry_values(gl_updates)
+
+	return adjusted_vouchers
+
+
+def get_adjusted_stock_gl_entries(existing_gle, expected_values, account_deltas, precision):
+	"""Returns list of (gl_entry_name, net debit) to update, or None if the GL Entries cannot be adjusted in place"""
+	stock_rows = {}
+	counter_rows = []
+	for d in existing_gle:
+		if flt(d.debit) != flt(d.debit_in_account_currency) or flt(d.credit) != flt(d.credit_in_account_currency):
+			return None
+
+		if d.account in expected_values:
+			if d.account in stock_rows:
+				return None
+			stock_rows[d.account] = d
+		else:
+			counter_rows.append(d)
+
+	if len(counter_rows) != 1 or set(stock_rows) != set(expected_values) or not set(account_deltas) <= set(stock_rows):
+		return None
+
+	updates = []
+	total_stock_value = 0
+	for account, d in stock_rows.items():
+		new_value = flt(flt(d.debit) - flt(d.credit) + account_deltas.get(account, 0), precision)
+
+		# existing GL Entries are out of sync with the Stock Ledger, rebuild from the voucher
+		if new_value != flt(expected_values[account], precision) or not new_value:
+			return None
+
+		total_stock_value += new_value
+		updates.append((d.name, new_value))
+
+	total_stock_value = flt(total_stock_value, precision)
+	if not total_stock_value:
+		return None
+
+	updates.append((counter_rows[0].name, -total_stock_value))
+	return updates
+
+
+def get_voucherwise_stock_value_difference(stock_vouchers):
+	out = {}
+	for i in range(0, len(stock_vouchers), gl_repost_chunk_size):
+		sles = frappe.db.sql("""
+			select voucher_type, voucher_no, warehouse, stock_value_difference
+			from `tabStock Ledger Entry`
+			where (voucher_type, voucher_no) in %s and ifnull(is_cancelled, 'No') = 'No'
+		""", [stock_vouchers[i:i + gl_repost_chunk_size]], as_dict=1)
+
+		for d in sles:
+			out.setdefault((d.voucher_type, d.voucher_no), []).append((d.warehouse, d.stock_value_difference))
+
+	return out
+
+
+def bulk_update_gl_entry_values(gl_updates):
+	"""Set debit and credit of GL Entries from a net debit value, one UPDATE statement per chunk"""
+	from frappe.utils import now
+
+	for i in range(0, len(gl_updates), gl_repost_chunk_size):
+		chunk = gl_updates[i:i + gl_repost_chunk_size]
+
+		set_clauses = []
+		values = []
+		for fieldname in ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency"):
+			set_clauses.append("`{0}` = case name {1} end".format(fieldname, " ".join(["when %s then %s"] * len(chunk))))
+			for name, net_value in chunk:
+				if fieldname.startswith("debit"):
+					values += [name, net_value if net_value > 0 else 0]
+				else:
+					values += [name, -net_value if net_value < 0 else 0]
+
+		names = [name for name, net_value in chunk]
+		values += [now(), names]
+
+		update_gl_daily_balances_from_gl_entries("name in %s", [names], sign=-1)
+		update_gl_closing_balances_from_gl_entries("name in %s", [names], sign=-1)
+		frappe.db.sql("""
+			update `tabGL Entry`
+			set {0}, modified = %s
+			where name in %s
+		""".format(", ".join(set_clauses)), values)
+		update_gl_daily_balances_from_gl_entries("name in %s", [names], sign=1)
+		update_gl_closing_balances_from_gl_entries("name in %s", [names], sign=1)
 
 
 def compare_existing_and_expected_gle(existing_gle, expected_gle):
@@ -240,6 +240,11 @@ class calculate_taxes_and_totals(object):
 			item.item_tax_detail = {}
 			item.item_taxes = 0
 
+		self.tax_plan = self.get_tax_plan()
+
+	def get_tax_plan(self):
+		return TaxCalculationPlan(self)
+
 	def determine_exclusive_rate(self):
 		for item in self.doc.get("items"):
 			item.cumulated_tax_fraction = 0
@@ -247,18 +252,19 @@ class calculate_taxes_and_totals(object):
 		if not any((cint(tax.included_in_print_rate) for tax in self.doc.get("taxes"))):
 			return
 
+		taxes = self.tax_plan.taxes
 		for item in self.doc.get("items"):
 			has_margin_field = item.meta.has_field("margin_type")
-			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
+			tax_rates = self.tax_plan.get_tax_rates(item.item_tax_rate)
 
-			for i, tax in enumerate(self.doc.get("taxes")):
-				tax.tax_fraction_for_current_item = self.get_current_tax_fraction(tax, item_tax_map)
+			for i, tax in enumerate(taxes):
+				tax.tax_fraction_for_current_item = self.get_current_tax_fraction(tax, tax_rates[i])
 
 				if i==0:
 					tax.grand_total_fraction_for_current_item = 1 + tax.tax_fraction_for_current_item
 				else:
 					tax.grand_total_fraction_for_current_item = \
-						self.doc.get("taxes")[i-1].grand_total_fraction_for_current_item \
+						taxes[i-1].grand_total_fraction_for_current_item \
 						+ tax.tax_fraction_for_current_item
 
 				item.cumulated_tax_fraction += tax.tax_fraction_for_current_item
@@ -319,7 +325,7 @@ class calculate_taxes_and_totals(object):
 	def _load_item_tax_rate(self, item_tax_rate):
 		return json.loads(item_tax_rate) if item_tax_rate else {}
 
-	def get_current_tax_fraction(self, tax, item_tax_map):
+	def get_current_tax_fraction(self, tax, tax_rate):
 		"""
 			Get tax fraction for calculating tax exclusive amount
 			from tax inclusive amount
@@ -327,18 +333,16 @@ class calculate_taxes_and_totals(object):
 		current_tax_fraction = 0
 
 		if cint(tax.included_in_print_rate):
-			tax_rate = self._get_tax_rate(tax, item_tax_map)
-
 			if tax.charge_type == "On Net Total":
 				current_tax_fraction = tax_rate / 100.0
 
 			elif tax.charge_type == "On Previous Row Amount":
 				current_tax_fraction = (tax_rate / 100.0) * \
-					self.doc.get("taxes")[cint(tax.row_id) - 1].tax_fraction_for_current_item
+					self.tax_plan.get_previous_row(tax).tax_fraction_for_current_item
 
 			elif tax.charge_type == "On Previous Row Total":
 				current_tax_fraction = (tax_rate / 100.0) * \
-					self.doc.get("taxes")[cint(tax.row_id) - 1].grand_total_fraction_for_current_item
+					self.tax_plan.get_previous_row(tax).grand_total_fraction_for_current_item
 
 		if getattr(tax, "add_deduct_tax", None):
 			current_tax_fraction *= -1.0 if (tax.add_deduct_tax == "Deduct") else 1.0
@@ -442,31 +446,35 @@ class calculate_taxes_and_totals(object):
 
 	def calculate_taxes(self):
 		self.doc.rounding_adjustment = 0
+		taxes = self.tax_plan.taxes
+		items = self.doc.get("items")
+		self.tax_plan.set_item_totals(items)
+
 		# maintain actual tax rate based on idx
-		actual_tax_dict = dict([[tax.idx,
-			flt(tax.tax_amount, tax.precision("tax_amount")) if self.should_round_transaction_currency() else tax.tax_amount]
-			for tax in self.doc.get("taxes") if tax.charge_type in ["Actual", "Weighted Distribution"]])
+		actual_tax_dict = dict([[tax.idx, self.tax_plan.get_actual_tax_amount(tax)]
+			for tax in taxes if tax.charge_type in ["Actual", "Weighted Distribution"]])
 
 		# Tax on Net Total for Weighted Distribution
 		weighted_distrubution_tax_on_net_total = {}
-		for n, item in enumerate(self.doc.get("items")):
-			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
-			for i, tax in enumerate(self.doc.get("taxes")):
-				if tax.charge_type == "Weighted Distribution":
+		weighted_distribution_taxes = [(i, tax) for i, tax in enumerate(taxes) if tax.charge_type == "Weighted Distribution"]
+		if weighted_distribution_taxes:
+			for n, item in enumerate(items):
+				tax_rates = self.tax_plan.get_tax_rates(item.item_tax_rate)
+				for i, tax in weighted_distribution_taxes:
 					weighted_distrubution_tax_on_net_total.setdefault(tax.idx, 0.0)
-					tax_rate = self._get_tax_rate(tax, item_tax_map)
-					weighted_distrubution_tax_on_net_total[tax.idx] += (tax_rate / 100) * item.net_amount
+					weighted_distrubution_tax_on_net_total[tax.idx] += (tax_rates[i] / 100) * item.net_amount
 
-		for n, item in enumerate(self.doc.get("items")):
-			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
-			for i, tax in enumerate(self.doc.get("taxes")):
+		last_item_index = len(items) - 1
+		for n, item in enumerate(items):
+			tax_rates = self.tax_plan.get_tax_rates(item.item_tax_rate)
+			for i, tax in enumerate(taxes):
 				# tax_amount represents the amount of tax for the current step
-				current_tax_amount = self.get_current_tax_amount(item, tax, item_tax_map, weighted_distrubution_tax_on_net_total)
+				current_tax_amount = self.get_current_tax_amount(item, tax, tax_rates[i], weighted_distrubution_tax_on_net_total)
 
 				# Adjust divisional loss to the last item
 				if tax.charge_type in ["Actual", "Weighted Distribution"]:
 					actual_tax_dict[tax.idx] -= current_tax_amount
-					if n == len(self.doc.get("items")) - 1:
+					if n == last_item_index:
 						current_tax_amount += actual_tax_dict[tax.idx]
 
 				# accumulate tax amount into tax.tax_amount
@@ -490,21 +498,21 @@ class calculate_taxes_and_totals(object):
 					tax.net_total_for_current_item = flt(item.net_amount + current_tax_amount)
 				else:
 					tax.grand_total_for_current_item = \
-						flt(self.doc.get("taxes")[i-1].grand_total_for_current_item + current_tax_amount)
+						flt(taxes[i-1].grand_total_for_current_item + current_tax_amount)
 					tax.net_total_for_current_item = \
-						flt(self.doc.get("taxes")[i-1].net_total_for_current_item + current_tax_amount)
+						flt(taxes[i-1].net_total_for_current_item + current_tax_amount)
 
 				# set precision in the last item iteration
-				if n == len(self.doc.get("items")) - 1:
+				if n == last_item_index:
 					self.round_off_totals(tax)
 					self.set_cumulative_total(i, tax)
 
 					self._set_in_company_currency(tax,
 						["total", "displayed_total", "tax_amount", "tax_amount_after_discount_amount"],
-						not self.should_round_transaction_currency())
+						not self.tax_plan.round_transaction_currency)
 
 					# adjust Discount Amount loss in last tax iteration
-					if i == (len(self.doc.get("taxes")) - 1) and self.discount_amount_applied \
+					if i == (len(taxes) - 1) and self.discount_amount_applied \
 						and self.doc.discount_amount and self.doc.apply_discount_on == "Grand Total":
 							new_grand_total = self.doc.grand_total - flt(self.doc.discount_amount)
 							calculated_grand_total = self.doc.net_total + sum([d.tax_amount_after_discount_amount for d in self.doc.taxes])
@@ -547,14 +555,12 @@ class calculate_taxes_and_totals(object):
 			tax.total = flt(tax.total, tax.precision("total"))
 			tax.displayed_total = flt(tax.displayed_total, tax.precision("displayed_total"))
 
-	def get_current_tax_amount(self, item, tax, item_tax_map, weighted_distrubution_tax_on_net_total):
-		tax_rate = self._get_tax_rate(tax, item_tax_map)
+	def get_current_tax_amount(self, item, tax, tax_rate, weighted_distrubution_tax_on_net_total):
 		current_tax_amount = 0.0
 
 		if tax.charge_type in ["Actual", "Weighted Distribution"]:
 			# distribute the tax amount proportionally to each item row
-			actual = flt(tax.tax_amount, tax.precision("tax_amount")) if self.should_round_transaction_currency()\
-				else tax.tax_amount
+			actual = self.tax_plan.get_actual_tax_amount(tax)
 
 			if tax.charge_type == "Actual" or not weighted_distrubution_tax_on_net_total.get(tax.idx):
 				if self.doc.net_total:
@@ -568,53 +574,31 @@ class calculate_taxes_and_totals(object):
 
 		elif tax.charge_type == "Manual":
 			item_key = item.item_code or item.item_name
-			current_tax_amount = flt(json.loads(tax.manual_distribution_detail or '{}').get(item_key))
+			current_tax_amount = flt(self.tax_plan.get_manual_distribution(tax).get(item_key))
 			if self.doc.calculate_tax_on_company_currency:
 				current_tax_amount = current_tax_amount / (self.doc.conversion_rate or 1)
 
-			total_net_amount = sum([d.net_amount for d in self.doc.items if (d.item_code or d.item_name) == item_key])
+			total_net_amount = self.tax_plan.net_amount_by_item_key.get(item_key)
 			current_tax_amount *= item.net_amount / total_net_amount if total_net_amount else 0
 		elif tax.charge_type == "On Net Total":
 			taxable_amount = item.net_amount if cint(tax.apply_on_net_amount) else item.taxable_amount
 			current_tax_amount = (tax_rate / 100.0) * taxable_amount
 		elif tax.charge_type == "On Previous Row Amount":
 			current_tax_amount = (tax_rate / 100.0) * \
-				self.doc.get("taxes")[cint(tax.row_id) - 1].tax_amount_for_current_item
+				self.tax_plan.get_previous_row(tax).tax_amount_for_current_item
 		elif tax.charge_type == "On Previous Row Total":
-			taxable_amount = self.doc.get("taxes")[cint(tax.row_id) - 1].net_total_for_current_item \
-				if cint(tax.apply_on_net_amount) else self.doc.get("taxes")[cint(tax.row_id) - 1].grand_total_for_current_item
+			previous_row = self.tax_plan.get_previous_row(tax)
+			taxable_amount = previous_row.net_total_for_current_item \
+				if cint(tax.apply_on_net_amount) else previous_row.grand_total_for_current_item
 			current_tax_amount = (tax_rate / 100.0) * taxable_amount
 		elif tax.charge_type == "On Item Quantity":
 			current_tax_amount = tax_rate * item.qty
 		elif tax.charge_type == "On HS Code":
-			items_net_total = []
-			#totalling of items prices based on their HS codes
-			if len(self.doc.get("customs_tariff_tax", [])) > 0:
-				for items in self.doc.get("items", []):
-					index = -1
-					for i, sel_item in enumerate(items_net_total):
-						if sel_item["customs_tariff_number"] == items.customs_tariff_number:
-							index = i
-							break
-					
-					if index != -1:
-						items_net_total[index]["total"] += items.amount
-					else:
-						items_net_total.append({
-							"customs_tariff_number": items.customs_tariff_number,
-							"total": items.amount,
-						})
-
 			#tax distribution according to the item qty & HS code
-			for tariff_tax_table in self.doc.get("customs_tariff_tax", []):
-				if tariff_tax_table.account_head == tax.account_head and item.customs_tariff_number == tariff_tax_table.customs_tariff_number:
-					for i, sel_item in enumerate(items_net_total):
-						if sel_item["customs_tariff_number"] == item.customs_tariff_number:
-							HS_code_tax_amount = tariff_tax_table.amount
-							HS_code_net_total = items_net_total[i]["total"]
-							current_tax_amount = (HS_code_tax_amount / HS_code_net_total) * item.amount
-							break
-
+			HS_code_tax_amount = self.tax_plan.hs_code_tax_amounts.get((tax.account_head, item.customs_tariff_number))
+			if HS_code_tax_amount is not None:
+				HS_code_net_total = self.tax_plan.amount_by_tariff_number[item.customs_tariff_number]
+				current_tax_amount = (HS_code_tax_amount / HS_code_net_total) * item.amount
 
 		self.set_item_wise_tax(item, tax, tax_rate, current_tax_amount)
 
@@ -662,11 +646,12 @@ class calculate_taxes_and_totals(object):
 				self.doc.rounding_adjustment = diff
 
 	def calculate_tax_inclusive_rate(self):
+		round_transaction_currency = self.tax_plan.round_transaction_currency
 		for item in self.doc.items:
 			item.tax_inclusive_amount = flt(item.tax_exclusive_amount + item.item_taxes)
 			item.tax_inclusive_rate = flt(item.tax_inclusive_amount / item.qty) if item.qty else 0
 			self._set_in_company_currency(item, ['item_taxes', 'tax_inclusive_amount', 'tax_inclusive_rate'],
-				not self.should_round_transaction_currency())
+				not round_transaction_currency)
 
 			if not self.discount_amount_applied:
 				item.item_taxes_before_discount = item.item_taxes
@@ -674,7 +659,7 @@ class calculate_taxes_and_totals(object):
 				item.tax_inclusive_amount_before_discount = item.tax_inclusive_amount
 				self._set_in_company_currency(item, [
 					'item_taxes_before_discount', 'tax_inclusive_rate_before_discount', 'tax_inclusive_amount_before_discount'
-				], not self.should_round_transaction_currency())
+				], not round_transaction_currency)
 
 	def calculate_totals(self):
 		self.doc.total_after_taxes = flt(self.doc.get("taxes")[-1].total) + flt(self.doc.rounding_adjustment) \
@@ -1014,6 +999,76 @@ class calculate_taxes_and_totals(object):
 		self.calculate_paid_amount()
 
 
+class TaxCalculationPlan(object):
+	"""
+		Values of the taxes table that are the same for every item row, worked out once per calculation
+		instead of once per item and tax row: the tax rates for each distinct item tax rate map,
+		referred previous rows, rounded Actual amounts and the totals Manual and HS Code taxes are distributed on
+	"""
+	def __init__(self, calculator):
+		self.calculator = calculator
+		self.doc = calculator.doc
+		self.taxes = self.doc.get("taxes")
+		self.round_transaction_currency = calculator.should_round_transaction_currency()
+
+		self.tax_rates = {}
+		self.actual_tax_amounts = {}
+		self.manual_distributions = {}
+
+		self.net_amount_by_item_key = {}
+		self.amount_by_tariff_number = {}
+		self.hs_code_tax_amounts = {}
+
+	def get_tax_rates(self, item_tax_rate):
+		"""Returns the rate of each tax row for an item, parsed and rounded once per distinct item tax rate map"""
+		key = item_tax_rate or ""
+		if key not in self.tax_rates:
+			item_tax_map = self.calculator._load_item_tax_rate(item_tax_rate)
+			self.tax_rates[key] = [self.calculator._get_tax_rate(tax, item_tax_map) for tax in self.taxes]
+
+		return self.tax_rates[key]
+
+	def get_previous_row(self, tax):
+		return self.taxes[cint(tax.row_id) - 1]
+
+	def get_actual_tax_amount(self, tax):
+		if tax.idx not in self.actual_tax_amounts:
+			self.actual_tax_amounts[tax.idx] = flt(tax.tax_amount, tax.precision("tax_amount")) \
+				if self.round_transaction_currency else tax.tax_amount
+
+		return self.actual_tax_amounts[tax.idx]
+
+	def get_manual_distribution(self, tax):
+		if tax.idx not in self.manual_distributions:
+			self.manual_distributions[tax.idx] = json.loads(tax.manual_distribution_detail or '{}')
+
+		return self.manual_distributions[tax.idx]
+
+	def set_item_totals(self, items):
+		"""Sets the item totals used by Manual and HS Code taxes, from the net amounts of the current calculation"""
+		self.net_amount_by_item_key = {}
+		self.amount_by_tariff_number = {}
+		self.hs_code_tax_amounts = {}
+
+		charge_types = set([tax.charge_type for tax in self.taxes])
+
+		if "Manual" in charge_types:
+			for d in items:
+				item_key = d.item_code or d.item_name
+				self.net_amount_by_item_key[item_key] = self.net_amount_by_item_key.get(item_key, 0) + d.net_amount
+
+		if "On HS Code" in charge_types and self.doc.get("customs_tariff_tax"):
+			# totalling of items prices based on their HS codes
+			for d in items:
+				self.amount_by_tariff_number[d.customs_tariff_number] = \
+					self.amount_by_tariff_number.get(d.customs_tariff_number, 0) + d.amount
+
+			# the last tariff row of an account and HS code applies
+			for tariff_tax_table in self.doc.get("customs_tariff_tax"):
+				if tariff_tax_table.customs_tariff_number in self.amount_by_tariff_number:
+					key = (tariff_tax_table.account_head, tariff_tax_table.customs_tariff_number)
+					self.hs_code_tax_amounts[key] = tariff_tax_table.amount
+
 def get_itemised_tax_breakup_html(doc):
 	if not doc.taxes:
 		return
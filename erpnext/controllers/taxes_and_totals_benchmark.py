@@ -0,0 +1,131 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""
+Benchmark of calculate_taxes_and_totals on a generated Sales Invoice.
+
+Calculates the same invoice with tax rates worked out for every item row and with the tax calculation plan, checks
+that both give the same values and prints the time taken by each. The invoice is not saved. Run with
+
+	bench --site [site] execute erpnext.controllers.taxes_and_totals_benchmark.run --kwargs "{'lines': 500, 'taxes': 10}"
+"""
+
+import json
+import random
+import timeit
+import frappe
+import erpnext
+from frappe.utils import nowdate
+from erpnext.controllers.taxes_and_totals import calculate_taxes_and_totals, TaxCalculationPlan
+
+# charge type, rate or amount, included in print rate, previous row offset, apply on net amount
+tax_rows = [
+	("On Net Total", 15, 1, None, 0),
+	("On Previous Row Amount", 10, 1, 1, 0),
+	("On Net Total", 5, 0, None, 0),
+	("On Previous Row Total", 2, 0, 1, 0),
+	("On Net Total", 1, 0, None, 1),
+	("Actual", 250, 0, None, 0),
+	("On Item Quantity", 0.5, 0, None, 0),
+	("On Previous Row Amount", 20, 0, 3, 0),
+	("On Net Total", 7, 0, None, 0),
+	("Actual", 75.5, 0, None, 0),
+]
+
+
+class PerItemTaxCalculationPlan(TaxCalculationPlan):
+	"""Parses and rounds the tax rates and Actual amounts again for every item row, as done before the plan"""
+	def get_tax_rates(self, item_tax_rate):
+		item_tax_map = self.calculator._load_item_tax_rate(item_tax_rate)
+		return [self.calculator._get_tax_rate(tax, item_tax_map) for tax in self.taxes]
+
+	def get_actual_tax_amount(self, tax):
+		self.actual_tax_amounts.pop(tax.idx, None)
+		return super(PerItemTaxCalculationPlan, self).get_actual_tax_amount(tax)
+
+
+class PerItemTaxCalculation(calculate_taxes_and_totals):
+	def get_tax_plan(self):
+		return PerItemTaxCalculationPlan(self)
+
+
+def run(lines=500, taxes=10, templates=5, seed=1, company=None, repeat=3):
+	company = company or frappe.defaults.get_defaults().company
+
+	results = {}
+	for calculator_class in (PerItemTaxCalculation, calculate_taxes_and_totals):
+		timings = []
+		for i in range(repeat):
+			doc = make_invoice(lines, taxes, templates, seed, company)
+			start = timeit.default_timer()
+			calculator_class(doc)
+			timings.append(timeit.default_timer() - start)
+
+		results[calculator_class.__name__] = frappe._dict({"time": min(timings), "result": dump_result(doc)})
+		print("{0}: {1:.3f}s for {2} lines and {3} taxes".format(calculator_class.__name__, min(timings), lines, taxes))
+
+	per_item, planned = results["PerItemTaxCalculation"], results["calculate_taxes_and_totals"]
+	same_result = per_item.result == planned.result
+	print("Same values: {0}".format(same_result))
+	print("Speedup: {0:.2f}x".format(per_item.time / planned.time if planned.time else 0))
+
+	return same_result
+
+
+def make_invoice(lines, taxes, templates, seed, company):
+	"""Generate an unsaved Sales Invoice with item rows on a few distinct item tax rate maps"""
+	rng = random.Random(seed)
+	accounts = ["_Benchmark Tax {0}".format(i + 1) for i in range(taxes)]
+
+	item_tax_rates = [""]
+	for i in range(templates):
+		item_tax_map = dict([(account, rng.choice([0, 2.5, 5, 12.5])) for account in rng.sample(accounts, min(3, taxes))])
+		item_tax_rates.append(json.dumps(item_tax_map))
+
+	doc = frappe.new_doc("Sales Invoice")
+	doc.update({
+		"company": company,
+		"currency": erpnext.get_company_currency(company),
+		"conversion_rate": 1,
+		"posting_date": nowdate(),
+	})
+
+	for i in range(lines):
+		item = doc.append("items", {
+			"item_code": "_Benchmark Item {0}".format(rng.randint(1, max(lines // 2, 1))),
+			"qty": rng.randint(1, 20),
+			"rate": round(rng.uniform(1, 500), 2),
+			"conversion_factor": 1,
+			"item_tax_rate": rng.choice(item_tax_rates),
+		})
+		set_numeric_defaults(item)
+
+	for i in range(taxes):
+		charge_type, rate, included_in_print_rate, row_offset, apply_on_net_amount = tax_rows[i % len(tax_rows)]
+		if row_offset and row_offset > i:
+			charge_type, row_offset = "On Net Total", None
+
+		tax = doc.append("taxes", {
+			"charge_type": charge_type,
+			"account_head": accounts[i],
+			"description": accounts[i],
+			"rate": rate if charge_type != "Actual" else 0,
+			"tax_amount": rate if charge_type == "Actual" else 0,
+			"row_id": str(i + 1 - row_offset) if row_offset else None,
+			"included_in_print_rate": included_in_print_rate if i < len(tax_rows) else 0,
+			"apply_on_net_amount": apply_on_net_amount,
+		})
+		set_numeric_defaults(tax)
+
+	set_numeric_defaults(doc)
+	return doc
+
+
+def set_numeric_defaults(doc):
+	for df in doc.meta.fields:
+		if df.fieldtype in frappe.model.numeric_fieldtypes and doc.get(df.fieldname) is None:
+			doc.set(df.fieldname, 0)
+
+
+def dump_result(doc):
+	return json.dumps(doc.as_dict(), default=str, sort_keys=True)
@@ -2,7 +2,7 @@ import frappe
 from frappe import _
 from frappe.utils import flt, cstr, cint
 from erpnext.controllers.stock_controller import StockController
-from erpnext.stock.get_item_details import get_item_details, get_applies_to_details
+from erpnext.stock.get_item_details import get_items_details, get_applies_to_details
 from erpnext.accounts.doctype.pricing_rule.utils import (
 	apply_pricing_rule_for_free_items, get_applied_pricing_rules,
 	apply_pricing_rule_on_transaction, update_pricing_rule_table
@@ -158,30 +158,37 @@ class TransactionController(StockController):
 		if self.meta.has_field("items"):
 			parent_dict = self.get_item_details_parent_args()
 
-			for item in self.get("items"):
-				if not item.get("item_code"):
-					continue
+			# items added by pricing rules for free items are resolved in the next pass
+			resolved_items = set()
+			while True:
+				items = [item for item in self.get("items") if item.get("item_code") and id(item) not in resolved_items]
+				if not items:
+					break
 
-				args = self.get_item_details_child_args(item, parent_dict)
-				ret = get_item_details(args, self, for_validate=True, overwrite_warehouse=False)
-
-				for fieldname, value in ret.items():
-					if not item.meta.get_field(fieldname) or value is None:
-						continue
-
-					if item.get(fieldname) is None or fieldname in self.force_item_fields:
-						item.set(fieldname, value)
-					elif fieldname in ['cost_center', 'conversion_factor'] and not item.get(fieldname):
-						item.set(fieldname, value)
-					elif fieldname == "serial_no":
-						# Ensure that serial numbers are matched against Stock UOM
-						item_conversion_factor = item.get("conversion_factor") or 1.0
-						item_qty = abs(item.get("qty")) * item_conversion_factor
-						if item_qty != len(get_serial_nos(item.get('serial_no'))):
-							item.set(fieldname, value)
+				items_args = [self.get_item_details_child_args(item, parent_dict) for item in items]
+				items_details = get_items_details(parent_dict, items_args, self, for_validate=True,
+					overwrite_warehouse=False)
+
+				for item, ret in zip(items, items_details):
+					resolved_items.add(id(item))
 
-				if ret.get("pricing_rules"):
-					self.apply_pricing_rule_on_items(item, ret)
+					for fieldname, value in ret.items():
+						if not item.meta.get_field(fieldname) or value is None:
+							continue
+
+						if item.get(fieldname) is None or fieldname in self.force_item_fields:
+							item.set(fieldname, value)
+						elif fieldname in ['cost_center', 'conversion_factor'] and not item.get(fieldname):
+							item.set(fieldname, value)
+						elif fieldname == "serial_no":
+							# Ensure that serial numbers are matched against Stock UOM
+							item_conversion_factor = item.get("conversion_factor") or 1.0
+							item_qty = abs(item.get("qty")) * item_conversion_factor
+							if item_qty != len(get_serial_nos(item.get('serial_no'))):
+								item.set(fieldname, value)
+
+					if ret.get("pricing_rules"):
+						self.apply_pricing_rule_on_items(item, ret)
 
 		self.set_missing_applies_to_details()
 
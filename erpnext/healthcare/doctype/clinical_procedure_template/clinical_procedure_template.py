@@ -6,6 +6,7 @@ import frappe, json
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import nowdate
+from erpnext.stock.doctype.item_price.item_price import clear_item_price_cache
 
 class ClinicalProcedureTemplate(Document):
 	def validate(self):
@@ -71,6 +72,7 @@ def updating_item(self):
 def updating_rate(self):
 	frappe.db.sql("""update `tabItem Price` set item_name=%s, price_list_rate=%s, modified=NOW() where
 	 item_code=%s""",(self.template, self.rate, self.item))
+	clear_item_price_cache()
 
 def create_item_from_template(doc):
 	disabled = 1
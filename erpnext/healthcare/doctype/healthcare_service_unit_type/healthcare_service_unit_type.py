@@ -5,6 +5,7 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from erpnext.stock.doctype.item_price.item_price import clear_item_price_cache
 
 class HealthcareServiceUnitType(Document):
 	def validate(self):
@@ -36,6 +37,7 @@ class HealthcareServiceUnitType(Document):
 						make_item_price(self.item_code, price_list_name, 0.0)
 			else:
 				frappe.db.set_value("Item Price", item_price, "price_list_rate", self.rate)
+				clear_item_price_cache()
 
 			frappe.db.set_value(self.doctype,self.name,"change_in_item",0)
 		elif(self.is_billable == 0 and self.item):
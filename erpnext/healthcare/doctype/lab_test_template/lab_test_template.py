@@ -6,6 +6,7 @@ import frappe, json
 from frappe.model.document import Document
 from frappe.model.rename_doc import rename_doc
 from frappe import _
+from erpnext.stock.doctype.item_price.item_price import clear_item_price_cache
 
 class LabTestTemplate(Document):
 	def after_insert(self):
@@ -29,6 +30,7 @@ class LabTestTemplate(Document):
 						make_item_price(self.lab_test_code, price_list_name, 0.0)
 			else:
 				frappe.db.set_value("Item Price", item_price, "price_list_rate", self.lab_test_rate)
+				clear_item_price_cache()
 
 			frappe.db.set_value(self.doctype, self.name, "change_in_item", 0)
 
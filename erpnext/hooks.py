@@ -192,6 +192,11 @@ doc_events = {
 	"Contact": {
 		"on_trash": "erpnext.support.doctype.issue.issue.update_issue",
 	},
+	("Account", "Cost Center"): {
+		"on_update": "erpnext.accounts.utils.clear_tree_closure_cache",
+		"on_trash": "erpnext.accounts.utils.clear_tree_closure_cache",
+		"after_rename": "erpnext.accounts.utils.clear_tree_closure_cache"
+	},
 }
 
 naming_series_variables = {
@@ -206,6 +211,7 @@ scheduler_events = {
 		"erpnext.vehicles.doctype.vehicle_booking_order.vehicle_booking_order.send_vehicle_anniversary_notifications",
 		"erpnext.maintenance.doctype.maintenance_schedule.maintenance_schedule.send_maintenance_schedule_reminder_notifications",
 		"erpnext.selling.doctype.customer.customer.send_customer_birthday_notifications",
+		"erpnext.stock.doctype.stock_repost_job.stock_repost_job.process_stock_repost_jobs",
 	],
 	"hourly": [
 		'erpnext.hr.doctype.daily_work_summary_group.daily_work_summary_group.trigger_emails',
@@ -248,7 +254,8 @@ scheduler_events = {
 	"monthly_long": [
 		"erpnext.accounts.deferred_revenue.convert_deferred_revenue_to_income",
 		"erpnext.accounts.deferred_revenue.convert_deferred_expense_to_expense",
-		"erpnext.hr.utils.allocate_earned_leaves"
+		"erpnext.hr.utils.allocate_earned_leaves",
+		"erpnext.stock.doctype.stock_ledger_snapshot.stock_ledger_snapshot.create_monthly_stock_ledger_snapshot"
 	]
 }
 
@@ -4,6 +4,7 @@
 
 import frappe
 from frappe.model.document import Document
+from erpnext.stock.doctype.item_price.item_price import clear_item_price_cache
 
 class RestaurantMenu(Document):
 	def validate(self):
@@ -24,6 +25,7 @@ class RestaurantMenu(Document):
 		if not price_list:
 			price_list = self.get_price_list().name
 		frappe.db.sql('delete from `tabItem Price` where price_list = %s', price_list)
+		clear_item_price_cache(price_list)
 
 	def make_price_list(self):
 		# create price list for menu
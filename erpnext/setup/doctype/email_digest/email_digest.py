@@ -9,7 +9,7 @@ from datetime import timedelta
 from dateutil.relativedelta import relativedelta
 from frappe.core.doctype.user.user import STANDARD_USERS
 import frappe.desk.notifications
-from erpnext.accounts.utils import get_balance_on, get_count_on, get_fiscal_year
+from erpnext.accounts.utils import get_balance_on, get_balances_on, get_count_on, get_fiscal_year
 
 user_specific_content = ["calendar_events", "todo_list"]
 
@@ -324,11 +324,11 @@ class EmailDigest(Document):
 
 	def get_year_to_date_balance(self, root_type, fieldname):
 		"""Get income to date"""
-		balance = 0.0
-		count = 0
+		accounts = self.get_root_type_accounts(root_type)
+		balance = sum(get_balances_on(accounts, date=self.future_to_date).values())
 
-		for account in self.get_root_type_accounts(root_type):
-			balance += get_balance_on(account, date = self.future_to_date)
+		count = 0
+		for account in accounts:
 			count += get_count_on(account, fieldname, date = self.future_to_date)
 
 		if fieldname == 'income':
@@ -524,12 +524,12 @@ class EmailDigest(Document):
 				frappe.db.get_all("Account", filters={"account_type": account_type,
 				"company": self.company, "is_group": 0})]
 
-		balance = prev_balance = 0.0
+		balance = sum(get_balances_on(accounts, date=self.future_to_date, in_account_currency=False).values())
+		prev_balance = sum(get_balances_on(accounts, date=self.past_to_date, in_account_currency=False).values())
+
 		count = 0
 		for account in accounts:
-			balance += get_balance_on(account, date=self.future_to_date, in_account_currency=False)
 			count += get_count_on(account, fieldname, date=self.future_to_date)
-			prev_balance += get_balance_on(account, date=self.past_to_date, in_account_currency=False)
 
 		if fieldname in ("bank_balance","credit_balance"):
 			label = ""
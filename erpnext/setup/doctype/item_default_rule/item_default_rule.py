@@ -80,9 +80,11 @@ class ItemDefaultRule(Document):
 			return None
 
 	def match_item(self, required, actual):
+		from erpnext.stock.get_item_details import get_item_doc
+
 		actual_variant_and_template = []
 		if actual:
-			item_doc = frappe.get_cached_doc("Item", actual)
+			item_doc = get_item_doc(actual)
 			actual_variant_and_template.append(actual)
 			if item_doc.variant_of:
 				actual_variant_and_template.append(item_doc.variant_of)
@@ -128,8 +130,22 @@ class ItemDefaultRule(Document):
 
 def get_item_default_values(item, transaction=None):
 	filters = get_filters_dict(item, transaction)
-	applicable_rules = get_applicable_rules_for_filters(filters)
-	return get_default_values_dict(applicable_rules)
+
+	# values are kept per filters while a cache is set, e.g. by ItemDetailsPrefetch for the rows of a transaction
+	default_values_cache = frappe.flags.item_default_values_cache
+	if default_values_cache is not None:
+		key = tuple(sorted(filters.items()))
+		if key not in default_values_cache:
+			default_values_cache[key] = get_default_values_for_filters(filters)
+
+		# callers may change the returned values, so they get a copy
+		values = default_values_cache[key].copy()
+		if values.get("taxes"):
+			values["taxes"] = list(values["taxes"])
+
+		return values
+
+	return get_default_values_for_filters(filters)
 
 
 def get_default_values_for_filters(filters):
@@ -228,6 +244,10 @@ def get_applicable_rules_for_filters(filters):
 
 
 def get_item_default_rule_docs():
+	# rules are loaded together while set, e.g. by ItemDetailsPrefetch for the rows of a transaction
+	if frappe.flags.item_default_rule_docs is not None:
+		return frappe.flags.item_default_rule_docs
+
 	names = get_item_default_rule_names()
 	docs = [frappe.get_cached_doc("Item Default Rule", name) for name in names]
 	return docs
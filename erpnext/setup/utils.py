@@ -22,6 +22,8 @@ def get_ancestors_of(doctype, name):
 	return result or []
 
 def before_tests():
+	from erpnext.stock.doctype.item_price.item_price import clear_item_price_cache
+
 	frappe.clear_cache()
 	# complete setup if missing
 	from frappe.desk.page.setup_wizard.setup_wizard import setup_complete
@@ -48,6 +50,7 @@ def before_tests():
 	frappe.db.sql("delete from `tabLeave Application`")
 	frappe.db.sql("delete from `tabSalary Slip`")
 	frappe.db.sql("delete from `tabItem Price`")
+	clear_item_price_cache()
 
 	frappe.db.set_value("Stock Settings", None, "auto_insert_price_list_rate_if_missing", 0)
 	enable_all_roles_and_domains()
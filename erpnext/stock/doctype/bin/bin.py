@@ -2,7 +2,7 @@
 # License: GNU General Public License v3. See license.txt
 
 import frappe
-from frappe.utils import flt, nowdate
+from frappe.utils import flt, cint, nowdate
 import frappe.defaults
 from frappe.model.document import Document
 
@@ -15,27 +15,45 @@ class Bin(Document):
 
 	def update_stock(self, args, allow_negative_stock=False, via_landed_cost_voucher=False):
 		'''Called from erpnext.stock.utils.update_bin'''
-		self.update_qty(args)
-
-		if args.get("actual_qty") or args.get("voucher_type") == "Stock Reconciliation":
-			from erpnext.stock.stock_ledger import update_entries_after
-
-			if not args.get("posting_date"):
-				args["posting_date"] = nowdate()
-
-			# update valuation and qty after transaction for post dated entry
-			if args.get("is_cancelled") == "Yes" and via_landed_cost_voucher:
-				return
-			update_entries_after({
-				"item_code": self.item_code,
-				"warehouse": self.warehouse,
-				"batch_no": args.get("batch_no"),
-				"posting_date": args.get("posting_date"),
-				"posting_time": args.get("posting_time"),
-				"creation": args.get("creation"),
-				"sle_id": args.get("sle_id"),
-				"voucher_no": args.get("voucher_no")
-			}, allow_negative_stock=allow_negative_stock, via_landed_cost_voucher=via_landed_cost_voucher)
+		self.update_stock_for_entries([args], allow_negative_stock, via_landed_cost_voucher)
+
+	def update_stock_for_entries(self, args_list, allow_negative_stock=False, via_landed_cost_voucher=False):
+		'''Update qty for all entries of a voucher in this bin and repost once from the first of them'''
+		for args in args_list:
+			self.update_qty(args)
+
+		args_list = [args for args in args_list
+			if args.get("actual_qty") or args.get("voucher_type") == "Stock Reconciliation"]
+		if not args_list:
+			return
+
+		from erpnext.stock.stock_ledger import update_entries_after
+
+		args = args_list[0]
+		if not args.get("posting_date"):
+			args["posting_date"] = nowdate()
+
+		# update valuation and qty after transaction for post dated entry
+		if args.get("is_cancelled") == "Yes" and via_landed_cost_voucher:
+			return
+
+		# entries that allow negative stock are not validated, the rest of the repost still is
+		allow_negative_stock_sles = [d.get("sle_id") for d in args_list if d.get("allow_negative_stock")]
+		if len(allow_negative_stock_sles) == len(args_list):
+			allow_negative_stock = True
+
+		update_entries_after({
+			"item_code": self.item_code,
+			"warehouse": self.warehouse,
+			"batch_no": args.get("batch_no"),
+			"posting_date": args.get("posting_date"),
+			"posting_time": args.get("posting_time"),
+			"creation": args.get("creation"),
+			"sle_id": args.get("sle_id"),
+			"voucher_no": args.get("voucher_no"),
+			"allow_negative_stock_sles": allow_negative_stock_sles
+		}, allow_negative_stock=allow_negative_stock, via_landed_cost_voucher=via_landed_cost_voucher,
+			defer_future_entries=cint(frappe.db.get_single_value("Stock Settings", "defer_backdated_stock_reposting")))
 
 	def update_qty(self, args):
 		# update the stock values (for current quantities)
@@ -408,7 +408,12 @@ class Item(Document):
 					(self.image, self.name))
 
 	def on_trash(self):
+		from erpnext.stock.doctype.item_price.item_price import clear_item_price_cache
+
 		frappe.db.sql("""delete from tabBin where item_code=%s""", self.name)
+
+		for price_list in frappe.db.sql_list("select distinct price_list from `tabItem Price` where item_code=%s", self.name):
+			clear_item_price_cache(price_list, self.name)
 		frappe.db.sql("delete from `tabItem Price` where item_code=%s", self.name)
 		for variant_of in frappe.get_all("Item", filters={"variant_of": self.name}):
 			frappe.delete_doc("Item", variant_of.name)
@@ -12,7 +12,8 @@ from erpnext.stock.doctype.item.item import StockExistsForTemplate, InvalidBarco
 from erpnext.stock.doctype.item.item import get_uom_conv_factor
 from frappe.model.rename_doc import rename_doc
 from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
-from erpnext.stock.get_item_details import get_item_details
+from erpnext.stock.get_item_details import get_item_details, get_items_details, ItemDetailsPrefetch
+from erpnext.stock.doctype.item_price.item_price import clear_item_price_cache
 
 from six import iteritems
 
@@ -58,6 +59,7 @@ class TestItem(unittest.TestCase):
 	def test_get_item_details(self):
 		# delete modified item price record and make as per test_records
 		frappe.db.sql("""delete from `tabItem Price`""")
+		clear_item_price_cache()
 
 		to_check = {
 			"item_code": "_Test Item",
@@ -104,6 +106,34 @@ class TestItem(unittest.TestCase):
 		for key, value in iteritems(to_check):
 			self.assertEqual(value, details.get(key))
 
+	def test_prefetched_item_details(self):
+		make_test_objects("Item Price")
+
+		args = {
+			"company": "_Test Company",
+			"price_list": "_Test Price List",
+			"currency": "_Test Currency",
+			"doctype": "Sales Order",
+			"conversion_rate": 1,
+			"price_list_currency": "_Test Currency",
+			"plc_conversion_rate": 1,
+			"order_type": "Sales",
+			"customer": "_Test Customer",
+			"warehouse": "_Test Warehouse - _TC",
+			"ignore_pricing_rule": 1
+		}
+		items = [{"item_code": item_code, "qty": 1}
+			for item_code in ("_Test Item", "_Test Item 2", "_Test Item With Item Tax Template", "_Test Item")]
+		items_args = [frappe._dict(args, **d) for d in items]
+
+		expected = [get_item_details(frappe._dict(d)) for d in items_args]
+
+		with ItemDetailsPrefetch([frappe._dict(d) for d in items_args]):
+			details = [get_item_details(frappe._dict(d)) for d in items_args]
+
+		self.assertEqual(details, expected)
+		self.assertEqual(get_items_details(args, items), expected)
+
 	def test_item_tax_template(self):
 		expected_item_tax_template = [
 			{"item_code": "_Test Item With Item Tax Template", "tax_category": "",
@@ -3,7 +3,7 @@
 
 import frappe
 from frappe import _
-from frappe.utils import getdate
+from frappe.utils import cint, cstr, flt, getdate
 
 
 class ItemPriceDuplicateItem(frappe.ValidationError): pass
@@ -77,7 +77,112 @@ class ItemPrice(Document):
 			# if only buying then remove customer
 			self.customer = None
 
+	def on_update(self):
+		self.clear_item_price_cache()
+
+	def on_trash(self):
+		self.clear_item_price_cache()
+
+	def after_rename(self, old_name, new_name, merge):
+		self.clear_item_price_cache()
+
+	def clear_item_price_cache(self):
+		clear_item_price_cache(self.price_list, self.item_code)
+
+		previous = self.get_doc_before_save()
+		if previous and (previous.price_list, previous.item_code) != (self.price_list, self.item_code):
+			clear_item_price_cache(previous.price_list, previous.item_code)
+
 
 def on_doctype_update():
 	frappe.db.add_index("Item Price", ["item_code", "price_list"])
 	frappe.db.add_index("Item Price", ["valid_from", "valid_upto"])
+
+
+def get_cached_item_prices(price_list, item_code):
+	"""
+		Returns all Item Price rows of an item in a price list, for any party, UOM and validity,
+		sorted like get_item_price sorts them. Rows are cached per price list and item until an Item Price changes,
+		so the party, general and stock UOM prices of a line are all found from one lookup.
+	"""
+	if not price_list or not item_code:
+		return None
+
+	cache = frappe.cache()
+	cache_key = "item_prices:{0}".format(price_list)
+
+	item_prices = cache.hget(cache_key, item_code)
+	if item_prices is None:
+		update_item_price_cache_stats("misses")
+
+		item_prices = sort_item_prices(frappe.db.sql("""
+			select name, price_list_rate, uom, valid_from, valid_upto, packing_unit, customer, supplier
+			from `tabItem Price`
+			where item_code = %s and price_list = %s
+		""", [item_code, price_list], as_dict=1))
+
+		cache.hset(cache_key, item_code, item_prices)
+	else:
+		update_item_price_cache_stats("hits")
+
+	return item_prices
+
+
+def sort_item_prices(item_prices):
+	"""Sorts by ifnull(valid_from, '2000-01-01') desc, uom desc like get_item_price"""
+	return sorted(item_prices, key=lambda d: (getdate(d.valid_from or "2000-01-01"), cstr(d.uom).lower()),
+		reverse=True)
+
+
+def clear_item_price_cache(price_list=None, item_code=None):
+	"""
+		Clears cached Item Prices of an item in a price list, of a whole price list or of all price lists.
+		They are cleared again after the commit, as other requests may cache the old prices before it.
+		The job after the commit is queued once per key, however many times the key is cleared before it.
+	"""
+	delete_cached_item_prices(price_list, item_code)
+
+	# jobs queued after the commit are flushed by the commit, so the keys queued before it are cleared again
+	if frappe.flags.item_price_cache_keys_to_clear is None or not frappe.flags.enqueue_after_commit:
+		frappe.flags.item_price_cache_keys_to_clear = set()
+
+	cache_key = (price_list, item_code)
+	if cache_key in frappe.flags.item_price_cache_keys_to_clear:
+		return
+
+	frappe.flags.item_price_cache_keys_to_clear.add(cache_key)
+	frappe.enqueue("erpnext.stock.doctype.item_price.item_price.delete_cached_item_prices", queue="short",
+		enqueue_after_commit=True, price_list=price_list, item_code=item_code)
+
+
+def delete_cached_item_prices(price_list=None, item_code=None):
+	if price_list and item_code:
+		frappe.cache().hdel("item_prices:{0}".format(price_list), item_code)
+	elif price_list:
+		frappe.cache().delete_value("item_prices:{0}".format(price_list))
+	else:
+		frappe.cache().delete_keys("item_prices:")
+
+
+def update_item_price_cache_stats(counter):
+	if cint(frappe.conf.get("item_price_cache_stats")):
+		frappe.cache().incr(frappe.cache().make_key("item_price_cache_" + counter))
+
+
+@frappe.whitelist()
+def get_item_price_cache_stats(reset=False):
+	"""Returns hits and misses of the Item Price cache since the last reset, counted when item_price_cache_stats is set in site config"""
+	frappe.only_for("System Manager")
+
+	stats = {}
+	for counter in ("hits", "misses"):
+		cache_key = frappe.cache().make_key("item_price_cache_" + counter)
+		stats[counter] = cint(frappe.cache().get(cache_key))
+
+		if cint(reset):
+			frappe.cache().delete(cache_key)
+
+	total = stats["hits"] + stats["misses"]
+	stats["hit_ratio"] = flt(stats["hits"] / total, 4) if total else 0
+
+	return stats
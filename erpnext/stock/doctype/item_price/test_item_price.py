@@ -5,12 +5,15 @@ import unittest
 import frappe
 from frappe.test_runner import make_test_records_for_doctype
 from erpnext.stock.get_item_details import get_price_list_rate, process_args
-from erpnext.stock.doctype.item_price.item_price import ItemPriceDuplicateItem
+from erpnext.stock.doctype.item_price.item_price import (ItemPriceDuplicateItem, get_cached_item_prices,
+	clear_item_price_cache)
+from erpnext.stock.doctype.item.test_item import create_item
 
 
 class TestItemPrice(unittest.TestCase):
 	def setUp(self):
 		frappe.db.sql("delete from `tabItem Price`")
+		clear_item_price_cache()
 		make_test_records_for_doctype("Item Price", force=True)
 
 	def test_duplicate_item(self):
@@ -123,6 +126,42 @@ class TestItemPrice(unittest.TestCase):
 		self.assertEqual(price, 10)
 
 
+	def test_item_price_cache(self):
+		doc = frappe.get_doc("Item Price", {"item_code": test_records[1]["item_code"],
+			"price_list": test_records[1]["price_list"]})
+		args = {"price_list": doc.price_list, "uom": "_Test UOM", "qty": 7}
+
+		def get_price():
+			# a cached and an uncached lookup must give the same price
+			clear_item_price_cache(doc.price_list, doc.item_code)
+			uncached_price = get_price_list_rate(doc.item_code, doc.price_list, process_args(args))
+			cached_price = get_price_list_rate(doc.item_code, doc.price_list, process_args(args))
+			self.assertEqual(cached_price, uncached_price)
+			return cached_price
+
+		self.assertEqual(get_price(), 10)
+
+		# cache is cleared when the Item Price is changed or deleted
+		get_cached_item_prices(doc.price_list, doc.item_code)
+		doc.price_list_rate = 15
+		doc.save()
+		self.assertEqual(get_cached_item_prices(doc.price_list, doc.item_code)[0].price_list_rate, 15)
+
+		doc.delete()
+		self.assertEqual(get_cached_item_prices(doc.price_list, doc.item_code), [])
+
+		self.assertEqual(get_price(), None)
+
+	def test_item_price_cache_after_item_delete(self):
+		item_code = create_item("_Test Item Price Cache " + frappe.generate_hash(length=8)).name
+		frappe.get_doc({"doctype": "Item Price", "item_code": item_code, "price_list": "_Test Price List",
+			"price_list_rate": 50}).insert()
+
+		self.assertEqual(len(get_cached_item_prices("_Test Price List", item_code)), 1)
+
+		frappe.delete_doc("Item", item_code)
+		self.assertEqual(get_cached_item_prices("_Test Price List", item_code), [])
+
 	def test_invalid_item(self):
 		doc = frappe.copy_doc(test_records[1])
 		# Enter invalid item code
@@ -3,6 +3,7 @@
 # License: GNU General Public License v3. See license.txt
 
 import frappe
+import json
 from frappe import _
 from frappe.utils import getdate, add_days, formatdate, today
 from frappe.model.document import Document
@@ -25,12 +26,18 @@ class StockLedgerEntry(Document):
 		"""
 		self.name = frappe.generate_hash(txt="", length=10)
 
-	def validate(self):
+	def onload(self):
+		# show the complete stock queue if it is saved as a delta of the previous entry's queue
+		from erpnext.stock.stock_ledger import get_stock_queue, is_stock_queue_delta
+		if is_stock_queue_delta(self):
+			self.stock_queue = json.dumps(get_stock_queue(self))
+
+	def validate(self, item_details=None, batch_details=None):
 		self.flags.ignore_submit_comment = True
 		from erpnext.stock.utils import validate_warehouse_company
 		self.validate_mandatory()
-		self.validate_item()
-		self.validate_batch()
+		self.validate_item(item_details, batch_details)
+		self.validate_batch(batch_details)
 		self.validate_date()
 		validate_warehouse_company(self.warehouse, self.company)
 		self.scrub_posting_time()
@@ -65,16 +72,14 @@ class StockLedgerEntry(Document):
 		if not self.get("via_landed_cost_voucher") and getdate(self.posting_date) > getdate(today()) and self.is_cancelled == "No":
 			frappe.throw(_("Stock cannot be created for a future date {0}").format(self.get_formatted('posting_date')))
 
-	def validate_item(self):
-		item_det = frappe.db.sql("""select name, item_name, has_batch_no, docstatus,
-			is_stock_item, has_variants, stock_uom, create_new_batch
-			from tabItem where name=%s""", self.item_code, as_dict=True)
+	def validate_item(self, item_details=None, batch_details=None):
+		if item_details is None:
+			item_details = get_item_details_for_sle([self.item_code])
 
+		item_det = item_details.get(self.item_code)
 		if not item_det:
 			frappe.throw(_("Item {0} not found").format(self.item_code))
 
-		item_det = item_det[0]
-
 		if not item_det.is_stock_item:
 			frappe.throw(_("Item {0} must be a stock Item").format(self.item_code))
 
@@ -85,7 +90,7 @@ class StockLedgerEntry(Document):
 			if item_det.has_batch_no:
 				if not self.batch_no:
 					frappe.throw(_("Batch number is mandatory for Item {0}").format(frappe.bold(batch_item)))
-				elif not frappe.db.get_value("Batch", {"item": self.item_code, "name": self.batch_no}):
+				elif not is_valid_batch(self.batch_no, self.item_code, batch_details):
 					frappe.throw(_("{0} is not a valid Batch Number for Item {1}").format(
 						self.batch_no, frappe.bold(batch_item)
 					))
@@ -159,9 +164,12 @@ class StockLedgerEntry(Document):
 		if not self.posting_time or self.posting_time == '00:0':
 			self.posting_time = '00:00'
 
-	def validate_batch(self):
+	def validate_batch(self, batch_details=None):
 		if self.batch_no and self.voucher_type != "Stock Entry":
-			expiry_date = frappe.db.get_value("Batch", self.batch_no, "expiry_date")
+			if batch_details is None:
+				expiry_date = frappe.db.get_value("Batch", self.batch_no, "expiry_date")
+			else:
+				expiry_date = batch_details.get(self.batch_no, {}).get("expiry_date")
 			if expiry_date:
 				if getdate(self.posting_date) > getdate(expiry_date):
 					frappe.throw(_("Batch {0} of Item {1} has expired.").format(self.batch_no, self.item_code))
@@ -187,6 +195,45 @@ class StockLedgerEntry(Document):
 			self.append('serial_numbers', {'serial_no': serial_no})
 
 
+def get_item_details_for_sle(item_codes):
+	item_details = frappe.db.sql("""select name, item_name, has_batch_no, docstatus,
+		is_stock_item, has_variants, stock_uom, create_new_batch
+		from tabItem where name in %s""", [list(set(item_codes))], as_dict=True)
+
+	return {d.name: d for d in item_details}
+
+
+def get_batch_details_for_sle(batch_nos):
+	batch_nos = list(set([d for d in batch_nos if d]))
+	if not batch_nos:
+		return {}
+
+	batch_details = frappe.db.sql("""select name, item, expiry_date
+		from tabBatch where name in %s""", [batch_nos], as_dict=True)
+
+	return {d.name: d for d in batch_details}
+
+
+def is_valid_batch(batch_no, item_code, batch_details=None):
+	if batch_details is None:
+		return frappe.db.get_value("Batch", {"item": item_code, "name": batch_no})
+
+	return batch_details.get(batch_no, {}).get("item") == item_code
+
+
+def validate_stock_ledger_entries(sles):
+	"""
+		Run the validate and before_submit checks of Stock Ledger Entries that are inserted together,
+		with Item and Batch details fetched once for all entries
+	"""
+	item_details = get_item_details_for_sle([d.item_code for d in sles])
+	batch_details = get_batch_details_for_sle([d.batch_no for d in sles])
+
+	for sle in sles:
+		sle.validate(item_details, batch_details)
+		sle.before_submit()
+
+
 def on_doctype_update():
 	if not frappe.db.has_index('tabStock Ledger Entry', 'posting_sort_index'):
 		frappe.db.commit()
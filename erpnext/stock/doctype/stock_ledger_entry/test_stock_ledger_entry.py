@@ -4,8 +4,73 @@
 
 import frappe
 import unittest
+from frappe.utils import nowdate, add_days
+from erpnext.stock.doctype.item.test_item import create_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.stock_repost_job.stock_repost_job import process_stock_repost_jobs
+from erpnext.stock.stock_ledger import apply_stock_queue_delta, get_stock_queue, get_stock_queue_chain, is_stock_queue_delta
 
 # test_records = frappe.get_test_records('Stock Ledger Entry')
 
 class TestStockLedgerEntry(unittest.TestCase):
-	pass
+	def test_apply_stock_queue_delta(self):
+		stock_queue = [[10, 100], [5, 110], [8, 120], [2, 130], [4, 140]]
+
+		# partially consumed second bucket
+		delta = {"n": 1, "h": 2, "t": 0, "p": [[3, 110]], "a": []}
+		self.assertEqual(apply_stock_queue_delta(stock_queue, delta), [[3, 110], [8, 120], [2, 130], [4, 140]])
+
+		# last bucket topped up and a new bucket received
+		delta = {"n": 1, "h": 0, "t": 1, "p": [], "a": [[6, 140], [1, 150]]}
+		self.assertEqual(apply_stock_queue_delta(stock_queue, delta),
+			[[10, 100], [5, 110], [8, 120], [2, 130], [6, 140], [1, 150]])
+
+		# no change
+		delta = {"n": 1, "h": 0, "t": 0, "p": [], "a": []}
+		self.assertEqual(apply_stock_queue_delta(stock_queue, delta), stock_queue)
+
+	def test_stock_queue_deltas_after_backdated_entries(self):
+		settings = frappe.db.get_value("Stock Settings", None,
+			["stock_queue_snapshot_interval", "defer_backdated_stock_reposting"], as_dict=1)
+		warehouse = "_Test Warehouse - _TC"
+
+		try:
+			queues = {}
+			for snapshot_interval, defer in ((0, 0), (3, 0), (3, 1)):
+				frappe.db.set_value("Stock Settings", None, "stock_queue_snapshot_interval", snapshot_interval)
+				frappe.db.set_value("Stock Settings", None, "defer_backdated_stock_reposting", defer)
+
+				item_code = create_item("_Test Stock Queue Item " + frappe.generate_hash(length=8)).name
+				frappe.db.set_value("Item", item_code, "valuation_method", "FIFO")
+
+				for i in range(8):
+					make_stock_entry(item_code=item_code, target=warehouse, qty=2, basic_rate=100 + i * 10,
+						posting_date=add_days(nowdate(), -20 + 2 * i))
+				make_stock_entry(item_code=item_code, source=warehouse, qty=3, posting_date=add_days(nowdate(), -3))
+
+				# backdated receipt and issue, later entries are reposted
+				make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=50, posting_date=add_days(nowdate(), -15))
+				make_stock_entry(item_code=item_code, source=warehouse, qty=4, posting_date=add_days(nowdate(), -9))
+				process_stock_repost_jobs()
+
+				sles = get_stock_ledger_entries(item_code, warehouse)
+				if snapshot_interval:
+					self.assertTrue(any(is_stock_queue_delta(sle) for sle in sles))
+					for sle in sles:
+						if is_stock_queue_delta(sle):
+							self.assertTrue(get_stock_queue_chain(sle)[2])
+
+				queues[(snapshot_interval, defer)] = [get_stock_queue(sle) for sle in sles]
+
+			self.assertEqual(queues[(0, 0)], queues[(3, 0)])
+			self.assertEqual(queues[(0, 0)], queues[(3, 1)])
+		finally:
+			frappe.db.set_value("Stock Settings", None, settings)
+
+
+def get_stock_ledger_entries(item_code, warehouse):
+	return frappe.db.sql("""
+		select * from `tabStock Ledger Entry`
+		where item_code = %s and warehouse = %s and ifnull(is_cancelled, 'No') = 'No'
+		order by posting_date, posting_time, creation
+	""", (item_code, warehouse), as_dict=1)
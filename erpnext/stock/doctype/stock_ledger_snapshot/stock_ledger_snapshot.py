@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, cstr, getdate, get_last_day, add_months, add_days, today
+from frappe.model.document import Document
+from erpnext.utilities.bulk_insert import bulk_insert
+
+
+class StockLedgerSnapshot(Document):
+	pass
+
+
+snapshot_key_fields = ("company", "item_code", "warehouse", "batch_no", "packing_slip")
+snapshot_dates_cache_key = "stock_ledger_snapshot_dates"
+
+
+def on_doctype_update():
+	frappe.db.add_index("Stock Ledger Snapshot", ["item_code", "warehouse", "snapshot_date"])
+	frappe.db.add_index("Stock Ledger Snapshot", ["snapshot_date"])
+
+
+def is_stock_ledger_snapshot_enabled():
+	return cint(frappe.db.get_single_value("Stock Settings", "maintain_stock_ledger_snapshots"))
+
+
+def get_snapshot_dates():
+	def generator():
+		return frappe.db.sql_list("""
+			select distinct snapshot_date
+			from `tabStock Ledger Snapshot`
+			order by snapshot_date
+		""")
+
+	return frappe.cache().get_value(snapshot_dates_cache_key, generator)
+
+
+def clear_snapshot_dates_cache():
+	frappe.cache().delete_value(snapshot_dates_cache_key)
+
+
+def get_snapshot_key(d):
+	return tuple(cstr(d.get(f)) for f in snapshot_key_fields)
+
+
+def create_monthly_stock_ledger_snapshot():
+	"""Scheduled monthly: snapshot the balances at the end of the previous month"""
+	if is_stock_ledger_snapshot_enabled():
+		create_stock_ledger_snapshot(get_last_day(add_months(today(), -1)))
+		frappe.db.commit()
+
+
+def create_stock_ledger_snapshot(snapshot_date):
+	"""
+		Create balances as of snapshot_date per (company, item_code, warehouse, batch_no, packing_slip)
+		from the previous snapshot and the Stock Ledger Entries after it
+	"""
+	snapshot_date = getdate(snapshot_date)
+
+	previous_snapshot_date = frappe.db.sql("""
+		select max(snapshot_date)
+		from `tabStock Ledger Snapshot`
+		where snapshot_date < %s
+	""", snapshot_date)[0][0]
+
+	frappe.db.sql("delete from `tabStock Ledger Snapshot` where snapshot_date = %s", snapshot_date)
+
+	balances = {}
+
+	if previous_snapshot_date:
+		previous_balances = frappe.db.sql("""
+			select company, item_code, warehouse, batch_no, packing_slip, qty, stock_value
+			from `tabStock Ledger Snapshot`
+			where snapshot_date = %s
+		""", previous_snapshot_date, as_dict=1)
+
+		for d in previous_balances:
+			balances[get_snapshot_key(d)] = [flt(d.qty), flt(d.stock_value)]
+
+	sle_balances = frappe.db.sql("""
+		select company, item_code, warehouse, batch_no, packing_slip,
+			sum(actual_qty) as qty, sum(stock_value_difference) as stock_value
+		from `tabStock Ledger Entry`
+		where posting_date > %s and posting_date <= %s
+			and is_processed = 1
+			and ifnull(is_cancelled, 'No') = 'No'
+		group by company, item_code, warehouse, batch_no, packing_slip
+	""", (previous_snapshot_date or "1900-01-01", snapshot_date), as_dict=1)
+
+	for d in sle_balances:
+		balance = balances.setdefault(get_snapshot_key(d), [0, 0])
+		balance[0] += flt(d.qty)
+		balance[1] += flt(d.stock_value)
+
+	rows = []
+	for key, (qty, stock_value) in balances.items():
+		if not flt(qty, 9) and not flt(stock_value, 9):
+			continue
+
+		row = dict(zip(snapshot_key_fields, [v or None for v in key]))
+		row.update({"snapshot_date": snapshot_date, "qty": flt(qty, 9), "stock_value": stock_value})
+		rows.append(row)
+
+	bulk_insert("Stock Ledger Snapshot", rows, ["snapshot_date"] + list(snapshot_key_fields) + ["qty", "stock_value"])
+	clear_snapshot_dates_cache()
+
+
+@frappe.whitelist()
+def rebuild_stock_ledger_snapshots():
+	"""Recreate all month end snapshots from the first Stock Ledger Entry up to the end of last month"""
+	frappe.only_for("System Manager")
+	recreate_stock_ledger_snapshots()
+
+
+def recreate_stock_ledger_snapshots():
+	delete_stock_ledger_snapshots()
+
+	first_posting_date = frappe.db.sql("""
+		select min(posting_date)
+		from `tabStock Ledger Entry`
+		where ifnull(is_cancelled, 'No') = 'No'
+	""")[0][0]
+	if not first_posting_date:
+		return
+
+	last_snapshot_date = get_last_day(add_months(today(), -1))
+	snapshot_date = get_last_day(first_posting_date)
+	while snapshot_date <= last_snapshot_date:
+		create_stock_ledger_snapshot(snapshot_date)
+		snapshot_date = get_last_day(add_days(snapshot_date, 1))
+
+
+def delete_stock_ledger_snapshots():
+	frappe.db.sql("delete from `tabStock Ledger Snapshot`")
+	clear_snapshot_dates_cache()
+
+
+def update_stock_ledger_snapshots(changes):
+	"""
+		Apply changes in qty and value of reposted Stock Ledger Entries to all snapshots on or after their posting date
+
+		:param changes: dict of snapshot key -> dict of posting_date -> [qty change, value change]
+	"""
+	snapshot_dates = get_snapshot_dates()
+	if not snapshot_dates:
+		return
+
+	for key, dated_changes in changes.items():
+		change_dates = sorted(dated_changes.keys())
+		if change_dates[0] > snapshot_dates[-1]:
+			continue
+
+		key_values = dict(zip(snapshot_key_fields, key))
+
+		existing_snapshot_dates = set(frappe.db.sql_list("""
+			select snapshot_date
+			from `tabStock Ledger Snapshot`
+			where {0} and snapshot_date >= %(from_date)s
+		""".format(get_snapshot_key_condition()), dict(key_values, from_date=change_dates[0])))
+
+		# the change is the same for all snapshots between two change dates
+		qty_change = value_change = 0
+		missing_rows = []
+		for i, change_date in enumerate(change_dates):
+			qty_change += dated_changes[change_date][0]
+			value_change += dated_changes[change_date][1]
+
+			to_date = change_dates[i + 1] if i + 1 < len(change_dates) else None
+			if not flt(qty_change, 9) and not flt(value_change, 9):
+				continue
+
+			frappe.db.sql("""
+				update `tabStock Ledger Snapshot`
+				set qty = qty + %(qty_change)s, stock_value = stock_value + %(value_change)s
+				where {0} and snapshot_date >= %(from_date)s {1}
+			""".format(get_snapshot_key_condition(), "and snapshot_date < %(to_date)s" if to_date else ""),
+				dict(key_values, qty_change=qty_change, value_change=value_change, from_date=change_date, to_date=to_date))
+
+			for snapshot_date in snapshot_dates:
+				if (snapshot_date >= change_date and (not to_date or snapshot_date < to_date)
+						and snapshot_date not in existing_snapshot_dates):
+					row = dict(zip(snapshot_key_fields, [v or None for v in key]))
+					row.update({"snapshot_date": snapshot_date, "qty": flt(qty_change, 9), "stock_value": value_change})
+					missing_rows.append(row)
+
+		bulk_insert("Stock Ledger Snapshot", missing_rows,
+			["snapshot_date"] + list(snapshot_key_fields) + ["qty", "stock_value"])
+
+
+def remove_voucher_from_stock_ledger_snapshots(voucher_type, voucher_no):
+	"""Reverse the contribution of a voucher's processed Stock Ledger Entries before they are cancelled"""
+	if not is_stock_ledger_snapshot_enabled():
+		return
+
+	sles = frappe.db.sql("""
+		select company, item_code, warehouse, batch_no, packing_slip, posting_date,
+			actual_qty, stock_value_difference
+		from `tabStock Ledger Entry`
+		where voucher_type = %s and voucher_no = %s
+			and is_processed = 1
+			and ifnull(is_cancelled, 'No') = 'No'
+	""", (voucher_type, voucher_no), as_dict=1)
+
+	changes = {}
+	for sle in sles:
+		add_stock_ledger_snapshot_change(changes, sle, -flt(sle.actual_qty), -flt(sle.stock_value_difference))
+
+	update_stock_ledger_snapshots(changes)
+
+
+def add_stock_ledger_snapshot_change(changes, sle, qty_change, value_change):
+	dated_changes = changes.setdefault(get_snapshot_key(sle), {})
+	change = dated_changes.setdefault(getdate(sle.posting_date), [0, 0])
+	change[0] += flt(qty_change)
+	change[1] += flt(value_change)
+
+
+def get_snapshot_key_condition():
+	return " and ".join(["ifnull({0}, '') = %({0})s".format(f) for f in snapshot_key_fields])
+
+
+def get_last_snapshot_date(before_date):
+	before_date = getdate(before_date)
+	previous_dates = [d for d in get_snapshot_dates() or [] if d < before_date]
+	return previous_dates[-1] if previous_dates else None
+
+
+def get_stock_ledger_entries_from_snapshot(filters, item_list=None):
+	"""
+		Returns opening balances from the last snapshot before from_date as pseudo Stock Ledger Entries,
+		followed by the Stock Ledger Entries after the snapshot.
+		Returns None if there is no snapshot to start from or the filters cannot be applied to snapshots.
+	"""
+	from frappe.desk.reportview import build_match_conditions
+	from erpnext.stock.report.stock_balance.stock_balance import get_sle_conditions
+
+	if not is_stock_ledger_snapshot_enabled() or not filters.get("from_date"):
+		return None
+
+	# permission conditions are built for Stock Ledger Entry only
+	if build_match_conditions("Stock Ledger Entry"):
+		return None
+
+	snapshot_date = get_last_snapshot_date(filters.get("from_date"))
+	if not snapshot_date:
+		return None
+
+	conditions = get_snapshot_conditions(filters, item_list)
+
+	opening_entries = frappe.db.sql("""
+		select company, item_code, warehouse, batch_no, packing_slip,
+			qty as actual_qty, stock_value as stock_value_difference,
+			snapshot_date as posting_date, '00:00:00' as posting_time
+		from `tabStock Ledger Snapshot` snapshot
+		where snapshot_date = %s {0}
+		order by item_code, warehouse
+	""".format(conditions), snapshot_date, as_dict=1)
+
+	for d in opening_entries:
+		d.voucher_type = _("Opening")
+		d.is_transfer = 0
+
+	item_conditions = ""
+	if item_list:
+		item_conditions = " and item_code in ({0})".format(
+			', '.join([frappe.db.escape(i, percent=False) for i in item_list]))
+
+	sles = frappe.db.sql("""
+		select
+			item_code, warehouse, company, batch_no, packing_slip, serial_no,
+			actual_qty, valuation_rate, qty_after_transaction, stock_value_difference,
+			posting_date, posting_time, voucher_type, voucher_no, is_transfer
+		from `tabStock Ledger Entry` force index (posting_sort_index)
+		where docstatus < 2 and posting_date > %s {0} {1}
+		order by posting_date, posting_time, creation, actual_qty
+	""".format(item_conditions, get_sle_conditions(filters)), snapshot_date, as_dict=1)
+
+	return opening_entries + sles
+
+
+def get_snapshot_conditions(filters, item_list=None):
+	conditions = []
+
+	if item_list:
+		conditions.append("snapshot.item_code in ({0})".format(
+			', '.join([frappe.db.escape(i, percent=False) for i in item_list])))
+
+	if filters.get("company"):
+		conditions.append("snapshot.company = {0}".format(frappe.db.escape(filters.get("company"))))
+
+	if filters.get("warehouse"):
+		warehouse_details = frappe.db.get_value("Warehouse", filters.get("warehouse"), ["lft", "rgt"], as_dict=1)
+		if not warehouse_details:
+			frappe.throw(_("Warehouse {0} does not exist").format(filters.get("warehouse")))
+
+		conditions.append("""exists (select wh.name from `tabWarehouse` wh
+			where wh.lft >= {0} and wh.rgt <= {1} and snapshot.warehouse = wh.name)
+		""".format(warehouse_details.lft, warehouse_details.rgt))
+
+	elif filters.get("warehouse_type"):
+		conditions.append("""exists (select name from `tabWarehouse` wh
+			where wh.warehouse_type = {0} and snapshot.warehouse = wh.name)
+		""".format(frappe.db.escape(filters.get("warehouse_type"))))
+
+	if filters.get("batch_no"):
+		conditions.append("snapshot.batch_no = {0}".format(frappe.db.escape(filters.get("batch_no"))))
+
+	if filters.get("packing_slip"):
+		conditions.append("snapshot.packing_slip = {0}".format(frappe.db.escape(filters.get("packing_slip"))))
+
+	if filters.get("package_wise_stock") == "Packed Stock":
+		conditions.append("ifnull(snapshot.packing_slip, '') != ''")
+	elif filters.get("package_wise_stock") == "Unpacked Stock":
+		conditions.append("ifnull(snapshot.packing_slip, '') = ''")
+
+	return " and {0}".format(" and ".join(conditions)) if conditions else ""
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+import unittest
+from frappe.utils import flt, today, add_days, add_months, get_last_day
+from erpnext.stock.doctype.item.test_item import create_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.stock_ledger_snapshot.stock_ledger_snapshot import create_stock_ledger_snapshot
+from erpnext.stock.stock_balance import repost_stock
+
+
+class TestStockLedgerSnapshot(unittest.TestCase):
+	def setUp(self):
+		self.maintain_stock_ledger_snapshots = frappe.db.get_single_value("Stock Settings",
+			"maintain_stock_ledger_snapshots")
+		frappe.db.set_value("Stock Settings", None, "maintain_stock_ledger_snapshots", 1)
+
+	def tearDown(self):
+		frappe.db.set_value("Stock Settings", None, "maintain_stock_ledger_snapshots",
+			self.maintain_stock_ledger_snapshots)
+
+	def test_snapshot_matches_stock_ledger(self):
+		warehouse = "_Test Warehouse - _TC"
+		item_code = create_item("_Test Stock Snapshot Item " + frappe.generate_hash(length=8)).name
+		snapshot_date = get_last_day(add_months(today(), -2))
+
+		make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100, posting_date=add_days(snapshot_date, -10))
+		make_stock_entry(item_code=item_code, source=warehouse, qty=3, posting_date=add_days(snapshot_date, -5))
+		make_stock_entry(item_code=item_code, target=warehouse, qty=4, basic_rate=110, posting_date=add_days(snapshot_date, 5))
+
+		create_stock_ledger_snapshot(snapshot_date)
+		self.assert_snapshot_matches_stock_ledger(item_code, warehouse, snapshot_date)
+
+		# backdated entry before the snapshot date
+		make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=80, posting_date=add_days(snapshot_date, -8))
+		self.assert_snapshot_matches_stock_ledger(item_code, warehouse, snapshot_date)
+
+		# repost after the rate of the first entry changed
+		first_sle = frappe.db.get_value("Stock Ledger Entry", {"item_code": item_code, "warehouse": warehouse,
+			"posting_date": add_days(snapshot_date, -10)}, "name")
+		frappe.db.set_value("Stock Ledger Entry", first_sle, "incoming_rate", 120)
+		repost_stock(item_code, warehouse)
+		self.assert_snapshot_matches_stock_ledger(item_code, warehouse, snapshot_date)
+
+	def assert_snapshot_matches_stock_ledger(self, item_code, warehouse, snapshot_date):
+		snapshot = frappe.db.get_value("Stock Ledger Snapshot", {"item_code": item_code, "warehouse": warehouse,
+			"snapshot_date": snapshot_date}, ["qty", "stock_value"], as_dict=1)
+
+		qty, stock_value = frappe.db.sql("""
+			select sum(actual_qty), sum(stock_value_difference)
+			from `tabStock Ledger Entry`
+			where item_code = %s and warehouse = %s and posting_date <= %s
+				and ifnull(is_cancelled, 'No') = 'No'
+		""", (item_code, warehouse, snapshot_date))[0]
+
+		last_sle = frappe.db.sql("""
+			select qty_after_transaction, stock_value
+			from `tabStock Ledger Entry`
+			where item_code = %s and warehouse = %s and posting_date <= %s
+				and ifnull(is_cancelled, 'No') = 'No'
+			order by posting_date desc, posting_time desc, creation desc
+			limit 1
+		""", (item_code, warehouse, snapshot_date), as_dict=1)[0]
+
+		self.assertEqual(flt(snapshot.qty, 6), flt(qty, 6))
+		self.assertEqual(flt(snapshot.stock_value, 2), flt(stock_value, 2))
+		self.assertEqual(flt(snapshot.qty, 6), flt(last_sle.qty_after_transaction, 6))
+		self.assertEqual(flt(snapshot.stock_value, 2), flt(last_sle.stock_value, 2))
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+from frappe.model.document import Document
+
+
+class StockRepostJob(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Stock Repost Job", ["item_code", "warehouse", "status"], index_name="bin_status")
+
+
+def enqueue_stock_repost(sle):
+	"""
+		Record a job to repost (item_code, warehouse) from sle onwards.
+		If a job is already queued for the same bin, it is moved to the earlier of the two start points.
+	"""
+	from erpnext.stock.stock_ledger import get_sle_sort_key
+
+	start_point = frappe._dict({
+		"posting_date": sle.posting_date,
+		"posting_time": sle.posting_time,
+		"sle_creation": sle.creation,
+		"voucher_type": sle.voucher_type,
+		"voucher_no": sle.voucher_no,
+		"stock_ledger_entry": sle.name,
+	})
+
+	queued_job = frappe.db.sql("""
+		select name, posting_date, posting_time, sle_creation as creation
+		from `tabStock Repost Job`
+		where item_code = %s and warehouse = %s and status = 'Queued'
+		order by posting_date, posting_time, sle_creation
+		limit 1
+		for update
+	""", (sle.item_code, sle.warehouse), as_dict=1)
+
+	if queued_job:
+		queued_job = queued_job[0]
+		if get_sle_sort_key(sle) < get_sle_sort_key(queued_job):
+			frappe.db.set_value("Stock Repost Job", queued_job.name, start_point, update_modified=True)
+	else:
+		job = frappe.new_doc("Stock Repost Job")
+		job.update(start_point)
+		job.item_code = sle.item_code
+		job.warehouse = sle.warehouse
+		job.status = "Queued"
+		job.flags.ignore_permissions = True
+		job.flags.ignore_links = True
+		job.insert()
+
+	if not frappe.flags.in_test:
+		frappe.enqueue("erpnext.stock.doctype.stock_repost_job.stock_repost_job.process_stock_repost_jobs",
+			queue="long", enqueue_after_commit=True)
+
+
+def is_stock_repost_pending(item_code=None, warehouse=None):
+	filters = {"status": ["in", ["Queued", "In Progress"]]}
+	if item_code:
+		filters["item_code"] = item_code
+	if warehouse:
+		filters["warehouse"] = warehouse
+
+	return cint(bool(frappe.db.exists("Stock Repost Job", filters)))
+
+
+def get_bins_with_pending_repost(item_codes=None, warehouses=None):
+	conditions = []
+	if item_codes:
+		conditions.append("item_code in %(item_codes)s")
+	if warehouses:
+		conditions.append("warehouse in %(warehouses)s")
+
+	pending = frappe.db.sql("""
+		select distinct item_code, warehouse
+		from `tabStock Repost Job`
+		where status in ('Queued', 'In Progress') {0}
+	""".format("".join([" and " + c for c in conditions])), {
+		"item_codes": item_codes, "warehouses": warehouses
+	})
+
+	return set(pending)
+
+
+def process_stock_repost_jobs():
+	"""Merge all queued jobs per bin down to the earliest start point and repost them in posting order"""
+	# the scheduler runs this on every tick, skip if the previous run is still reposting
+	lock_name = "{0}:process_stock_repost_jobs".format(frappe.conf.db_name)
+	if not cint(frappe.db.sql("select get_lock(%s, 0)", lock_name)[0][0]):
+		return
+
+	try:
+		repost_queued_jobs()
+	finally:
+		frappe.db.sql("select release_lock(%s)", lock_name)
+
+
+def repost_queued_jobs():
+	from erpnext.stock.stock_ledger import get_sle_sort_key
+
+	queued_jobs = frappe.db.sql("""
+		select name, item_code, warehouse, posting_date, posting_time, sle_creation as creation,
+			voucher_type, voucher_no, stock_ledger_entry
+		from `tabStock Repost Job`
+		where status = 'Queued'
+		order by posting_date, posting_time, sle_creation
+	""", as_dict=1)
+
+	bin_jobs = {}
+	for d in queued_jobs:
+		bin_jobs.setdefault((d.item_code, d.warehouse), []).append(d)
+
+	for jobs in sorted(bin_jobs.values(), key=lambda jobs: get_sle_sort_key(jobs[0])):
+		repost_bin(jobs)
+
+
+def repost_bin(jobs):
+	from erpnext.stock.stock_ledger import update_entries_after
+	from erpnext.controllers.stock_controller import update_gl_entries_for_reposted_stock_vouchers
+
+	job_names = [d.name for d in jobs]
+	start_point = jobs[0]
+
+	# another worker may have picked these up already
+	job_names = frappe.db.sql_list("""
+		select name from `tabStock Repost Job`
+		where name in %s and status = 'Queued'
+		for update
+	""", [job_names])
+	if not job_names:
+		frappe.db.rollback()
+		return
+
+	set_job_status(job_names, "In Progress")
+	frappe.db.commit()
+
+	try:
+		frappe.flags.stock_ledger_vouchers_reposted = None
+		update_entries_after({
+			"item_code": start_point.item_code,
+			"warehouse": start_point.warehouse,
+			"posting_date": start_point.posting_date,
+			"posting_time": start_point.posting_time,
+			"creation": start_point.creation,
+			"sle_id": start_point.stock_ledger_entry,
+			"voucher_no": start_point.voucher_no,
+		}, defer_future_entries=False)
+
+		update_gl_entries_for_reposted_stock_vouchers()
+
+		set_job_status(job_names, "Completed")
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		set_job_status(job_names, "Failed", error_log=frappe.get_traceback())
+		frappe.db.commit()
+
+
+def set_job_status(job_names, status, error_log=None):
+	reposted_on = now_datetime() if status in ("Completed", "Failed") else None
+	frappe.db.sql("""
+		update `tabStock Repost Job`
+		set status = %s, error_log = %s, reposted_on = %s, modified = %s
+		where name in %s
+	""", (status, error_log, reposted_on, now_datetime(), job_names))
+
+
+@frappe.whitelist()
+def retry_failed_jobs(item_code=None, warehouse=None):
+	frappe.only_for(("System Manager", "Stock Manager"))
+
+	filters = {"status": "Failed"}
+	if item_code:
+		filters["item_code"] = item_code
+	if warehouse:
+		filters["warehouse"] = warehouse
+
+	for name in frappe.get_all("Stock Repost Job", filters=filters, pluck="name"):
+		frappe.db.set_value("Stock Repost Job", name, {"status": "Queued", "error_log": None})
+
+	frappe.enqueue("erpnext.stock.doctype.stock_repost_job.stock_repost_job.process_stock_repost_jobs",
+		queue="long", enqueue_after_commit=True)
+	frappe.msgprint(_("Failed Stock Repost Jobs have been queued again"))
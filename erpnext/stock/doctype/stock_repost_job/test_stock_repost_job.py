@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+import unittest
+from frappe.utils import flt, nowdate, add_days
+from erpnext.stock.doctype.item.test_item import create_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.stock_repost_job.stock_repost_job import (is_stock_repost_pending,
+	process_stock_repost_jobs)
+
+
+class TestStockRepostJob(unittest.TestCase):
+	def setUp(self):
+		self.defer_backdated_stock_reposting = frappe.db.get_single_value("Stock Settings",
+			"defer_backdated_stock_reposting")
+
+	def tearDown(self):
+		frappe.db.set_value("Stock Settings", None, "defer_backdated_stock_reposting",
+			self.defer_backdated_stock_reposting)
+
+	def test_deferred_repost_matches_synchronous_repost(self):
+		warehouse = "_Test Warehouse - _TC"
+
+		values = {}
+		for defer in (0, 1):
+			frappe.db.set_value("Stock Settings", None, "defer_backdated_stock_reposting", defer)
+			item_code = create_item("_Test Stock Repost Job Item " + frappe.generate_hash(length=8)).name
+
+			make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100, posting_date=add_days(nowdate(), -5))
+			make_stock_entry(item_code=item_code, source=warehouse, qty=4, posting_date=add_days(nowdate(), -3))
+			make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=120, posting_date=add_days(nowdate(), -1))
+			make_stock_entry(item_code=item_code, source=warehouse, qty=6)
+
+			# backdated receipt, later entries are reposted by the job in deferred mode
+			make_stock_entry(item_code=item_code, target=warehouse, qty=3, basic_rate=80, posting_date=add_days(nowdate(), -4))
+
+			if defer:
+				self.assertTrue(is_stock_repost_pending(item_code, warehouse))
+				self.assertEqual(flt(frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse},
+					"actual_qty")), 8)
+
+				process_stock_repost_jobs()
+				self.assertFalse(is_stock_repost_pending(item_code, warehouse))
+
+			# backdated issue is never deferred, so that later entries are validated for negative stock
+			make_stock_entry(item_code=item_code, source=warehouse, qty=2, posting_date=add_days(nowdate(), -2))
+			self.assertFalse(is_stock_repost_pending(item_code, warehouse))
+
+			values[defer] = get_stock_values(item_code, warehouse)
+
+		self.assertEqual(values[0], values[1])
+
+
+def get_stock_values(item_code, warehouse):
+	sles = frappe.db.sql("""
+		select actual_qty, qty_after_transaction, valuation_rate, stock_value, stock_value_difference, stock_queue
+		from `tabStock Ledger Entry`
+		where item_code = %s and warehouse = %s and ifnull(is_cancelled, 'No') = 'No'
+		order by posting_date, posting_time, creation
+	""", (item_code, warehouse), as_dict=1)
+
+	bin_values = frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse},
+		["actual_qty", "valuation_rate", "stock_value"], as_dict=1)
+
+	return sles, bin_values
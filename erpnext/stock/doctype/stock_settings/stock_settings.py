@@ -22,6 +22,10 @@ class StockSettings(Document):
 		if cint(self.enable_dynamic_bundling):
 			make_bundling_fields()
 
+		if cint(self.maintain_stock_ledger_snapshots) and self.has_value_changed("maintain_stock_ledger_snapshots"):
+			frappe.enqueue("erpnext.stock.doctype.stock_ledger_snapshot.stock_ledger_snapshot.rebuild_stock_ledger_snapshots",
+				queue="long", timeout=3600, enqueue_after_commit=True)
+
 	def update_global_defaults(self):
 		global_default_fields = [
 			"item_naming_by",
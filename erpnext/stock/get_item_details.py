@@ -11,6 +11,7 @@ from erpnext import get_company_currency
 from erpnext.stock.doctype.item.item import get_uom_conv_factor, convert_item_uom_for
 from erpnext.setup.doctype.item_default_rule.item_default_rule import get_item_default_values
 from erpnext.stock.doctype.price_list.price_list import get_price_list_details
+from erpnext.stock.doctype.item_price.item_price import get_cached_item_prices, sort_item_prices, clear_item_price_cache
 from erpnext.stock.doctype.item_manufacturer.item_manufacturer import get_item_manufacturer_part_no
 from erpnext.selling.doctype.sales_commission_category.sales_commission_category import get_commission_rate
 from erpnext.vehicles.doctype.vehicle.vehicle import get_vehicle_from_serial_no
@@ -42,7 +43,7 @@ def get_item_details(args, doc=None, for_validate=False, overwrite_warehouse=Tru
 	"""
 
 	args = process_args(args)
-	item = frappe.get_cached_doc("Item", args.item_code)
+	item = get_item_doc(args.item_code)
 	validate_item_details(args, item)
 
 	out = get_basic_details(args, item, overwrite_warehouse)
@@ -104,6 +105,228 @@ def get_item_details(args, doc=None, for_validate=False, overwrite_warehouse=Tru
 	return out
 
 
+@frappe.whitelist()
+def get_items_details(args, items, doc=None, for_validate=False, overwrite_warehouse=True, price_list_only=False):
+	"""
+		Returns get_item_details of each row in items, in the same order, or only the price list and pricing
+		rule details of apply_price_list_on_item if price_list_only is set.
+		args are the values common to all rows, each row in items is applied over them.
+
+		Item, Item Default Rule, Item Tax Template, Item Price, Bin and Product Bundle rows of all the items are
+		fetched together before the rows are resolved, see ItemDetailsPrefetch.
+	"""
+	args = json.loads(args) if isinstance(args, str) else args
+	items = json.loads(items) if isinstance(items, str) else items
+
+	if isinstance(doc, str):
+		doc = json.loads(doc)
+
+	items_args = []
+	for d in items:
+		item_args = frappe._dict(args)
+		item_args.update(d)
+		items_args.append(item_args)
+
+	out = []
+	with ItemDetailsPrefetch(items_args):
+		for item_args in items_args:
+			if cint(price_list_only):
+				out.append(apply_price_list_on_item(item_args))
+			else:
+				out.append(get_item_details(item_args, doc, for_validate=for_validate,
+					overwrite_warehouse=overwrite_warehouse))
+
+	return out
+
+
+class ItemDetailsPrefetch:
+	"""
+		Rows read by get_item_details for many items at once, fetched in a few queries.
+		While used as a context manager, get_item_details reads these rows from memory instead of the database.
+	"""
+	def __init__(self, items_args):
+		self.items = {}
+		self.item_default_rules = None
+		self.item_tax_templates = {}
+		self.item_prices = {}
+		self.bins = {}
+		self.product_bundles = {}
+		self.item_tax_maps = {}
+		self.default_values = {}
+
+		self.previous = None
+		self.items_args = [frappe._dict(d) for d in items_args if d.get("item_code")]
+
+	def __enter__(self):
+		self.previous = (frappe.flags.item_details_prefetch, frappe.flags.item_default_values_cache,
+			frappe.flags.item_default_rule_docs)
+		frappe.flags.item_details_prefetch = self
+		frappe.flags.item_default_values_cache = self.default_values
+
+		self.load_items()
+		self.load_item_default_rules()
+		frappe.flags.item_default_rule_docs = self.item_default_rules
+		self.load_item_tax_templates()
+		self.load_item_prices()
+		self.load_bins()
+		self.load_product_bundles()
+
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		frappe.flags.item_details_prefetch, frappe.flags.item_default_values_cache, \
+			frappe.flags.item_default_rule_docs = self.previous
+
+	def load_items(self):
+		item_codes = set([d.item_code for d in self.items_args])
+		self.items = get_docs_with_children("Item", item_codes)
+
+		template_codes = set([item.variant_of for item in self.items.values() if item.variant_of]) - item_codes
+		self.items.update(get_docs_with_children("Item", template_codes))
+
+	def load_item_default_rules(self):
+		from erpnext.setup.doctype.item_default_rule.item_default_rule import get_item_default_rule_names
+
+		names = get_item_default_rule_names()
+		docs = get_docs_with_children("Item Default Rule", names)
+		self.item_default_rules = [docs[name] for name in names if name in docs]
+
+	def load_item_tax_templates(self):
+		item_tax_templates = set()
+		for doc in list(self.items.values()) + self.item_default_rules:
+			for d in doc.get("taxes") or []:
+				item_tax_templates.add(d.item_tax_template)
+
+		self.item_tax_templates = get_docs_with_children("Item Tax Template", [d for d in item_tax_templates if d])
+
+	def load_item_prices(self):
+		price_lists = set()
+		for d in self.items_args:
+			price_lists.add(d.get("price_list") or d.get("selling_price_list") or d.get("buying_price_list"))
+			price_lists.add(d.get("retail_price_list"))
+
+		price_lists = [d for d in price_lists if d]
+		item_codes = list(self.items)
+		if not price_lists or not item_codes:
+			return
+
+		for item_code in item_codes:
+			for price_list in price_lists:
+				self.item_prices[(item_code, price_list)] = []
+
+		for d in frappe.db.sql("""
+			select name, item_code, price_list, price_list_rate, uom, valid_from, valid_upto, packing_unit,
+				customer, supplier
+			from `tabItem Price`
+			where item_code in %(item_codes)s and price_list in %(price_lists)s
+		""", {"item_codes": item_codes, "price_lists": price_lists}, as_dict=1):
+			self.item_prices[(d.item_code, d.price_list)].append(d)
+
+		for key, item_prices in self.item_prices.items():
+			self.item_prices[key] = sort_item_prices(item_prices)
+
+	def load_bins(self):
+		warehouses = set()
+		for d in self.items_args:
+			warehouses.add(d.get("warehouse"))
+			warehouses.add(d.get("set_warehouse"))
+
+			item = self.items[d.item_code]
+			warehouses.add(get_item_default_values(item, d).get("default_warehouse"))
+
+		warehouses = [d for d in warehouses if d]
+		item_codes = list(self.items)
+		if not warehouses or not item_codes:
+			return
+
+		for item_code in item_codes:
+			for warehouse in warehouses:
+				self.bins[(item_code, warehouse)] = None
+
+		for d in frappe.db.sql("""
+			select item_code, warehouse, projected_qty, actual_qty, reserved_qty, valuation_rate
+			from `tabBin`
+			where item_code in %(item_codes)s and warehouse in %(warehouses)s
+		""", {"item_codes": item_codes, "warehouses": warehouses}, as_dict=1):
+			self.bins[(d.item_code, d.warehouse)] = d
+
+	def load_product_bundles(self):
+		item_codes = list(self.items)
+		if not item_codes:
+			return
+
+		for item_code in item_codes:
+			self.product_bundles[item_code] = None
+
+		for name, new_item_code in frappe.db.sql("""
+			select name, new_item_code
+			from `tabProduct Bundle`
+			where new_item_code in %s
+		""", [item_codes]):
+			self.product_bundles[new_item_code] = name
+
+	def has_item_prices(self, item_code, price_list):
+		return (item_code, price_list) in self.item_prices
+
+	def get_item_prices(self, item_code, price_list):
+		return self.item_prices[(item_code, price_list)]
+
+	def clear_item_prices(self, item_code, price_list):
+		self.item_prices.pop((item_code, price_list), None)
+
+	def has_bin(self, item_code, warehouse):
+		return (item_code, warehouse) in self.bins
+
+
+def get_docs_with_children(doctype, names):
+	"""
+		Returns {name: Document} of doctype for names, loaded with one query for the doctype
+		and one query for each doctype of its child tables
+	"""
+	names = list(set(names))
+	if not names:
+		return {}
+
+	docs = {}
+	for d in frappe.db.sql("select * from `tab{0}` where name in %s".format(doctype), [names], as_dict=1): #nosec
+		d.doctype = doctype
+		docs[d.name] = d
+
+	table_fields = {}
+	for df in frappe.get_meta(doctype).get_table_fields():
+		table_fields.setdefault(df.options, []).append(df.fieldname)
+		for d in docs.values():
+			d[df.fieldname] = []
+
+	if docs:
+		for child_doctype, fieldnames in table_fields.items():
+			for d in frappe.db.sql("""
+				select * from `tab{0}`
+				where parenttype = %s and parentfield in %s and parent in %s
+				order by idx
+			""".format(child_doctype), (doctype, fieldnames, list(docs)), as_dict=1): #nosec
+				d.doctype = child_doctype
+				docs[d.parent][d.parentfield].append(d)
+
+	return {name: frappe.get_doc(d) for name, d in docs.items()}
+
+
+def get_item_doc(item_code):
+	prefetch = frappe.flags.item_details_prefetch
+	if prefetch and item_code in prefetch.items:
+		return prefetch.items[item_code]
+
+	return frappe.get_cached_doc("Item", item_code)
+
+
+def get_item_tax_template_doc(item_tax_template):
+	prefetch = frappe.flags.item_details_prefetch
+	if prefetch and item_tax_template in prefetch.item_tax_templates:
+		return prefetch.item_tax_templates[item_tax_template]
+
+	return frappe.get_cached_doc("Item Tax Template", item_tax_template)
+
+
 def update_stock(args, out):
 	if (args.get("doctype") == "Delivery Note" or
 		(args.get("doctype") == "Sales Invoice" and args.get('update_stock'))) \
@@ -217,7 +440,7 @@ def get_basic_details(args, item, overwrite_warehouse=True):
 	"""
 
 	if not item:
-		item = frappe.get_cached_doc("Item", args.get("item_code"))
+		item = get_item_doc(args.get("item_code"))
 
 	if item.variant_of:
 		item.update_template_tables()
@@ -420,7 +643,7 @@ def get_multiple_item_tax_templates(args, item_codes):
 		if not item_code or item_code in out:
 			continue
 
-		item = frappe.get_cached_doc("Item", item_code)
+		item = get_item_doc(item_code)
 
 		out[item_code] = {}
 		out[item_code]["item_tax_template"] = get_item_tax_template(args, item)
@@ -472,10 +695,24 @@ def get_multiple_item_tax_maps(item_tax_templates, company, transaction_date=Non
 
 @frappe.whitelist()
 def get_item_tax_map(item_tax_template, company, transaction_date=None, as_json=True):
+	prefetch = frappe.flags.item_details_prefetch
+	if prefetch:
+		key = (item_tax_template, company, cstr(transaction_date))
+		if key not in prefetch.item_tax_maps:
+			prefetch.item_tax_maps[key] = _get_item_tax_map(item_tax_template, company, transaction_date)
+
+		item_tax_map = prefetch.item_tax_maps[key].copy()
+	else:
+		item_tax_map = _get_item_tax_map(item_tax_template, company, transaction_date)
+
+	return json.dumps(item_tax_map) if cint(as_json) else item_tax_map
+
+
+def _get_item_tax_map(item_tax_template, company, transaction_date=None):
 	item_tax_map = {}
 
 	if item_tax_template:
-		template = frappe.get_cached_doc("Item Tax Template", item_tax_template)
+		template = get_item_tax_template_doc(item_tax_template)
 
 		sorted_taxes = sorted(template.get("taxes"), key=lambda t: (bool(t.valid_from), getdate(t.valid_from)))
 		for d in sorted_taxes:
@@ -486,14 +723,14 @@ def get_item_tax_map(item_tax_template, company, transaction_date=None, as_json=
 
 			item_tax_map[d.tax_type] = d.tax_rate
 
-	return json.dumps(item_tax_map) if cint(as_json) else item_tax_map
+	return item_tax_map
 
 
 @frappe.whitelist()
 def calculate_service_end_date(args, item=None):
 	args = process_args(args)
 	if not item:
-		item = frappe.get_cached_doc("Item", args.item_code)
+		item = get_item_doc(args.item_code)
 
 	doctype = args.get("parenttype") or args.get("doctype")
 	if doctype == "Sales Invoice":
@@ -519,7 +756,7 @@ def calculate_service_end_date(args, item=None):
 
 def get_default_income_account(item, args):
 	if isinstance(item, str):
-		item = frappe.get_cached_doc("Item", item)
+		item = get_item_doc(item)
 
 	default_values = get_item_default_values(item, args)
 
@@ -532,7 +769,7 @@ def get_default_income_account(item, args):
 
 def get_default_expense_account(item, args):
 	if isinstance(item, str):
-		item = frappe.get_cached_doc("Item", item)
+		item = get_item_doc(item)
 
 	default_values = get_item_default_values(item, args)
 
@@ -558,7 +795,7 @@ def get_default_deferred_account(args, item, fieldname=None):
 
 def get_default_cost_center(item, args, selling_or_buying=None):
 	if isinstance(item, str):
-		item = frappe.get_cached_doc("Item", item)
+		item = get_item_doc(item)
 
 	cost_center = None
 
@@ -588,7 +825,7 @@ def get_default_cost_center(item, args, selling_or_buying=None):
 
 def get_default_supplier(item, args):
 	if isinstance(item, str):
-		item = frappe.get_cached_doc("Item", item)
+		item = get_item_doc(item)
 
 	default_values = get_item_default_values(item, args)
 	return item.get("default_supplier") or default_values.get("default_supplier")
@@ -701,7 +938,7 @@ def get_item_defaults_details(args, set_warehouse=False):
 	:return: dict
 	"""
 
-	item = frappe.get_cached_doc("Item", args.get("item_code"))
+	item = get_item_doc(args.get("item_code"))
 
 	out = {
 		"income_account": get_default_income_account(item, args),
@@ -799,6 +1036,9 @@ def insert_item_price(args):
 	if frappe.db.get_value("Price List", args.price_list, "currency", cache=True) == args.currency \
 		and cint(frappe.get_cached_value("Stock Settings", None, "auto_insert_price_list_rate_if_missing")):
 		if frappe.has_permission("Item Price", "write"):
+			if frappe.flags.item_details_prefetch:
+				frappe.flags.item_details_prefetch.clear_item_prices(args.item_code, args.price_list)
+
 			price_list_rate = (args.rate / args.get('conversion_factor')
 				if args.get("conversion_factor") else args.rate)
 
@@ -808,6 +1048,7 @@ def insert_item_price(args):
 			if item_price and item_price.name:
 				if item_price.price_list_rate != price_list_rate:
 					frappe.db.set_value('Item Price', item_price.name, "price_list_rate", price_list_rate)
+					clear_item_price_cache(args.price_list, args.item_code)
 					frappe.msgprint(_("Item Price updated for {0} in Price List {1}").format(args.item_code,
 						args.price_list), alert=True)
 			else:
@@ -903,6 +1144,69 @@ def get_item_price(args, item_code, ignore_party=False):
 
 	args['item_code'] = item_code
 
+	if args.get('transaction_date') and args.get('period') == 'future':
+		args['uom'] = args.get('uom', '')
+
+	prefetch = frappe.flags.item_details_prefetch
+	if prefetch and prefetch.has_item_prices(item_code, args.get("price_list")):
+		item_prices = prefetch.get_item_prices(item_code, args.get("price_list"))
+	else:
+		item_prices = get_cached_item_prices(args.get("price_list"), item_code)
+
+	if item_prices is not None:
+		prices = filter_item_prices(item_prices, args, ignore_party=ignore_party)
+	else:
+		prices = get_item_price_rows(args, ignore_party=ignore_party)
+
+	return select_item_price(prices, args, item_code)
+
+
+def filter_item_prices(item_prices, args, ignore_party=False):
+	"""
+		Returns the rows the Item Price query of get_item_price_rows would return,
+		from all Item Prices of the item in the price list sorted by sort_item_prices
+	"""
+	transaction_date = getdate(args.get("transaction_date")) if args.get("transaction_date") else None
+	future = transaction_date and args.get('period') == 'future'
+
+	prices = []
+	for d in item_prices:
+		if not ignore_party:
+			if args.get("customer"):
+				if d.customer != args.get("customer"):
+					continue
+			elif args.get("supplier"):
+				if d.supplier != args.get("supplier"):
+					continue
+			elif d.customer or d.supplier:
+				continue
+
+		valid_from = getdate(d.valid_from or "2000-01-01")
+		valid_upto = getdate(d.valid_upto or "2500-12-31")
+
+		if future:
+			if valid_from <= transaction_date or (d.uom or '') != args.get('uom'):
+				continue
+		elif transaction_date:
+			if valid_from > transaction_date or valid_upto < transaction_date:
+				continue
+
+		prices.append(frappe._dict({
+			"name": d.name,
+			"price_list_rate": d.price_list_rate,
+			"uom": d.uom,
+			"valid_from": valid_from,
+			"valid_upto": valid_upto,
+			"packing_unit": d.packing_unit,
+		}))
+
+	if future:
+		prices = sorted(prices, key=lambda d: d.valid_from)
+
+	return prices
+
+
+def get_item_price_rows(args, ignore_party=False):
 	conditions = """where item_code = %(item_code)s and price_list = %(price_list)s"""
 	order_by = "order by ifnull(valid_from, '2000-01-01') desc, uom desc"
 
@@ -939,6 +1243,10 @@ def get_item_price(args, item_code, ignore_party=False):
 		{order_by}
 	""".format(conditions=conditions, order_by=order_by), args, as_dict=1)
 
+	return prices
+
+
+def select_item_price(prices, args, item_code):
 	matches_uom = [d for d in prices if cstr(d.uom) == cstr(args.get('uom'))]
 	if matches_uom:
 		return matches_uom[0]
@@ -946,7 +1254,7 @@ def get_item_price(args, item_code, ignore_party=False):
 	has_uom = [d for d in prices if d.uom]
 	if has_uom:
 		# there are item prices with uom other than the current uom
-		item = frappe.get_cached_doc("Item", item_code)
+		item = get_item_doc(item_code)
 		item_uoms = [d.uom for d in item.uoms]
 
 		convertible_prices = [d for d in has_uom if d.uom in item_uoms]
@@ -1128,7 +1436,7 @@ def get_weight_per_unit(item_code, weight_uom=None, weight_field="net_weight_per
 	if weight_field not in allowed_weight_fields:
 		frappe.throw(_("Invalid weight field '{0}'").format(weight_field))
 
-	item = frappe.get_cached_doc("Item", item_code)
+	item = get_item_doc(item_code)
 
 	item_weight = flt(item.get(weight_field))
 	weight_uom = weight_uom or item.weight_uom
@@ -1150,13 +1458,13 @@ def get_weight_per_unit(item_code, weight_uom=None, weight_field="net_weight_per
 @frappe.whitelist()
 def get_conversion_factor(item_code, uom):
 	# first look for direct conversion factor in item
-	item = frappe.get_cached_doc("Item", item_code)
+	item = get_item_doc(item_code)
 	item_conversion_factors = dict([(c.uom, c.conversion_factor) for c in item.uoms])
 	conversion_factor = flt(item_conversion_factors.get(uom))
 
 	# then look for conversion factor in template item if variant
 	if not conversion_factor and item.variant_of:
-		template_item = frappe.get_cached_doc("Item", item.variant_of)
+		template_item = get_item_doc(item.variant_of)
 		template_item_conversion_factors = dict([(c.uom, c.conversion_factor) for c in template_item.uoms])
 		if uom in template_item_conversion_factors:
 			conversion_factor = flt(item_conversion_factors.get(uom))
@@ -1194,6 +1502,15 @@ def get_projected_qty(item_code, warehouse):
 @frappe.whitelist()
 def get_bin_details(item_code, warehouse):
 	def generator():
+		prefetch = frappe.flags.item_details_prefetch
+		if prefetch and prefetch.has_bin(item_code, warehouse):
+			bin_details = prefetch.bins[(item_code, warehouse)]
+			if bin_details:
+				return frappe._dict({"projected_qty": bin_details.projected_qty, "actual_qty": bin_details.actual_qty,
+					"reserved_qty": bin_details.reserved_qty})
+			else:
+				return {"projected_qty": 0, "actual_qty": 0, "reserved_qty": 0}
+
 		return frappe.db.get_value(
 			"Bin",
 			{"item_code": item_code, "warehouse": warehouse},
@@ -1280,11 +1597,7 @@ def apply_price_list(args, as_doc=False):
 		item_list = args.get("items")
 		args.update(parent)
 
-		for item in item_list:
-			args_copy = frappe._dict(args.copy())
-			args_copy.update(item)
-			item_details = apply_price_list_on_item(args_copy)
-			children.append(item_details)
+		children = get_items_details(args, item_list, price_list_only=True)
 
 	if as_doc:
 		args.price_list_currency = parent.price_list_currency,
@@ -1306,7 +1619,7 @@ def apply_price_list(args, as_doc=False):
 
 def apply_price_list_on_item(args):
 	item_details = frappe._dict()
-	item_doc = frappe.get_cached_doc("Item", args.item_code)
+	item_doc = get_item_doc(args.item_code)
 	get_price_list_data(args, item_doc, item_details)
 
 	item_details.update(get_pricing_rule_for_item(args, item_details.price_list_rate))
@@ -1395,13 +1708,18 @@ def set_valuation_rate(out, args):
 
 
 def get_valuation_rate(item_code, company, warehouse=None, transaction_type_name=None):
-	item = frappe.get_cached_doc("Item", item_code)
+	item = get_item_doc(item_code)
 	default_values = get_item_default_values(item, {"company": company, "transaction_type": transaction_type_name})
 
 	if item.get("is_stock_item"):
 		if not warehouse:
 			warehouse = default_values.get("default_warehouse")
 
+		prefetch = frappe.flags.item_details_prefetch
+		if prefetch and prefetch.has_bin(item_code, warehouse):
+			bin_details = prefetch.bins[(item_code, warehouse)]
+			return frappe._dict({"valuation_rate": bin_details.valuation_rate}) if bin_details else {"valuation_rate": 0}
+
 		return frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse},
 			["valuation_rate"], as_dict=True) or {"valuation_rate": 0}
 
@@ -1496,8 +1814,14 @@ def item_has_product_bundle(item_code):
 	if not item_code:
 		return False
 
-	return frappe.local_cache("item_has_product_bundle", item_code,
-		lambda: frappe.db.get_value("Product Bundle", {"new_item_code": item_code}))
+	def generator():
+		prefetch = frappe.flags.item_details_prefetch
+		if prefetch and item_code in prefetch.product_bundles:
+			return prefetch.product_bundles[item_code]
+
+		return frappe.db.get_value("Product Bundle", {"new_item_code": item_code})
+
+	return frappe.local_cache("item_has_product_bundle", item_code, generator)
 
 
 def item_is_product_bundle_with_stock_item(item_code):
@@ -1611,7 +1935,7 @@ def get_applies_to_details(args, for_validate=False):
 	item = frappe._dict()
 	item_code = out.applies_to_item or args.applies_to_item
 	if item_code:
-		item = frappe.get_cached_doc("Item", item_code)
+		item = get_item_doc(item_code)
 
 	if item:
 		out.applies_to_item_name = item.item_name
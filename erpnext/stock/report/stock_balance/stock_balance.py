@@ -63,11 +63,11 @@ class StockBalanceReport:
 
 		self.get_items()
 		if not self.items and self.items is not None:
-			return self.columns, []
+			return self.columns, [], None
 
 		self.get_stock_ledger_entries()
 		if not self.sles:
-			return self.columns, []
+			return self.columns, [], self.get_repost_pending_message()
 
 		self.get_item_details_map()
 		self.get_item_reorder_map()
@@ -82,7 +82,15 @@ class StockBalanceReport:
 
 		update_included_uom_in_dict_report(self.columns, self.rows, self.filters.get("include_uom"), self.conversion_factors)
 
-		return self.columns, self.rows
+		return self.columns, self.rows, self.get_repost_pending_message()
+
+	def get_repost_pending_message(self):
+		from erpnext.stock.doctype.stock_repost_job.stock_repost_job import get_bins_with_pending_repost
+
+		pending_bins = get_bins_with_pending_repost(item_codes=self.items)
+		if pending_bins:
+			return _("Stock reposting is pending for {0} Item-Warehouse combination(s). Stock values may change once it is complete.").format(
+				len(pending_bins))
 
 	def validate_filters(self):
 		if self.filters.get("show_projected_qty"):
@@ -96,7 +104,16 @@ class StockBalanceReport:
 		return self.items
 
 	def get_stock_ledger_entries(self):
-		self.sles = get_stock_ledger_entries_for_stock_report(self.filters, self.items)
+		from erpnext.stock.doctype.stock_ledger_snapshot.stock_ledger_snapshot import get_stock_ledger_entries_from_snapshot
+
+		self.sles = None
+		if not self.include_stock_ageing_data():
+			# start from the month end snapshot before from_date instead of the first entry
+			self.sles = get_stock_ledger_entries_from_snapshot(self.filters, self.items)
+
+		if self.sles is None:
+			self.sles = get_stock_ledger_entries_for_stock_report(self.filters, self.items)
+
 		return self.sles
 
 	def get_purchase_order_map(self):
@@ -2,16 +2,27 @@
 # License: GNU General Public License v3. See license.txt
 
 import frappe
-from frappe.utils import flt, cstr, nowdate, nowtime
+from frappe.utils import flt, cint, cstr, nowdate, nowtime
 from erpnext.stock.utils import update_bin
 from erpnext.stock.stock_ledger import update_entries_after
 from erpnext.controllers.stock_controller import update_gl_entries_after
+from erpnext.accounts.general_ledger import delete_voucher_gl_entries
+from erpnext.utilities.worker_pool import get_site_worker_pool
+from erpnext.stock.doctype.stock_ledger_snapshot.stock_ledger_snapshot import (is_stock_ledger_snapshot_enabled,
+	delete_stock_ledger_snapshots, recreate_stock_ledger_snapshots)
 
 
-def repost(only_actual=False, allow_negative_stock=False, allow_zero_rate=False, only_bin=False, posting_date=None, posting_time=None):
+def repost(only_actual=False, allow_negative_stock=False, allow_zero_rate=False, only_bin=False, posting_date=None, posting_time=None,
+		workers=None):
 	"""
 	Repost everything!
+
+	Pass workers > 1 to repost independent bins in parallel, see repost_in_parallel
 	"""
+	if cint(workers) > 1:
+		return repost_in_parallel(workers, only_actual=only_actual, allow_negative_stock=allow_negative_stock,
+			allow_zero_rate=allow_zero_rate, only_bin=only_bin, posting_date=posting_date, posting_time=posting_time)
+
 	frappe.db.auto_commit_on_many_writes = 1
 
 	if allow_negative_stock:
@@ -42,6 +53,178 @@ def repost(only_actual=False, allow_negative_stock=False, allow_zero_rate=False,
 	frappe.db.auto_commit_on_many_writes = 0
 
 
+def repost_in_parallel(workers=4, only_actual=False, allow_negative_stock=False, allow_zero_rate=False, only_bin=False,
+		posting_date=None, posting_time=None, checkpoint_file="repost_stock_checkpoint.json"):
+	"""
+	Repost everything using a pool of worker processes.
+
+	Bins are split into partitions of bins linked through Stock Ledger Entry Dependency,
+	so that no two workers repost the same dependency chain. Each partition is committed once
+	or rolled back as a whole. Partitions completed without errors are saved to checkpoint_file
+	with the options of the run, and skipped if the command is run again with the same options after a failure.
+	With workers <= 1, partitions are reposted in the current process.
+	"""
+	import os
+	import json
+	import datetime
+
+	if allow_negative_stock:
+		existing_allow_negative_stock = frappe.db.get_value("Stock Settings", None, "allow_negative_stock")
+		frappe.db.set_value("Stock Settings", None, "allow_negative_stock", 1)
+		frappe.db.commit()
+
+	partitions = get_repost_partitions()
+
+	options = frappe._dict({
+		"only_actual": only_actual,
+		"allow_negative_stock": allow_negative_stock,
+		"allow_zero_rate": allow_zero_rate,
+		"only_bin": only_bin,
+		"posting_date": posting_date,
+		"posting_time": posting_time,
+	})
+	checkpoint_options = json.loads(frappe.as_json(options))
+
+	completed = set()
+	if os.path.isfile(checkpoint_file):
+		with open(checkpoint_file, "r") as f:
+			checkpoint = json.loads(f.read())
+
+		if isinstance(checkpoint, dict) and checkpoint.get("options") == checkpoint_options:
+			print("Checkpoint found")
+			completed = set(checkpoint.get("completed") or [])
+		else:
+			print("Ignoring checkpoint of a run with different options")
+
+	pending = [p for p in partitions if p.key not in completed]
+	total_bins = sum(len(p.bins) for p in partitions)
+	done_bins = total_bins - sum(len(p.bins) for p in pending)
+	failed_bins = []
+
+	print("Reposting {0} bins in {1} partitions with {2} workers".format(total_bins, len(pending), workers))
+	start_time = datetime.datetime.now()
+	start_bins = done_bins
+
+	pool = get_site_worker_pool(workers) if cint(workers) > 1 else None
+
+	try:
+		args = [(p.key, p.bins, options) for p in pending]
+		results = pool.imap_unordered(repost_partition, args) if pool else (repost_partition(d) for d in args)
+		for key, bins, errors in results:
+			# partitions with failed bins are reposted again when resuming
+			if not errors:
+				completed.add(key)
+				with open(checkpoint_file, "w") as f:
+					f.write(json.dumps({"options": checkpoint_options, "completed": list(completed)}))
+
+			done_bins += len(bins)
+			failed_bins += errors
+
+			elapsed = (datetime.datetime.now() - start_time).total_seconds()
+			repost_rate = flt(done_bins - start_bins) / elapsed if elapsed else 0
+			eta = datetime.timedelta(seconds=int((total_bins - done_bins) / repost_rate)) if repost_rate else "N/A"
+			print("{0}/{1} bins | Elapsed Time: {2} | Rate: {3:.2f} Bins/Sec | ETA: {4} | Errors: {5}".format(
+				done_bins, total_bins, elapsed, repost_rate, eta, len(failed_bins)))
+	finally:
+		if pool:
+			pool.close()
+			pool.join()
+
+		if allow_negative_stock:
+			frappe.db.set_value("Stock Settings", None, "allow_negative_stock", existing_allow_negative_stock)
+			frappe.db.commit()
+
+	for d in failed_bins:
+		print("ERROR on {0}".format(d))
+
+	if not failed_bins and os.path.isfile(checkpoint_file):
+		print("Deleting Checkpoint")
+		os.remove(checkpoint_file)
+
+	return failed_bins
+
+
+def get_repost_partitions():
+	"""
+		Returns list of partitions {"key", "bins"} where bins linked through
+		Stock Ledger Entry Dependency are always in the same partition.
+		Partitions are sorted by number of Stock Ledger Entries, largest first.
+	"""
+	item_warehouses = frappe.db.sql("""
+		select distinct item_code, warehouse
+		from
+			(select item_code, warehouse from tabBin
+			union
+			select item_code, warehouse from `tabStock Ledger Entry`) a
+	""")
+
+	linked_bins = frappe.db.sql("""
+		select distinct src.item_code, src.warehouse, sle.item_code, sle.warehouse
+		from `tabStock Ledger Entry Dependency` dep
+		inner join `tabStock Ledger Entry` sle on sle.name = dep.parent
+		inner join `tabStock Ledger Entry` src
+			on (src.voucher_type, src.voucher_no, src.voucher_detail_no)
+				= (dep.dependent_voucher_type, dep.dependent_voucher_no, dep.dependent_voucher_detail_no)
+		where (src.item_code, src.warehouse) != (sle.item_code, sle.warehouse)
+	""")
+
+	sle_counts = dict(((d[0], d[1]), d[2]) for d in frappe.db.sql("""
+		select item_code, warehouse, count(*)
+		from `tabStock Ledger Entry`
+		group by item_code, warehouse
+	"""))
+
+	# union-find over bins
+	parent = dict(((d[0], d[1]), (d[0], d[1])) for d in item_warehouses)
+
+	def find(bin_key):
+		root = parent.setdefault(bin_key, bin_key)
+		while root != parent[root]:
+			root = parent[root]
+		while bin_key != root:
+			parent[bin_key], bin_key = root, parent[bin_key]
+		return root
+
+	for src_item, src_warehouse, item_code, warehouse in linked_bins:
+		src_root, root = find((src_item, src_warehouse)), find((item_code, warehouse))
+		if src_root != root:
+			parent[max(src_root, root)] = min(src_root, root)
+
+	partitions = {}
+	for bin_key in list(parent):
+		partitions.setdefault(find(bin_key), []).append(bin_key)
+
+	out = []
+	for root, bins in partitions.items():
+		out.append(frappe._dict({
+			"key": "{0}::{1}".format(*root),
+			"bins": sorted(bins),
+			"sle_count": sum(sle_counts.get(b, 0) for b in bins)
+		}))
+
+	return sorted(out, key=lambda p: (-p.sle_count, p.key))
+
+
+def repost_partition(args):
+	"""
+		Repost all bins of a partition in one worker process, returns (key, bins, failed bins).
+		The partition is committed once, so a failed partition is left as it was and reposted again when resuming.
+	"""
+	key, bins, options = args
+
+	for item_code, warehouse in bins:
+		try:
+			frappe.flags.stock_ledger_vouchers_reposted = None
+			repost_stock(item_code, warehouse, options.allow_zero_rate, options.only_actual, options.only_bin,
+				options.allow_negative_stock, posting_date=options.posting_date, posting_time=options.posting_time)
+		except Exception:
+			frappe.db.rollback()
+			return key, bins, [(item_code, warehouse)]
+
+	frappe.db.commit()
+	return key, bins, []
+
+
 def repost_stock(item_code, warehouse, allow_zero_rate=False,
 	only_actual=False, only_bin=False, allow_negative_stock=False, posting_date=None, posting_time=None):
 
@@ -298,8 +481,7 @@ def repost_stock_mismatch_gle(company=None, from_date=None, to_date=None, auto_c
 	for i, d in enumerate(mismatch_data):
 		print("{0}/{1}: {2} | {3}".format(i + 1, count, d.voucher_type, d.voucher_no))
 		doc = frappe.get_doc(d.voucher_type, d.voucher_no)
-		frappe.db.sql("""delete from `tabGL Entry` where voucher_type=%s and voucher_no=%s""",
-			(d.voucher_type, d.voucher_no))
+		delete_voucher_gl_entries(d.voucher_type, d.voucher_no)
 		doc.make_gl_entries(repost_future_gle=False, from_repost=True)
 
 		doc.clear_cache()
@@ -357,7 +539,7 @@ def repost_all_stock_vouchers():
 
 		print("Deleting GLEs")
 		for voucher_type, voucher_no in vouchers:
-			frappe.db.sql("""delete from `tabGL Entry` where voucher_type=%s and voucher_no=%s""", (voucher_type, voucher_no))
+			delete_voucher_gl_entries(voucher_type, voucher_no)
 		print()
 
 		frappe.db.commit()
@@ -366,6 +548,11 @@ def repost_all_stock_vouchers():
 		with open(filename, "r") as f:
 			vouchers = json.loads(f.read())
 
+	# snapshots are sums of the deleted entries (or may have been created from part of the vouchers before a checkpoint),
+	# they are created again after all vouchers are reposted
+	delete_stock_ledger_snapshots()
+	frappe.db.commit()
+
 	start_time = datetime.datetime.now()
 	print("Starting at: {0}".format(start_time))
 
@@ -399,6 +586,10 @@ def repost_all_stock_vouchers():
 			frappe.db.rollback()
 			raise
 
+	if is_stock_ledger_snapshot_enabled():
+		print("Creating Stock Ledger Snapshots")
+		recreate_stock_ledger_snapshots()
+
 	print("Disabling Allow Negative Stock")
 	frappe.db.set_value("Stock Settings", None, "allow_negative_stock", 0)
 	frappe.db.commit()
@@ -3,8 +3,10 @@
 import frappe
 import erpnext
 from frappe import _
-from frappe.utils import cint, flt, now, cstr
+from frappe.utils import cint, flt, now, now_datetime, cstr, getdate, get_time, get_datetime
 from erpnext.stock.utils import get_valuation_method
+from erpnext.stock.doctype.stock_ledger_snapshot.stock_ledger_snapshot import (is_stock_ledger_snapshot_enabled,
+	add_stock_ledger_snapshot_change, update_stock_ledger_snapshots, remove_voucher_from_stock_ledger_snapshots)
 import json
 import datetime
 
@@ -15,6 +17,19 @@ class NegativeStockError(frappe.ValidationError):
 
 _exceptions = frappe.local('stockledger_exceptions')
 
+# fields written back to Stock Ledger Entry by update_entries_after.process_sle
+sle_repost_update_fields = (
+	"actual_qty", "incoming_rate", "outgoing_rate",
+	"qty_after_transaction", "valuation_rate", "stock_value", "stock_queue", "stock_value_difference",
+	"batch_qty_after_transaction", "batch_valuation_rate", "batch_stock_value",
+	"packed_qty_after_transaction", "is_processed",
+)
+
+sle_repost_update_chunk_size = 500
+
+# stock queues with at most this many buckets are always saved in full
+stock_queue_min_delta_length = 4
+
 
 def make_sl_entries(sl_entries, is_amended=None, allow_negative_stock=False, via_landed_cost_voucher=False):
 	if sl_entries:
@@ -22,9 +37,13 @@ def make_sl_entries(sl_entries, is_amended=None, allow_negative_stock=False, via
 
 		cancel = True if sl_entries[0].get("is_cancelled") == "Yes" else False
 		if cancel:
+			remove_voucher_from_stock_ledger_snapshots(sl_entries[0].get('voucher_type'), sl_entries[0].get('voucher_no'))
 			set_as_cancel(sl_entries[0].get('voucher_no'), sl_entries[0].get('voucher_type'))
 
+		bulk_insert_entries = cint(frappe.db.get_single_value("Stock Settings", "bulk_insert_stock_ledger_entries"))
 		bins_to_update = []
+		sle_docs = []
+		bulk_creation = now_datetime()
 
 		for sle in sl_entries:
 			sle_id = None
@@ -35,7 +54,13 @@ def make_sl_entries(sl_entries, is_amended=None, allow_negative_stock=False, via
 			sle_allow_negative_stock = cint(sle.get('allow_negative_stock'))
 
 			if sle.get("actual_qty") or sle.get("voucher_type") == "Stock Reconciliation":
-				sle_doc = make_entry(sle, sle_allow_negative_stock or allow_negative_stock, via_landed_cost_voucher)
+				if bulk_insert_entries:
+					# entries of a voucher keep their order when sorted by posting date, time and creation
+					sle_doc = get_entry_for_bulk_insert(sle, sle_allow_negative_stock or allow_negative_stock,
+						via_landed_cost_voucher, creation=bulk_creation + datetime.timedelta(microseconds=len(sle_docs)))
+					sle_docs.append(sle_doc)
+				else:
+					sle_doc = make_entry(sle, sle_allow_negative_stock or allow_negative_stock, via_landed_cost_voucher)
 				sle_id = sle_doc.get('name')
 				creation = sle_doc.get('creation')
 
@@ -48,8 +73,21 @@ def make_sl_entries(sl_entries, is_amended=None, allow_negative_stock=False, via
 			})
 			bins_to_update.append(args)
 
-		for args in bins_to_update:
-			update_bin(args, args.get('allow_negative_stock') or allow_negative_stock, via_landed_cost_voucher)
+		if bulk_insert_entries:
+			from erpnext.stock.utils import update_bin_for_entries
+
+			insert_entries_in_bulk(sle_docs)
+
+			# one repost per item and warehouse from its first entry in the voucher
+			bin_entries = {}
+			for args in bins_to_update:
+				bin_entries.setdefault((args.get("item_code"), args.get("warehouse")), []).append(args)
+
+			for args_list in bin_entries.values():
+				update_bin_for_entries(args_list, allow_negative_stock, via_landed_cost_voucher)
+		else:
+			for args in bins_to_update:
+				update_bin(args, args.get('allow_negative_stock') or allow_negative_stock, via_landed_cost_voucher)
 
 		if cancel:
 			delete_cancelled_entry(sl_entries[0].get('voucher_type'), sl_entries[0].get('voucher_no'))
@@ -74,6 +112,49 @@ def make_entry(args, allow_negative_stock=False, via_landed_cost_voucher=False):
 	return sle
 
 
+def get_entry_for_bulk_insert(args, allow_negative_stock=False, via_landed_cost_voucher=False, creation=None):
+	"""Returns a named Stock Ledger Entry that is inserted later by insert_entries_in_bulk"""
+	args.update({"doctype": "Stock Ledger Entry"})
+	sle = frappe.get_doc(args)
+	sle.flags.ignore_permissions = 1
+	sle.allow_negative_stock = allow_negative_stock
+	sle.via_landed_cost_voucher = via_landed_cost_voucher
+	sle.docstatus = 1
+	sle.set_new_name()
+	sle.creation = sle.modified = creation or now_datetime()
+	return sle
+
+
+def insert_entries_in_bulk(sles):
+	"""
+		Validate Stock Ledger Entries of a voucher together and insert them
+		and their child rows with multi-row INSERT statements
+	"""
+	from erpnext.stock.doctype.stock_ledger_entry.stock_ledger_entry import validate_stock_ledger_entries
+	from erpnext.utilities.bulk_insert import bulk_insert
+
+	if not sles:
+		return
+
+	validate_stock_ledger_entries(sles)
+
+	meta = frappe.get_meta("Stock Ledger Entry")
+	bulk_insert("Stock Ledger Entry", [d.get_valid_dict() for d in sles], meta.get_valid_columns())
+
+	for df in meta.get_table_fields():
+		child_rows = []
+		for sle in sles:
+			for i, d in enumerate(sle.get(df.fieldname) or []):
+				d.update({"parent": sle.name, "parenttype": sle.doctype, "parentfield": df.fieldname, "idx": i + 1,
+					"docstatus": 1, "creation": sle.creation, "modified": sle.modified})
+				child_rows.append(d.get_valid_dict())
+
+		bulk_insert(df.options, child_rows, frappe.get_meta(df.options).get_valid_columns())
+
+	for sle in sles:
+		sle.on_submit()
+
+
 def delete_cancelled_entry(voucher_type, voucher_no):
 	meta = frappe.get_meta("Stock Ledger Entry")
 	table_fields = meta.get_table_fields()
@@ -115,7 +196,8 @@ class update_entries_after(object):
 				"posting_time": "12:00"
 			}
 	"""
-	def __init__(self, args, allow_zero_rate=False, allow_negative_stock=None, via_landed_cost_voucher=False, verbose=1):
+	def __init__(self, args, allow_zero_rate=False, allow_negative_stock=None, via_landed_cost_voucher=False, verbose=1,
+			bulk_update=None, repost_dependent_entries=True, defer_future_entries=False):
 		from frappe.model.meta import get_field_precision
 
 		self.exceptions = []
@@ -126,12 +208,36 @@ class update_entries_after(object):
 		if not self.allow_negative_stock:
 			self.allow_negative_stock = get_allow_negative_stock()
 
+		# bulk update mode: keep processed SLEs in memory and write them in chunks
+		if bulk_update is None:
+			bulk_update = frappe.db.get_single_value("Stock Settings", "bulk_repost_stock_ledger")
+		self.bulk_update = cint(bulk_update)
+		self.pending_sle_updates = []
+		self.pending_serial_no_updates = {}
+
+		self.repost_dependent_entries = repost_dependent_entries
+
+		# deferred mode: only process entries up to the current voucher and queue a job for the rest
+		self.defer_future_entries = cint(defer_future_entries)
+
+		# bins and SLEs reposted, including dependent reposts, and the plan of dependent reposts if planned
+		self.stats = get_new_repost_stats()
+		self.repost_plan = []
+
+		# changes in qty and value per month end snapshot key, applied after processing
+		self.update_snapshots = is_stock_ledger_snapshot_enabled()
+		self.snapshot_changes = {}
+
 		self.args = args
 		for key, value in args.items():
 			setattr(self, key, value)
 
+		# entries of the voucher that allow negative stock, when the rest of the repost does not
+		self.allow_negative_stock_sles = set(args.get("allow_negative_stock_sles") or [])
+
 		self.previous_sle = self.get_sle_before_datetime()
 		self.previous_sle = self.previous_sle[0] if self.previous_sle else frappe._dict()
+		self.previous_sle, self.stock_queue = self.get_previous_sle_with_stock_queue(self.previous_sle)
 
 		self.previous_packing_slip_sle_dict = {}
 		self.previous_batch_sle_dict = {}
@@ -147,9 +253,11 @@ class update_entries_after(object):
 			frappe.flags.stock_ledger_vouchers_reposted = []
 			frappe.flags.stock_ledger_vouchers_visited = set()
 			frappe.flags.stock_ledger_vouchers_value_changed = set()
+			frappe.flags.stock_ledger_voucher_value_deltas = {}
 
 		self.prev_stock_value = self.previous_sle.stock_value or 0.0
-		self.stock_queue = json.loads(self.previous_sle.stock_queue or "[]")
+		self.stock_queue_snapshot_interval = cint(frappe.db.get_single_value("Stock Settings", "stock_queue_snapshot_interval"))
+		self.stock_queue_distance = get_stock_queue_snapshot_distance(self.previous_sle)
 		self.valuation_method, self.batch_wise_valuation = get_valuation_method(self.item_code)
 		self.stock_value_difference = 0.0
 		self.build()
@@ -157,30 +265,108 @@ class update_entries_after(object):
 	def build(self):
 		# includes current entry!
 		entries_to_fix = self.get_sle_after_datetime()
+
+		deferred_entries = []
+		if self.defer_future_entries:
+			entries_to_fix, deferred_entries = self.split_deferred_entries(entries_to_fix)
+
 		self.sle_dependency_map = self.get_sle_dependency_map(entries_to_fix)
+		self.dependency_sle_index = self.get_dependency_sle_index()
+		self.prefetch_previous_batch_and_packing_slip_sles(entries_to_fix)
 		dependent_entries = self.get_dependent_entries_to_fix(entries_to_fix)
 
 		for sle in entries_to_fix:
 			self.process_sle(sle)
 
+		self.flush_sle_updates()
+		self.flush_serial_no_updates()
+
 		if self.exceptions:
 			self.raise_exceptions()
 
-		self.update_bin()
+		if self.snapshot_changes:
+			update_stock_ledger_snapshots(self.snapshot_changes)
 
-		for d in dependent_entries:
-			update_entries_after({
-				"item_code": d.item_code,
-				"warehouse": d.warehouse,
-				"batch_no": d.batch_no,
-				"posting_date": d.posting_date,
-				"posting_time": d.posting_time,
-				"creation": d.creation,
-				"sle_id": d.name,
-				"voucher_no": d.voucher_no
-			}, allow_negative_stock=self.allow_negative_stock, via_landed_cost_voucher=self.via_landed_cost_voucher)
-
-	def update_bin(self):
+		if deferred_entries:
+			from erpnext.stock.doctype.stock_repost_job.stock_repost_job import enqueue_stock_repost
+			enqueue_stock_repost(deferred_entries[0])
+			self.update_bin_for_deferred_entries(deferred_entries)
+		else:
+			self.update_bin()
+
+		self.stats.bins_reposted += 1
+		self.stats.sles_reposted += len(entries_to_fix)
+		self.stats.distinct_bins.add((self.item_code, self.warehouse))
+
+		if not self.repost_dependent_entries or not dependent_entries:
+			return
+
+		if cint(frappe.db.get_single_value("Stock Settings", "plan_dependent_stock_reposts")):
+			planner = StockRepostPlanner(dependent_entries, allow_negative_stock=self.allow_negative_stock,
+				via_landed_cost_voucher=self.via_landed_cost_voucher, bulk_update=self.bulk_update,
+				defer_future_entries=self.defer_future_entries)
+			self.repost_plan = planner.get_plan()
+			merge_repost_stats(self.stats, planner.run())
+		else:
+			for d in dependent_entries:
+				dependent_repost = update_entries_after(get_repost_args_from_sle(d),
+					allow_negative_stock=self.allow_negative_stock, via_landed_cost_voucher=self.via_landed_cost_voucher,
+					bulk_update=self.bulk_update, defer_future_entries=self.defer_future_entries)
+				merge_repost_stats(self.stats, dependent_repost.stats)
+
+	def split_deferred_entries(self, sles):
+		"""
+			Returns (entries to process now, entries to defer).
+			Entries up to and including the current voucher are processed now,
+			deferral starts from the first already processed entry of another voucher.
+		"""
+		for i, sle in enumerate(sles):
+			if sle.is_processed and sle.voucher_no != self.args.get("voucher_no"):
+				if not self.can_defer_entries(sles[:i], sles[i:]):
+					break
+
+				# stock queue deltas are saved against the previous entry, so defer from an entry with the complete queue
+				while i < len(sles) and is_stock_queue_delta(sles[i]):
+					i += 1
+
+				return sles[:i], sles[i:]
+
+		return sles, []
+
+	def can_defer_entries(self, sles, deferred_entries):
+		"""
+			Later entries are deferred only if their qty after transaction is shifted by the qty of the
+			entries processed now, so that the Bin qty is known without reposting them.
+			Unless negative stock is allowed, the entries processed now must only add stock, so that
+			later entries that were not negative before can not become negative.
+		"""
+		if not sles:
+			return False
+
+		if any(d.voucher_type == "Stock Reconciliation" for d in sles + deferred_entries):
+			return False
+
+		if not cint(self.allow_negative_stock) and any(flt(d.actual_qty) < 0 for d in sles):
+			return False
+
+		return True
+
+	def update_bin_for_deferred_entries(self, deferred_entries):
+		"""
+			Shift the values of the last deferred entry by the changes of the entries processed now.
+			Qty is exact, valuation is corrected when the Stock Repost Job reposts the deferred entries.
+		"""
+		first_entry, last_entry = deferred_entries[0], deferred_entries[-1]
+		qty_change = self.qty_after_transaction - (flt(first_entry.qty_after_transaction) - flt(first_entry.actual_qty))
+		value_change = self.stock_value - (flt(first_entry.stock_value) - flt(first_entry.stock_value_difference))
+
+		qty_after_transaction = flt(last_entry.qty_after_transaction) + qty_change
+		stock_value = flt(flt(last_entry.stock_value) + value_change, self.value_precision)
+		valuation_rate = stock_value / qty_after_transaction if qty_after_transaction else flt(last_entry.valuation_rate)
+
+		self.update_bin(qty_after_transaction, valuation_rate, stock_value)
+
+	def update_bin(self, qty_after_transaction=None, valuation_rate=None, stock_value=None):
 		# update bin
 		bin_name = frappe.db.get_value("Bin", {
 			"item_code": self.item_code,
@@ -198,9 +384,9 @@ class update_entries_after(object):
 			bin_doc = frappe.get_doc("Bin", bin_name)
 
 		bin_doc.update({
-			"valuation_rate": self.valuation_rate,
-			"actual_qty": self.qty_after_transaction,
-			"stock_value": self.stock_value
+			"valuation_rate": self.valuation_rate if valuation_rate is None else valuation_rate,
+			"actual_qty": self.qty_after_transaction if qty_after_transaction is None else qty_after_transaction,
+			"stock_value": self.stock_value if stock_value is None else stock_value
 		})
 		bin_doc.flags.via_stock_ledger_entry = True
 
@@ -214,6 +400,11 @@ class update_entries_after(object):
 			self.get_previous_batch_sle(sle)
 
 		self.get_dependent_values(sle)
+		self.reset_stock_queue_change()
+
+		# contribution of this entry already included in month end snapshots
+		previous_qty, previous_value = (flt(sle.actual_qty), flt(sle.stock_value_difference)) \
+			if sle.is_processed else (0, 0)
 
 		# process values
 		serial_nos = get_serial_nos(sle.serial_no)
@@ -248,11 +439,12 @@ class update_entries_after(object):
 			self.batch_data.prev_batch_stock_value = self.batch_data.batch_stock_value
 
 		stock_value_difference_changed = flt(stock_value_difference, 9) != sle.stock_value_difference
+		stock_value_difference_delta = flt(stock_value_difference, 9) - flt(sle.stock_value_difference)
 
 		sle.qty_after_transaction = self.qty_after_transaction
 		sle.valuation_rate = self.valuation_rate
 		sle.stock_value = self.stock_value
-		sle.stock_queue = json.dumps(self.stock_queue)
+		sle.stock_queue = self.get_stock_queue_to_save()
 		sle.stock_value_difference = stock_value_difference
 
 		# Batch Values
@@ -271,7 +463,7 @@ class update_entries_after(object):
 		sle.packed_qty_after_transaction = self.packing_slip_data.packed_qty_after_transaction
 
 		# validate negative stock
-		if not cint(self.allow_negative_stock):
+		if not cint(self.allow_negative_stock) and sle.name not in self.allow_negative_stock_sles:
 			if self.batch_wise_valuation and not self.validate_negative_stock(sle, validate_batch=True):
 				return
 			if not self.validate_negative_stock(sle):
@@ -279,16 +471,57 @@ class update_entries_after(object):
 			if not self.validate_negative_stock(sle, validate_batch=self.batch_wise_valuation, validate_packing_slip=True):
 				return
 
+		if self.update_snapshots:
+			add_stock_ledger_snapshot_change(self.snapshot_changes, sle,
+				flt(sle.actual_qty) - previous_qty, flt(sle.stock_value_difference) - previous_value)
+
 		# update SLE and Serial Nos
 		sle.doctype = "Stock Ledger Entry"
 		sle.is_processed = 1
-		frappe.get_doc(sle).db_update()
+		if self.bulk_update:
+			self.queue_sle_update(sle, serial_nos)
+		else:
+			frappe.get_doc(sle).db_update()
+
+			for serial_no in serial_nos:
+				sr_doc = frappe.get_doc("Serial No", serial_no)
+				update_args_for_serial_no(sr_doc, serial_no, sle)
+
+		self.update_dependency_sle_index(sle)
+		self.add_sle_to_reposted_flags(sle, stock_value_difference_changed, stock_value_difference_delta)
 
+	def queue_sle_update(self, sle, serial_nos):
+		self.pending_sle_updates.append(sle)
+		if len(self.pending_sle_updates) >= sle_repost_update_chunk_size:
+			self.flush_sle_updates()
+
+		# only the last SLE of a Serial No in the repost window determines its final state
 		for serial_no in serial_nos:
+			serial_no_update = self.pending_serial_no_updates.setdefault(serial_no, frappe._dict())
+			serial_no_update.sle = sle
+			if sle.voucher_type == "Stock Entry" and cint(sle.actual_qty) < 0:
+				serial_no_update.clear_sales_order = True
+
+	def flush_sle_updates(self):
+		"""
+			write pending SLE values to the database
+			must be called before any query that reads SLEs of the current repost window
+		"""
+		if self.pending_sle_updates:
+			bulk_update_stock_ledger_entries(self.pending_sle_updates)
+			self.pending_sle_updates = []
+
+	def flush_serial_no_updates(self):
+		from erpnext.stock.doctype.serial_no.serial_no import update_args_for_serial_no
+
+		for serial_no, serial_no_update in self.pending_serial_no_updates.items():
 			sr_doc = frappe.get_doc("Serial No", serial_no)
-			update_args_for_serial_no(sr_doc, serial_no, sle)
+			if serial_no_update.clear_sales_order:
+				sr_doc.sales_order = None
 
-		self.add_sle_to_reposted_flags(sle, stock_value_difference_changed)
+			update_args_for_serial_no(sr_doc, serial_no, serial_no_update.sle)
+
+		self.pending_serial_no_updates = {}
 
 	def validate_negative_stock(self, sle, validate_batch=False, validate_packing_slip=False):
 		"""
@@ -344,6 +577,7 @@ class update_entries_after(object):
 		if not self.valuation_rate and sle.voucher_detail_no:
 			allow_zero_rate = self.check_if_allow_zero_valuation_rate(sle.voucher_type, sle.voucher_detail_no)
 			if not allow_zero_rate:
+				self.flush_sle_updates()
 				self.valuation_rate = get_valuation_rate(sle.item_code, sle.warehouse,
 					sle.voucher_type, sle.voucher_no, sle.batch_no, self.allow_zero_rate,
 					currency=erpnext.get_company_currency(sle.company), company=sle.company, batch_wise_valuation=0)
@@ -352,6 +586,7 @@ class update_entries_after(object):
 		self.stock_value = flt(self.qty_after_transaction) * flt(self.valuation_rate)
 
 	def get_incoming_value_for_serial_nos(self, sle, serial_nos):
+		self.flush_sle_updates()
 		previous_sle_map = get_previous_serial_no_sles(sle, incoming_only=True)
 
 		incoming_values = 0
@@ -414,6 +649,7 @@ class update_entries_after(object):
 			if not new_valuation_rate and sle.voucher_detail_no:
 				allow_zero_valuation_rate = self.check_if_allow_zero_valuation_rate(sle.voucher_type, sle.voucher_detail_no)
 				if not allow_zero_valuation_rate:
+					self.flush_sle_updates()
 					new_valuation_rate = get_valuation_rate(sle.item_code, sle.warehouse,
 						sle.voucher_type, sle.voucher_no, sle.batch_no, self.allow_zero_rate,
 						currency=erpnext.get_company_currency(sle.company), batch_wise_valuation=self.batch_wise_valuation)
@@ -442,24 +678,30 @@ class update_entries_after(object):
 		if actual_qty > 0:
 			if not self.stock_queue:
 				self.stock_queue.append([0, 0])
+				self.stock_queue_change.full = True
 
 			# last row has the same rate, just updated the qty
 			if self.stock_queue[-1][1]==incoming_rate:
 				self.stock_queue[-1][0] += actual_qty
 				self.stock_queue[-1][0] = flt(self.stock_queue[-1][0], 9)
+				self.stock_queue_change.tail_modified = True
 			else:
 				if self.stock_queue[-1][0] > 0:
 					self.stock_queue.append([actual_qty, incoming_rate])
+					self.stock_queue_change.appended += 1
 				else:
 					qty = flt(self.stock_queue[-1][0] + actual_qty, 9)
 					self.stock_queue[-1] = [qty, incoming_rate]
+					self.stock_queue_change.tail_modified = True
 		else:
 			qty_to_pop = abs(actual_qty)
 			while qty_to_pop:
 				if not self.stock_queue:
+					self.stock_queue_change.full = True
 					# Get valuation rate from last sle if exists or from valuation rate field in item master
 					allow_zero_valuation_rate = self.check_if_allow_zero_valuation_rate(sle.voucher_type, sle.voucher_detail_no)
 					if not allow_zero_valuation_rate:
+						self.flush_sle_updates()
 						_rate = get_valuation_rate(sle.item_code, sle.warehouse,
 							sle.voucher_type, sle.voucher_no, sle.batch_no, self.allow_zero_rate,
 							currency=erpnext.get_company_currency(sle.company), company=sle.company)
@@ -476,8 +718,12 @@ class update_entries_after(object):
 							index = i
 							break
 
+					if index:
+						self.stock_queue_change.full = True
+
 					# If no entry found with outgoing rate, collapse stack
 					if index == None:
+						self.stock_queue_change.full = True
 						new_stock_value = sum((d[0]*d[1] for d in self.stock_queue)) - qty_to_pop*outgoing_rate
 						new_stock_qty = flt(sum((d[0] for d in self.stock_queue)) - qty_to_pop, 9)
 						self.stock_queue = [[new_stock_qty, flt(new_stock_value/new_stock_qty, 9) if new_stock_qty > 0 else outgoing_rate]]
@@ -491,10 +737,12 @@ class update_entries_after(object):
 					# consume current batch
 					qty_to_pop = flt(qty_to_pop - batch[0], 9)
 					self.stock_queue.pop(index)
+					self.stock_queue_change.head_removed += 1
 					if not self.stock_queue and qty_to_pop:
 						# stock finished, qty still remains to be withdrawn
 						# negative stock, keep in as a negative batch
 						self.stock_queue.append([-qty_to_pop, outgoing_rate or batch[1]])
+						self.stock_queue_change.full = True
 						break
 
 				else:
@@ -502,6 +750,7 @@ class update_entries_after(object):
 					# consume it and exit
 					batch[0] = flt(batch[0] - qty_to_pop, 9)
 					qty_to_pop = 0
+					self.stock_queue_change.head_modified = True
 
 		stock_value = sum((flt(batch[0]) * flt(batch[1]) for batch in self.stock_queue))
 		stock_qty = flt(sum((flt(batch[0]) for batch in self.stock_queue)), 9)
@@ -511,10 +760,58 @@ class update_entries_after(object):
 
 		if not self.stock_queue:
 			self.stock_queue.append([0, flt(sle.incoming_rate or sle.outgoing_rate or self.valuation_rate, 9)])
+			self.stock_queue_change.full = True
 
 		self.qty_after_transaction += flt(sle.actual_qty)
 		self.stock_value = sum((flt(batch[0]) * flt(batch[1]) for batch in self.stock_queue))
 
+	def reset_stock_queue_change(self):
+		# changes made to the stock queue by the current SLE, used to save it as a delta of the previous queue
+		self.stock_queue_change = frappe._dict({
+			"previous_length": len(self.stock_queue),
+			"head_removed": 0,
+			"head_modified": False,
+			"tail_modified": False,
+			"appended": 0,
+			"full": False,
+		})
+
+	def get_stock_queue_to_save(self):
+		"""
+			Returns the serialized stock queue for the current SLE.
+
+			If Stock Queue Snapshot Interval is set, only every nth SLE stores the complete queue,
+			SLEs in between store the changes made to the queue of the previous SLE (see apply_stock_queue_delta).
+		"""
+		change = self.stock_queue_change
+		queue_length = len(self.stock_queue)
+
+		head_removed = change.head_removed + cint(change.head_modified)
+		tail_removed = cint(change.tail_modified)
+		head = self.stock_queue[:1] if change.head_modified else []
+		tail_length = change.appended + tail_removed
+		tail = self.stock_queue[queue_length - tail_length:] if tail_length else []
+
+		is_full = (not self.stock_queue_snapshot_interval
+			or change.full
+			or queue_length <= stock_queue_min_delta_length
+			or self.stock_queue_distance + 1 >= self.stock_queue_snapshot_interval
+			or head_removed + tail_removed > change.previous_length
+			or len(head) + tail_length > queue_length)
+
+		if is_full:
+			self.stock_queue_distance = 0
+			return json.dumps(self.stock_queue)
+
+		self.stock_queue_distance += 1
+		return json.dumps({
+			"n": self.stock_queue_distance,
+			"h": head_removed,
+			"t": tail_removed,
+			"p": head,
+			"a": tail,
+		}, separators=(',', ':'))
+
 	def set_stock_reconciliation_actual_qty(self, sle):
 		if self.batch_wise_valuation:
 			sle.actual_qty = sle.batch_qty_after_transaction - self.batch_data.batch_qty_after_transaction
@@ -557,6 +854,7 @@ class update_entries_after(object):
 			self.valuation_rate = sle.valuation_rate
 			self.qty_after_transaction = sle.qty_after_transaction
 			self.stock_queue = [[self.qty_after_transaction, self.valuation_rate]]
+			self.stock_queue_change.full = True
 			self.stock_value = flt(self.qty_after_transaction) * flt(self.valuation_rate)
 
 			if flt(sle.actual_qty) > 0:
@@ -567,17 +865,7 @@ class update_entries_after(object):
 	def get_dependent_values(self, sle):
 		dependencies = self.sle_dependency_map.get(sle.name)
 		if dependencies:
-			dependency_keys = list(dependencies.keys())
-
-			dependency_sles = frappe.db.sql("""
-				select voucher_type, voucher_no, voucher_detail_no,
-					stock_value_difference, incoming_rate, outgoing_rate, actual_qty
-				from `tabStock Ledger Entry`
-				where (voucher_type, voucher_no, voucher_detail_no) in %s
-					and name != %s
-					and ifnull(is_cancelled, 'No')='No'
-			""", [dependency_keys, sle.name], as_dict=1)
-
+			dependency_sles = self.get_dependency_sles(sle, dependencies)
 			dependent_sle_value = flt(sle.additional_cost)
 
 			for dep_sle in dependency_sles:
@@ -607,10 +895,56 @@ class update_entries_after(object):
 				sle.outgoing_rate = rate
 				sle.incoming_rate = 0
 
+	def get_dependency_sles(self, sle, dependencies):
+		# each lookup from the index saves the query per SLE
+		self.stats.dependency_queries_saved += 1
+
+		return [dep_sle
+			for dependency_key in dependencies
+			for dep_sle in self.dependency_sle_index.get(dependency_key, [])
+			if dep_sle.name != sle.name]
+
+	def get_dependency_sle_index(self):
+		"""
+			Load the source SLEs of all dependencies in the repost window with one query per chunk,
+			returns dict of (voucher_type, voucher_no, voucher_detail_no) -> list of SLEs
+		"""
+		dependency_keys = set()
+		for dependencies in self.sle_dependency_map.values():
+			dependency_keys.update(dependencies.keys())
+
+		dependency_keys = list(dependency_keys)
+		self.dependency_index_sles = {}
+
+		index = {}
+		for i in range(0, len(dependency_keys), sle_repost_update_chunk_size):
+			dependency_sles = frappe.db.sql("""
+				select name, voucher_type, voucher_no, voucher_detail_no,
+					stock_value_difference, incoming_rate, outgoing_rate, actual_qty
+				from `tabStock Ledger Entry`
+				where (voucher_type, voucher_no, voucher_detail_no) in %s
+					and ifnull(is_cancelled, 'No')='No'
+			""", [dependency_keys[i:i + sle_repost_update_chunk_size]], as_dict=1)
+
+			self.stats.dependency_queries_saved -= 1
+
+			for d in dependency_sles:
+				index.setdefault((d.voucher_type, d.voucher_no, d.voucher_detail_no), []).append(d)
+				self.dependency_index_sles[d.name] = d
+
+		return index
+
+	def update_dependency_sle_index(self, sle):
+		# keep values of dependency sources reposted in this window up to date
+		dep_sle = self.dependency_index_sles.get(sle.name)
+		if dep_sle:
+			for key in ("stock_value_difference", "incoming_rate", "outgoing_rate", "actual_qty"):
+				dep_sle[key] = sle.get(key)
+
 	def get_sle_dependency_map(self, sles):
 		names = [d.name for d in sles]
 		if not names:
-			return []
+			return {}
 
 		dependencies = frappe.db.sql("""
 			select parent, dependent_voucher_type, dependent_voucher_no, dependent_voucher_detail_no,
@@ -696,6 +1030,31 @@ class update_entries_after(object):
 		else:
 			return 0
 
+	def get_previous_sle_with_stock_queue(self, previous_sle):
+		"""
+			Returns (previous SLE, its stock queue).
+			If the stock queue of the previous SLE can not be rebuilt from a complete chain of deltas, the repost
+			starts from the last SLE that saved the complete queue instead, so that the entries in between are saved again.
+		"""
+		if not is_stock_queue_delta(previous_sle):
+			return previous_sle, get_stock_queue(previous_sle)
+
+		stock_queue, anchor_sle, is_complete = get_stock_queue_chain(previous_sle)
+		if is_complete:
+			return previous_sle, stock_queue
+
+		if not anchor_sle:
+			return frappe._dict(), []
+
+		anchor_sle = frappe.db.sql("""
+			select *, timestamp(posting_date, posting_time) as timestamp
+			from `tabStock Ledger Entry`
+			where name = %s
+			for update
+		""", anchor_sle.name, as_dict=1)[0]
+
+		return anchor_sle, get_stock_queue(anchor_sle)
+
 	def get_sle_before_datetime(self):
 		"""get previous stock ledger entry before current time-bucket"""
 		if self.args.get('sle_id'):
@@ -710,18 +1069,56 @@ class update_entries_after(object):
 				"item_code": self.args.get("item_code"), "warehouse": self.args.get("warehouse")
 			}), ">=", "asc", include_unprocessed=True, for_update=True)
 
+	def prefetch_previous_batch_and_packing_slip_sles(self, sles):
+		"""
+			Load the batch and packing slip balances before the repost window with grouped queries
+			instead of one query for each new batch / packing slip found in the window
+		"""
+		batch_nos = set()
+		packing_slip_keys = set()
+		for sle in sles:
+			if self.batch_wise_valuation and sle.batch_no:
+				batch_nos.add(sle.batch_no)
+			packing_slip_keys.add((cstr(sle.batch_no), cstr(sle.packing_slip)))
+
+		previous_batch_sles = {}
+		previous_packing_slip_sles = {}
+
+		# no previous entry means there is nothing before the repost window
+		if self.previous_sle:
+			previous_batch_sles = get_latest_sles_by_key(self.previous_sle, ["batch_no"], batch_nos,
+				["batch_qty_after_transaction", "batch_valuation_rate", "batch_stock_value"])
+
+			batch_packing_slip_keys = [d for d in packing_slip_keys if d[0]]
+			previous_packing_slip_sles = get_latest_sles_by_key(self.previous_sle,
+				["batch_no", "ifnull(packing_slip, '')"], batch_packing_slip_keys, ["packed_qty_after_transaction"])
+
+			# packing slip balance without batch is not filtered by batch
+			no_batch_packing_slips = [d[1] for d in packing_slip_keys if not d[0]]
+			for packing_slip, previous_sle in get_latest_sles_by_key(self.previous_sle,
+					["ifnull(packing_slip, '')"], no_batch_packing_slips, ["packed_qty_after_transaction"]).items():
+				previous_packing_slip_sles[("", packing_slip)] = previous_sle
+
+		for batch_no in batch_nos:
+			self.set_previous_batch_data(batch_no, previous_batch_sles.get(batch_no))
+		for packing_slip_key in packing_slip_keys:
+			self.set_previous_packing_slip_data(packing_slip_key, previous_packing_slip_sles.get(packing_slip_key))
+
 	def get_previous_batch_sle(self, sle):
 		self.batch_data = self.previous_batch_sle_dict.get(sle.batch_no)
 
 		if not self.batch_data:
 			previous_batch_sle = get_stock_ledger_entries(sle, "<=", "desc", "limit 1",
 				for_update=True, batch_sle=True)
-			previous_batch_sle = previous_batch_sle[0] if previous_batch_sle else frappe._dict()
+			self.set_previous_batch_data(sle.batch_no, previous_batch_sle[0] if previous_batch_sle else None)
 
-			self.batch_data = self.previous_batch_sle_dict[sle.batch_no] = frappe._dict()
-			for key in ("batch_qty_after_transaction", "batch_valuation_rate", "batch_stock_value"):
-				self.batch_data[key] = flt(previous_batch_sle.get(key))
-			self.batch_data.prev_batch_stock_value = self.batch_data.batch_stock_value or 0.0
+	def set_previous_batch_data(self, batch_no, previous_batch_sle):
+		previous_batch_sle = previous_batch_sle or frappe._dict()
+
+		self.batch_data = self.previous_batch_sle_dict[batch_no] = frappe._dict()
+		for key in ("batch_qty_after_transaction", "batch_valuation_rate", "batch_stock_value"):
+			self.batch_data[key] = flt(previous_batch_sle.get(key))
+		self.batch_data.prev_batch_stock_value = self.batch_data.batch_stock_value or 0.0
 
 	def get_previous_packing_slip_sle(self, sle):
 		self.packing_slip_data = self.previous_packing_slip_sle_dict.get((cstr(sle.batch_no), cstr(sle.packing_slip)))
@@ -729,11 +1126,15 @@ class update_entries_after(object):
 		if not self.packing_slip_data:
 			previous_packing_slip_sle = get_stock_ledger_entries(sle, "<=", "desc", "limit 1",
 				for_update=True, packing_slip_sle=True, batch_sle=bool(sle.batch_no))
-			previous_packing_slip_sle = previous_packing_slip_sle[0] if previous_packing_slip_sle else frappe._dict()
+			self.set_previous_packing_slip_data((cstr(sle.batch_no), cstr(sle.packing_slip)),
+				previous_packing_slip_sle[0] if previous_packing_slip_sle else None)
+
+	def set_previous_packing_slip_data(self, packing_slip_key, previous_packing_slip_sle):
+		previous_packing_slip_sle = previous_packing_slip_sle or frappe._dict()
 
-			self.packing_slip_data = self.previous_packing_slip_sle_dict[(cstr(sle.batch_no), cstr(sle.packing_slip))] = frappe._dict()
-			for key in ("packed_qty_after_transaction",):
-				self.packing_slip_data[key] = flt(previous_packing_slip_sle.get(key))
+		self.packing_slip_data = self.previous_packing_slip_sle_dict[packing_slip_key] = frappe._dict()
+		for key in ("packed_qty_after_transaction",):
+			self.packing_slip_data[key] = flt(previous_packing_slip_sle.get(key))
 
 	def raise_exceptions(self):
 		deficiency = min(e["diff"] for e in self.exceptions)
@@ -780,12 +1181,16 @@ class update_entries_after(object):
 		else:
 			raise NegativeStockError(msg)
 
-	def add_sle_to_reposted_flags(self, sle, stock_value_difference_changed):
+	def add_sle_to_reposted_flags(self, sle, stock_value_difference_changed, stock_value_difference_delta=0):
 		voucher_tuple = (sle.voucher_type, sle.voucher_no)
 
 		if stock_value_difference_changed:
 			frappe.flags.stock_ledger_vouchers_value_changed.add(voucher_tuple)
 
+			# change in value per warehouse, used to adjust GL Entries without reloading the voucher
+			warehouse_deltas = frappe.flags.stock_ledger_voucher_value_deltas.setdefault(voucher_tuple, {})
+			warehouse_deltas[sle.warehouse] = warehouse_deltas.get(sle.warehouse, 0) + stock_value_difference_delta
+
 		if voucher_tuple not in frappe.flags.stock_ledger_vouchers_visited:
 			frappe.flags.stock_ledger_vouchers_visited.add(voucher_tuple)
 
@@ -797,6 +1202,371 @@ class update_entries_after(object):
 			}))
 
 
+class StockRepostPlanner(object):
+	"""
+		Repost bins that depend on the given entries through Stock Ledger Entry Dependency.
+
+		The item-warehouse dependency graph is built up front so that each bin is reposted only once
+		from its earliest affected entry, in topological order of the graph.
+		Bins that are part of a dependency cycle are reposted once each, earliest first, without reposting
+		their dependent entries again so that the repost does not recurse through the cycle.
+		get_plan returns the order of the reposts and run returns the stats of all of them.
+
+		:param entries: dependent SLEs to start from (as returned by update_entries_after.get_dependent_entries_to_fix)
+	"""
+	def __init__(self, entries, allow_negative_stock=None, via_landed_cost_voucher=False, bulk_update=None,
+			defer_future_entries=False):
+		self.allow_negative_stock = allow_negative_stock
+		self.via_landed_cost_voucher = via_landed_cost_voucher
+		self.bulk_update = bulk_update
+		self.defer_future_entries = defer_future_entries
+
+		self.start_points = {}
+		self.dependents = {}
+		self.stats = get_new_repost_stats()
+
+		self.build_graph(entries)
+
+	def build_graph(self, entries):
+		to_expand = []
+		for d in entries:
+			if self.set_start_point(d):
+				to_expand.append((d.item_code, d.warehouse))
+
+		while to_expand:
+			bin_key = to_expand.pop()
+			for d in get_dependent_bin_entries(self.start_points[bin_key]):
+				dependent_bin_key = (d.item_code, d.warehouse)
+				self.dependents.setdefault(bin_key, set()).add(dependent_bin_key)
+
+				# expand again if the start point moved earlier
+				if self.set_start_point(d):
+					to_expand.append(dependent_bin_key)
+
+	def set_start_point(self, sle):
+		bin_key = (sle.item_code, sle.warehouse)
+		start_point = self.start_points.get(bin_key)
+		if not start_point or get_sle_sort_key(sle) < get_sle_sort_key(start_point):
+			self.start_points[bin_key] = sle
+			return True
+
+		return False
+
+	def get_repost_order(self):
+		"""
+			Returns list of (bin_key, is_cyclic) in topological order, ties broken by posting timestamp.
+			When only cyclic bins remain, the earliest one is taken and marked as cyclic.
+		"""
+		import heapq
+
+		in_degree = dict.fromkeys(self.start_points, 0)
+		for bin_key, dependent_bins in self.dependents.items():
+			for dependent_bin_key in dependent_bins:
+				if bin_key != dependent_bin_key:
+					in_degree[dependent_bin_key] += 1
+
+		def push(bin_key):
+			heapq.heappush(ready, (get_sle_sort_key(self.start_points[bin_key]), bin_key))
+
+		ready = []
+		for bin_key, degree in in_degree.items():
+			if not degree:
+				push(bin_key)
+
+		order = []
+		done = set()
+		while len(done) < len(in_degree):
+			is_cyclic = False
+			if ready:
+				bin_key = heapq.heappop(ready)[1]
+			else:
+				is_cyclic = True
+				bin_key = min([d for d in in_degree if d not in done], key=lambda d: get_sle_sort_key(self.start_points[d]))
+
+			if bin_key in done:
+				continue
+
+			done.add(bin_key)
+			order.append((bin_key, is_cyclic))
+
+			for dependent_bin_key in self.dependents.get(bin_key, []):
+				if dependent_bin_key not in done and dependent_bin_key != bin_key:
+					in_degree[dependent_bin_key] -= 1
+					if not in_degree[dependent_bin_key]:
+						push(dependent_bin_key)
+
+		return order
+
+	def get_plan(self):
+		return [frappe._dict({
+			"item_code": bin_key[0],
+			"warehouse": bin_key[1],
+			"posting_date": self.start_points[bin_key].posting_date,
+			"posting_time": self.start_points[bin_key].posting_time,
+			"voucher_type": self.start_points[bin_key].voucher_type,
+			"voucher_no": self.start_points[bin_key].voucher_no,
+			"is_cyclic": is_cyclic,
+		}) for bin_key, is_cyclic in self.get_repost_order()]
+
+	def run(self):
+		# all dependents are part of the graph, so each bin is reposted without reposting its dependents again
+		for bin_key, is_cyclic in self.get_repost_order():
+			bin_repost = update_entries_after(get_repost_args_from_sle(self.start_points[bin_key]),
+				allow_negative_stock=self.allow_negative_stock, via_landed_cost_voucher=self.via_landed_cost_voucher,
+				bulk_update=self.bulk_update, repost_dependent_entries=False,
+				defer_future_entries=self.defer_future_entries)
+
+			merge_repost_stats(self.stats, bin_repost.stats)
+
+		return self.stats
+
+
+def get_new_repost_stats():
+	return frappe._dict({
+		"bins_reposted": 0,
+		"sles_reposted": 0,
+		"distinct_bins": set(),
+		"dependency_queries_saved": 0,
+	})
+
+
+def merge_repost_stats(stats, other_stats):
+	stats.bins_reposted += other_stats.bins_reposted
+	stats.sles_reposted += other_stats.sles_reposted
+	stats.distinct_bins |= other_stats.distinct_bins
+	stats.dependency_queries_saved += other_stats.dependency_queries_saved
+
+
+def get_dependent_bin_entries(start_sle):
+	"""
+		get the earliest SLE per (item_code, warehouse) that depends on
+		any SLE of start_sle's bin on or after start_sle
+	"""
+	dependent_entries = frappe.db.sql("""
+		select sle.name, sle.item_code, sle.warehouse, sle.batch_no, sle.posting_date, sle.posting_time, sle.creation,
+			sle.voucher_type, sle.voucher_no
+		from `tabStock Ledger Entry` src
+		inner join `tabStock Ledger Entry Dependency` dep
+			on (dep.dependent_voucher_type, dep.dependent_voucher_no, dep.dependent_voucher_detail_no)
+				= (src.voucher_type, src.voucher_no, src.voucher_detail_no)
+		inner join `tabStock Ledger Entry` sle on sle.name = dep.parent
+		where src.item_code = %(item_code)s and src.warehouse = %(warehouse)s
+			and (src.posting_date, src.posting_time, src.creation) >= (%(posting_date)s, %(posting_time)s, %(creation)s)
+			and ifnull(src.is_cancelled, 'No')='No'
+			and (sle.item_code, sle.warehouse) != (src.item_code, src.warehouse)
+			and (sle.posting_date, sle.posting_time, sle.creation) >= (%(posting_date)s, %(posting_time)s, %(creation)s)
+			and CASE
+				WHEN dep.dependency_qty_filter = 'Positive' then sle.actual_qty > 0
+				WHEN dep.dependency_qty_filter = 'Negative' then sle.actual_qty < 0
+				ELSE true
+			END
+			and ifnull(sle.is_cancelled, 'No')='No'
+			and sle.is_processed = 1
+		order by sle.posting_date, sle.posting_time, sle.creation
+	""", {
+		"item_code": start_sle.item_code,
+		"warehouse": start_sle.warehouse,
+		"posting_date": start_sle.posting_date,
+		"posting_time": start_sle.posting_time,
+		"creation": start_sle.creation,
+	}, as_dict=1)
+
+	out = []
+	visited = set()
+	for d in dependent_entries:
+		bin_key = (d.item_code, d.warehouse)
+		if bin_key not in visited:
+			out.append(d)
+			visited.add(bin_key)
+
+	return out
+
+
+def get_repost_args_from_sle(sle):
+	return {
+		"item_code": sle.item_code,
+		"warehouse": sle.warehouse,
+		"batch_no": sle.batch_no,
+		"posting_date": sle.posting_date,
+		"posting_time": sle.posting_time,
+		"creation": sle.creation,
+		"sle_id": sle.name,
+		"voucher_no": sle.voucher_no
+	}
+
+
+def get_sle_sort_key(sle):
+	return (getdate(sle.posting_date), get_time(sle.posting_time), get_datetime(sle.creation))
+
+
+def bulk_update_stock_ledger_entries(sles, fields=sle_repost_update_fields):
+	"""update multiple Stock Ledger Entries with one UPDATE statement per chunk"""
+	for i in range(0, len(sles), sle_repost_update_chunk_size):
+		chunk = sles[i:i + sle_repost_update_chunk_size]
+
+		set_clauses = []
+		values = []
+		for fieldname in fields:
+			set_clauses.append("`{0}` = case name {1} end".format(fieldname, " ".join(["when %s then %s"] * len(chunk))))
+			for sle in chunk:
+				values += [sle.name, sle.get(fieldname)]
+
+		values.append([sle.name for sle in chunk])
+
+		frappe.db.sql("""
+			update `tabStock Ledger Entry`
+			set {0}
+			where name in %s
+		""".format(", ".join(set_clauses)), values)
+
+
+def get_latest_sles_by_key(previous_sle, key_fields, keys, fields):
+	"""
+		get the latest SLE on or before previous_sle in the same item and warehouse for each key,
+		returns dict of key -> SLE with the requested fields.
+		Keys are queried in chunks so that the result holds at most one row per requested key.
+		The entries of the keys are locked like the per-key queries for update lock them, with a separate
+		query as the latest entry is picked in a derived table.
+
+		:param key_fields: list of column expressions that make the key
+	"""
+	out = {}
+	keys = list(keys)
+	if not keys:
+		return out
+
+	key_expression = ", ".join(key_fields)
+	if len(key_fields) > 1:
+		key_expression = "({0})".format(key_expression)
+
+	key_columns = ", ".join(["{0} as key_{1}".format(f, i) for i, f in enumerate(key_fields)])
+
+	for i in range(0, len(keys), sle_repost_update_chunk_size):
+		args = {
+			"item_code": previous_sle.item_code,
+			"warehouse": previous_sle.warehouse,
+			"posting_date": previous_sle.posting_date,
+			"posting_time": previous_sle.posting_time,
+			"creation": previous_sle.creation,
+			"keys": keys[i:i + sle_repost_update_chunk_size],
+		}
+
+		frappe.db.sql("""
+			select name
+			from `tabStock Ledger Entry`
+			where item_code = %(item_code)s and warehouse = %(warehouse)s
+				and {key_expression} in %(keys)s
+				and (posting_date, posting_time, creation) <= (%(posting_date)s, %(posting_time)s, %(creation)s)
+			for update
+		""".format(key_expression=key_expression), args)
+
+		data = frappe.db.sql("""
+			select *
+			from (
+				select {fields}, {key_columns},
+					row_number() over (partition by {key_fields} order by posting_date desc, posting_time desc, creation desc) as row_no
+				from `tabStock Ledger Entry`
+				where item_code = %(item_code)s and warehouse = %(warehouse)s
+					and {key_expression} in %(keys)s
+					and (posting_date, posting_time, creation) <= (%(posting_date)s, %(posting_time)s, %(creation)s)
+					and is_processed = 1
+					and ifnull(is_cancelled, 'No')='No'
+			) sle
+			where row_no = 1
+		""".format(
+			fields=", ".join(fields),
+			key_columns=key_columns,
+			key_fields=", ".join(key_fields),
+			key_expression=key_expression
+		), args, as_dict=1)
+
+		for d in data:
+			key = tuple(cstr(d.get("key_{0}".format(j))) for j in range(len(key_fields)))
+			out[key if len(key_fields) > 1 else key[0]] = d
+
+	return out
+
+
+def get_stock_queue(sle):
+	"""Returns the FIFO stock queue of an SLE, rebuilding it from the last complete queue if saved as a delta"""
+	if not is_stock_queue_delta(sle):
+		return json.loads((sle and sle.get("stock_queue")) or "[]")
+
+	return get_stock_queue_chain(sle)[0]
+
+
+def get_stock_queue_chain(sle):
+	"""
+		Returns (stock queue, anchor SLE, is complete) for an SLE that saved its stock queue as a delta.
+
+		The deltas are replayed on the last earlier SLE of the bin that saved the complete queue (the anchor).
+		Each delta saves its distance from the anchor, so the chain is complete only if the distances from the
+		anchor up to the SLE are 1, 2, ... n. It is not, for example, when an entry was inserted before later
+		entries that are yet to be reposted.
+	"""
+	values = {
+		"item_code": sle.item_code,
+		"warehouse": sle.warehouse,
+		"posting_date": sle.posting_date,
+		"posting_time": sle.posting_time,
+		"creation": sle.creation,
+	}
+
+	anchor_sle = frappe.db.sql("""
+		select name, posting_date, posting_time, creation, stock_queue
+		from `tabStock Ledger Entry`
+		where item_code = %(item_code)s and warehouse = %(warehouse)s
+			and (posting_date, posting_time, creation) < (%(posting_date)s, %(posting_time)s, %(creation)s)
+			and ifnull(stock_queue, '') not like '{%%'
+			and ifnull(is_cancelled, 'No')='No' and is_processed = 1
+		order by posting_date desc, posting_time desc, creation desc
+		limit 1
+	""", values, as_dict=1)
+	anchor_sle = anchor_sle[0] if anchor_sle else None
+
+	anchor_condition = ""
+	if anchor_sle:
+		anchor_condition = "and (posting_date, posting_time, creation) > (%(anchor_date)s, %(anchor_time)s, %(anchor_creation)s)"
+		values.update({
+			"anchor_date": anchor_sle.posting_date,
+			"anchor_time": anchor_sle.posting_time,
+			"anchor_creation": anchor_sle.creation,
+		})
+
+	previous_deltas = frappe.db.sql_list("""
+		select stock_queue
+		from `tabStock Ledger Entry`
+		where item_code = %(item_code)s and warehouse = %(warehouse)s
+			and (posting_date, posting_time, creation) < (%(posting_date)s, %(posting_time)s, %(creation)s)
+			{0}
+			and ifnull(is_cancelled, 'No')='No' and is_processed = 1
+		order by posting_date, posting_time, creation
+	""".format(anchor_condition), values)
+
+	deltas = [json.loads(d) for d in previous_deltas] + [json.loads(sle.stock_queue)]
+	is_complete = bool(anchor_sle) and [cint(d.get("n")) for d in deltas] == list(range(1, len(deltas) + 1))
+
+	stock_queue = json.loads((anchor_sle and anchor_sle.stock_queue) or "[]")
+	for delta in deltas:
+		stock_queue = apply_stock_queue_delta(stock_queue, delta)
+
+	return stock_queue, anchor_sle, is_complete
+
+
+def is_stock_queue_delta(sle):
+	return ((sle and sle.get("stock_queue")) or "").startswith("{")
+
+
+def apply_stock_queue_delta(stock_queue, delta):
+	"""remove h buckets from the head and t buckets from the tail, then add p to the head and a to the tail"""
+	return delta["p"] + stock_queue[delta["h"]:len(stock_queue) - delta["t"]] + delta["a"]
+
+
+def get_stock_queue_snapshot_distance(sle):
+	stock_queue = json.loads((sle and sle.get("stock_queue")) or "[]")
+	return cint(stock_queue.get("n")) if isinstance(stock_queue, dict) else 0
+
+
 def get_previous_sle(args, for_update=False, packing_slip_sle=False):
 	"""
 		get the last sle on or before the current time-bucket,
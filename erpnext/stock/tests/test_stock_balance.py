@@ -0,0 +1,80 @@
+import os
+import json
+import frappe
+import unittest
+from erpnext.stock import stock_balance
+from erpnext.stock.doctype.item.test_item import create_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+
+
+class TestRepostInParallel(unittest.TestCase):
+	def setUp(self):
+		self.checkpoint_file = os.path.join(frappe.get_site_path(), "test_repost_stock_checkpoint.json")
+		if os.path.isfile(self.checkpoint_file):
+			os.remove(self.checkpoint_file)
+
+	def tearDown(self):
+		if os.path.isfile(self.checkpoint_file):
+			os.remove(self.checkpoint_file)
+
+	def test_dependent_bins_are_partitioned_together(self):
+		item_code = create_item("_Test Repost Partition Item " + frappe.generate_hash(length=8)).name
+		other_item_code = create_item("_Test Repost Partition Item " + frappe.generate_hash(length=8)).name
+
+		make_stock_entry(item_code=item_code, target="_Test Warehouse - _TC", qty=10, basic_rate=100)
+		make_stock_entry(item_code=item_code, source="_Test Warehouse - _TC", target="_Test Warehouse 1 - _TC", qty=5)
+		make_stock_entry(item_code=other_item_code, target="_Test Warehouse 2 - _TC", qty=10, basic_rate=100)
+
+		partitions = stock_balance.get_repost_partitions()
+		partition_bins = [set(p.bins) for p in partitions]
+
+		self.assertIn({(item_code, "_Test Warehouse - _TC"), (item_code, "_Test Warehouse 1 - _TC")}, partition_bins)
+		self.assertIn({(other_item_code, "_Test Warehouse 2 - _TC")}, partition_bins)
+
+		# each bin is in exactly one partition
+		all_bins = [bin_key for p in partitions for bin_key in p.bins]
+		self.assertEqual(len(all_bins), len(set(all_bins)))
+
+	def test_resume_from_checkpoint(self):
+		item_code = create_item("_Test Repost Checkpoint Item " + frappe.generate_hash(length=8)).name
+		make_stock_entry(item_code=item_code, target="_Test Warehouse - _TC", qty=10, basic_rate=100)
+
+		partition_keys = [p.key for p in stock_balance.get_repost_partitions()]
+		failed_key = "{0}::{1}".format(item_code, "_Test Warehouse - _TC")
+		self.assertIn(failed_key, partition_keys)
+
+		reposted = []
+		repost_partition = stock_balance.repost_partition
+
+		def record_partition(args):
+			key, bins, options = args
+			reposted.append(key)
+			return key, bins, list(bins) if key == failed_key else []
+
+		stock_balance.repost_partition = record_partition
+		try:
+			# first run fails on one partition and keeps the others in the checkpoint
+			failed_bins = stock_balance.repost_in_parallel(workers=1, checkpoint_file=self.checkpoint_file)
+			self.assertEqual(failed_bins, [(item_code, "_Test Warehouse - _TC")])
+			self.assertEqual(sorted(reposted), sorted(partition_keys))
+
+			with open(self.checkpoint_file, "r") as f:
+				checkpoint = json.loads(f.read())
+			self.assertEqual(sorted(checkpoint["completed"]), sorted(k for k in partition_keys if k != failed_key))
+
+			# resuming reposts only the failed partition and removes the checkpoint once it succeeds
+			reposted[:] = []
+			failed_key = None
+			self.assertEqual(stock_balance.repost_in_parallel(workers=1, checkpoint_file=self.checkpoint_file), [])
+			self.assertEqual(reposted, ["{0}::{1}".format(item_code, "_Test Warehouse - _TC")])
+			self.assertFalse(os.path.isfile(self.checkpoint_file))
+
+			# a run with other options ignores the checkpoint
+			reposted[:] = []
+			failed_key = partition_keys[0]
+			stock_balance.repost_in_parallel(workers=1, checkpoint_file=self.checkpoint_file)
+			failed_key = None
+			stock_balance.repost_in_parallel(workers=1, only_bin=True, checkpoint_file=self.checkpoint_file)
+			self.assertEqual(len(reposted), 2 * len(partition_keys))
+		finally:
+			stock_balance.repost_partition = repost_partition
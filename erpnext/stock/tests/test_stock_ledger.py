@@ -0,0 +1,187 @@
+import frappe
+import unittest
+from frappe.utils import flt, nowdate, add_days
+from erpnext.stock.doctype.item.test_item import create_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.stock_ledger import update_entries_after, sle_repost_update_fields
+
+
+class TestStockRepostPlanner(unittest.TestCase):
+	def setUp(self):
+		self.plan_dependent_stock_reposts = frappe.db.get_single_value("Stock Settings", "plan_dependent_stock_reposts")
+		frappe.db.set_value("Stock Settings", None, "plan_dependent_stock_reposts", 1)
+
+	def tearDown(self):
+		frappe.db.set_value("Stock Settings", None, "plan_dependent_stock_reposts", self.plan_dependent_stock_reposts)
+
+	def test_dependency_chain(self):
+		item_code = create_item("_Test Repost Chain Item " + frappe.generate_hash(length=8)).name
+		warehouses = ["_Test Warehouse - _TC", "_Test Warehouse 1 - _TC", "_Test Warehouse 2 - _TC"]
+
+		receipt = make_stock_entry(item_code=item_code, target=warehouses[0], qty=10, basic_rate=100,
+			posting_date=add_days(nowdate(), -3))
+		make_stock_entry(item_code=item_code, source=warehouses[0], target=warehouses[1], qty=6,
+			posting_date=add_days(nowdate(), -2))
+		make_stock_entry(item_code=item_code, source=warehouses[1], target=warehouses[2], qty=4,
+			posting_date=add_days(nowdate(), -1))
+
+		receipt_sle = get_sle(receipt.name, warehouses[0])
+		frappe.db.set_value("Stock Ledger Entry", receipt_sle.name, "incoming_rate", 150)
+
+		repost = update_entries_after(get_repost_args(receipt_sle))
+
+		self.assertEqual([(d.item_code, d.warehouse) for d in repost.repost_plan],
+			[(item_code, warehouses[1]), (item_code, warehouses[2])])
+		self.assertFalse([d for d in repost.repost_plan if d.is_cyclic])
+		self.assertEqual(repost.stats.distinct_bins, {(item_code, warehouse) for warehouse in warehouses})
+		self.assertEqual(repost.stats.bins_reposted, 3)
+
+		planned_values = get_stock_values(item_code)
+		self.assertEqual(frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouses[2]},
+			"valuation_rate"), 150)
+
+		# reposting recursively gives the same values
+		frappe.db.set_value("Stock Settings", None, "plan_dependent_stock_reposts", 0)
+		repost = update_entries_after(get_repost_args(receipt_sle))
+
+		self.assertEqual(repost.repost_plan, [])
+		self.assertEqual(repost.stats.distinct_bins, {(item_code, warehouse) for warehouse in warehouses})
+		self.assertEqual(get_stock_values(item_code), planned_values)
+
+	def test_dependency_cycle(self):
+		item_code = create_item("_Test Repost Cycle Item " + frappe.generate_hash(length=8)).name
+		warehouse, transit_warehouse = "_Test Warehouse - _TC", "_Test Warehouse 1 - _TC"
+
+		receipt = make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100,
+			posting_date=add_days(nowdate(), -4))
+		make_stock_entry(item_code=item_code, source=warehouse, target=transit_warehouse, qty=5,
+			posting_date=add_days(nowdate(), -3))
+		make_stock_entry(item_code=item_code, source=transit_warehouse, target=warehouse, qty=3,
+			posting_date=add_days(nowdate(), -2))
+		make_stock_entry(item_code=item_code, source=warehouse, target=transit_warehouse, qty=2,
+			posting_date=add_days(nowdate(), -1))
+
+		receipt_sle = get_sle(receipt.name, warehouse)
+		frappe.db.set_value("Stock Ledger Entry", receipt_sle.name, "incoming_rate", 150)
+
+		repost = update_entries_after(get_repost_args(receipt_sle))
+
+		# each bin in the cycle is reposted once, starting from the earliest one
+		plan = [(d.warehouse, d.is_cyclic) for d in repost.repost_plan]
+		self.assertEqual(plan, [(transit_warehouse, True), (warehouse, False)])
+		self.assertEqual(repost.stats.bins_reposted, 3)
+		self.assertEqual(repost.stats.distinct_bins, {(item_code, warehouse), (item_code, transit_warehouse)})
+
+		for sle in frappe.get_all("Stock Ledger Entry", filters={"item_code": item_code},
+				fields=["valuation_rate"]):
+			self.assertEqual(sle.valuation_rate, 150)
+
+
+class TestDependencySLEIndex(unittest.TestCase):
+	def test_index_matches_per_sle_lookup(self):
+		item_code = create_item("_Test Dependency Index Item " + frappe.generate_hash(length=8)).name
+		warehouse, target_warehouse = "_Test Warehouse - _TC", "_Test Warehouse 1 - _TC"
+
+		receipt = make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100,
+			posting_date=add_days(nowdate(), -4))
+		for days in (-3, -2, -1):
+			make_stock_entry(item_code=item_code, source=warehouse, target=target_warehouse, qty=2,
+				posting_date=add_days(nowdate(), days))
+
+		receipt_sle = get_sle(receipt.name, warehouse)
+		frappe.db.set_value("Stock Ledger Entry", receipt_sle.name, "incoming_rate", 150)
+
+		lookups = []
+		get_dependency_sles = update_entries_after.get_dependency_sles
+
+		def compare_with_per_sle_lookup(self, sle, dependencies):
+			dependency_sles = get_dependency_sles(self, sle, dependencies)
+
+			self.flush_sle_updates()
+			expected = frappe.db.sql("""
+				select voucher_type, voucher_no, voucher_detail_no,
+					stock_value_difference, incoming_rate, outgoing_rate, actual_qty
+				from `tabStock Ledger Entry`
+				where (voucher_type, voucher_no, voucher_detail_no) in %s
+					and name != %s
+					and ifnull(is_cancelled, 'No')='No'
+			""", [list(dependencies.keys()), sle.name], as_dict=1)
+			lookups.append((get_dependency_values(dependency_sles), get_dependency_values(expected)))
+
+			return dependency_sles
+
+		update_entries_after.get_dependency_sles = compare_with_per_sle_lookup
+		try:
+			repost = update_entries_after(get_repost_args(receipt_sle))
+		finally:
+			update_entries_after.get_dependency_sles = get_dependency_sles
+
+		self.assertEqual(len(lookups), 3)
+		for dependency_sles, expected in lookups:
+			self.assertEqual(dependency_sles, expected)
+
+		# three transfers into the target warehouse are resolved with one query
+		self.assertEqual(repost.stats.dependency_queries_saved, 2)
+
+
+class TestBulkStockLedgerUpdate(unittest.TestCase):
+	def test_bulk_and_per_row_repost_match(self):
+		item_code = create_item("_Test Bulk Repost Item " + frappe.generate_hash(length=8)).name
+		warehouse, target_warehouse = "_Test Warehouse - _TC", "_Test Warehouse 1 - _TC"
+
+		receipt = make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100,
+			posting_date=add_days(nowdate(), -5))
+		make_stock_entry(item_code=item_code, source=warehouse, target=target_warehouse, qty=4,
+			posting_date=add_days(nowdate(), -4))
+		make_stock_entry(item_code=item_code, source=warehouse, qty=3, posting_date=add_days(nowdate(), -3))
+		make_stock_entry(item_code=item_code, source=target_warehouse, qty=1, posting_date=add_days(nowdate(), -2))
+
+		# backdated receipt is reposted through the entries after it
+		make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=70,
+			posting_date=add_days(nowdate(), -6))
+
+		receipt_sle = get_sle(receipt.name, warehouse)
+
+		def repost(bulk_update, incoming_rate):
+			frappe.db.set_value("Stock Ledger Entry", receipt_sle.name, "incoming_rate", incoming_rate)
+			update_entries_after(get_repost_args(receipt_sle), bulk_update=bulk_update)
+			return get_stock_values(item_code, sle_repost_update_fields), get_bin_values(item_code)
+
+		bulk_values = repost(1, 150)
+
+		# repost with another rate in between so that the per row repost has to change every entry again
+		repost(0, 120)
+		per_row_values = repost(0, 150)
+
+		self.assertEqual(bulk_values, per_row_values)
+		self.assertNotEqual(repost(1, 120), per_row_values)
+
+
+def get_bin_values(item_code):
+	return frappe.get_all("Bin", filters={"item_code": item_code},
+		fields=["warehouse", "actual_qty", "projected_qty", "valuation_rate", "stock_value"], order_by="warehouse")
+
+
+def get_dependency_values(dependency_sles):
+	return sorted((d.voucher_type, d.voucher_no, d.voucher_detail_no, flt(d.stock_value_difference, 6),
+		flt(d.incoming_rate, 6), flt(d.outgoing_rate, 6), flt(d.actual_qty, 6)) for d in dependency_sles)
+
+
+def get_sle(voucher_no, warehouse):
+	return frappe.get_all("Stock Ledger Entry", filters={"voucher_no": voucher_no, "warehouse": warehouse},
+		fields=["name", "item_code", "warehouse", "posting_date", "posting_time"])[0]
+
+
+def get_repost_args(sle):
+	return {
+		"item_code": sle.item_code,
+		"warehouse": sle.warehouse,
+		"posting_date": sle.posting_date,
+		"posting_time": sle.posting_time
+	}
+
+
+def get_stock_values(item_code, fields=None):
+	fields = fields or ["qty_after_transaction", "valuation_rate", "stock_value", "stock_value_difference"]
+	return frappe.get_all("Stock Ledger Entry", filters={"item_code": item_code},
+		fields=["name"] + list(fields), order_by="name")
@@ -84,10 +84,12 @@ def get_stock_balance(
 	posting_time=None,
 	with_valuation_rate=False,
 	with_serial_no=False,
+	with_repost_pending=False,
 ):
 	"""Returns stock balance quantity at given warehouse on given posting date or current date.
 
-	If `with_valuation_rate` is True, will return tuple (qty, rate)"""
+	If `with_valuation_rate` is True, will return tuple (qty, rate)
+	If `with_repost_pending` is True, `repost_pending` is set when a deferred repost is queued for the bin"""
 
 	from erpnext.stock.stock_ledger import get_previous_sle, get_serial_nos_after_sle
 
@@ -129,6 +131,10 @@ def get_stock_balance(
 
 		out["serial_nos"] = cstr(serial_nos)
 
+	if with_repost_pending:
+		from erpnext.stock.doctype.stock_repost_job.stock_repost_job import is_stock_repost_pending
+		out["repost_pending"] = is_stock_repost_pending(item_code, warehouse)
+
 	return out
 
 
@@ -218,10 +224,21 @@ def update_bin(args, allow_negative_stock=False, via_landed_cost_voucher=False):
 		frappe.msgprint(_("Item {0} ignored since it is not a stock item").format(args.get("item_code")))
 
 
+def update_bin_for_entries(args_list, allow_negative_stock=False, via_landed_cost_voucher=False):
+	"""Update the Bin of one item and warehouse for all entries of a voucher with a single repost"""
+	item_code = args_list[0].get("item_code")
+	if frappe.db.get_value('Item', item_code, 'is_stock_item', cache=1):
+		bin = get_bin(item_code, args_list[0].get("warehouse"))
+		bin.update_stock_for_entries(args_list, allow_negative_stock, via_landed_cost_voucher)
+		return bin
+	else:
+		frappe.msgprint(_("Item {0} ignored since it is not a stock item").format(item_code))
+
+
 @frappe.whitelist()
 def get_incoming_rate(args, raise_error_if_no_rate=True):
 	"""Get Incoming Rate based on valuation method"""
-	from erpnext.stock.stock_ledger import get_previous_sle, get_valuation_rate
+	from erpnext.stock.stock_ledger import get_previous_sle, get_valuation_rate, get_stock_queue
 	if isinstance(args, string_types):
 		args = json.loads(args)
 
@@ -233,7 +250,7 @@ def get_incoming_rate(args, raise_error_if_no_rate=True):
 		previous_sle = get_previous_sle(args)
 		if valuation_method == 'FIFO':
 			if previous_sle:
-				previous_stock_queue = json.loads(previous_sle.get('stock_queue', '[]') or '[]')
+				previous_stock_queue = get_stock_queue(previous_sle)
 				in_rate = get_fifo_rate(previous_stock_queue, args.get("qty") or 0) if previous_stock_queue else 0
 		elif valuation_method == 'Moving Average':
 			if batch_wise_valuation:
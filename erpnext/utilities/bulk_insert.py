@@ -0,0 +1,52 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import frappe
+from frappe.utils import now_datetime
+
+bulk_insert_chunk_size = 500
+
+
+def bulk_insert(doctype, rows, fields, chunk_size=bulk_insert_chunk_size):
+	"""
+		Insert rows into the table of doctype with multi-row INSERT statements.
+		Does not run any document hooks or validations.
+
+		:param rows: list of dicts with values for fields
+		:param fields: list of fieldnames to insert, standard fields are set if not provided in rows
+	"""
+	if not rows:
+		return
+
+	timestamp = now_datetime()
+	user = frappe.session.user
+
+	standard_values = {
+		"creation": timestamp,
+		"modified": timestamp,
+		"owner": user,
+		"modified_by": user,
+		"docstatus": 0,
+	}
+
+	columns = ["name"] + list(standard_values.keys()) + [f for f in fields if f not in standard_values and f != "name"]
+
+	for i in range(0, len(rows), chunk_size):
+		chunk = rows[i:i + chunk_size]
+
+		values = []
+		for row in chunk:
+			for column in columns:
+				if column == "name":
+					values.append(row.get("name") or frappe.generate_hash(length=10))
+				elif column in standard_values and row.get(column) is None:
+					values.append(standard_values[column])
+				else:
+					values.append(row.get(column))
+
+		placeholder = "({0})".format(", ".join(["%s"] * len(columns)))
+		frappe.db.sql("""
+			insert into `tab{0}` ({1})
+			values {2}
+		""".format(doctype, ", ".join(["`{0}`".format(c) for c in columns]), ", ".join([placeholder] * len(chunk))),
+			values)
@@ -0,0 +1,18 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import multiprocessing
+import frappe
+from frappe.utils import cint
+
+
+def get_site_worker_pool(workers):
+	"""Returns a pool of worker processes, each connected to the current site"""
+	# spawn instead of fork so that each worker opens its own database connection
+	return multiprocessing.get_context("spawn").Pool(cint(workers), initializer=init_site_worker,
+		initargs=(frappe.local.site, frappe.local.sites_path))
+
+
+def init_site_worker(site, sites_path):
+	frappe.init(site=site, sites_path=sites_path)
+	frappe.connect()